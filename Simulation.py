@@ -3,12 +3,23 @@
 from rdkit import Chem
 from rdkit import RDLogger
 import os
+import sys
 import shutil
 import subprocess
 import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
 import json
+import time
+import queue
+import hashlib
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Util"))
+import Util_result_store as result_store
+import Util_Polymer_combine as polymer_combine
 
 # Hide RDKit warnings
 RDLogger.DisableLog('rdApp.*')
@@ -16,6 +27,18 @@ RDLogger.DisableLog('rdApp.*')
 # Fixed solvent SMILES
 FIXED_SOLVENT_SMILES = "O=C1CCCN1C"
 
+# Batch screening: per-candidate work directories live here
+BATCH_WORK_DIR = "work"
+# Template trees copied into every candidate work directory
+WORKSPACE_TEMPLATES = ["Stretched", "Solution"]
+WORKSPACE_IGNORE = shutil.ignore_patterns("lammps", "structures", "._*", ".DS_Store")
+# Candidate ("<monomer SMILES> <solvent SMILES>") whose pipeline state is in Stretched/Solution
+CANDIDATE_FILENAME = ".candidate"
+
+# Share of a candidate's cores given to the Stretched pipeline (Solution gets the rest).
+# Override with --stretched-share or the ARAMIDSIM_STRETCHED_SHARE environment variable.
+DEFAULT_STRETCHED_CORE_SHARE = 0.5
+
 def clean_set_directory():
     """
     Clean the set directory by removing all files and subdirectories except structures folder,
@@ -67,15 +90,39 @@ def clean_set_directory():
     
     return True
 
-def clean_stretched_directory():
+def pipeline_candidate(pipeline_dir):
+    """
+    Candidate recorded in a pipeline directory, or None
+    """
+    try:
+        with open(os.path.join(pipeline_dir, CANDIDATE_FILENAME), 'r') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def record_candidate(candidate):
+    """
+    Record the candidate whose pipelines are about to run in Stretched and Solution
+    """
+    for target in WORKSPACE_TEMPLATES:
+        target_dir = os.path.join(os.getcwd(), target)
+        if os.path.isdir(target_dir):
+            with open(os.path.join(target_dir, CANDIDATE_FILENAME), 'w') as f:
+                f.write(candidate + "\n")
+
+def clean_stretched_directory(candidate=None):
     """
     Clean the Stretched directory according to specific rules.
+    When candidate is the one recorded there, its job graph state, step outputs and
+    LAMMPS checkpoints are kept so the pipeline skips or resumes the finished steps.
     """
     stretched_dir = os.path.join(os.getcwd(), "Stretched")
     
     try:
         if not os.path.exists(stretched_dir):
             return True
+        if candidate is not None and pipeline_candidate(stretched_dir) == candidate:
+            return True
         
         # 1) Clean root Stretched directory - remove all files except specific ones
         files_to_keep = {"E_h_bond_back.txt", "output_all_back.txt"}
@@ -157,15 +204,19 @@ def clean_stretched_directory():
     
     return True
 
-def clean_solution_directory():
+def clean_solution_directory(candidate=None):
     """
     Clean the Solution directory according to specific rules.
+    When candidate is the one recorded there, its job graph state, step outputs and
+    LAMMPS checkpoints are kept so the pipeline skips or resumes the finished steps.
     """
     solution_dir = os.path.join(os.getcwd(), "Solution")
     
     try:
         if not os.path.exists(solution_dir):
             return True
+        if candidate is not None and pipeline_candidate(solution_dir) == candidate:
+            return True
         
         # 1) Clean root Solution directory - remove all files except specific ones
         files_to_keep = {"E_h_bond_back.txt", "output_all_back.txt", "group_polymer.py", "group_solvent.py"}
@@ -291,11 +342,10 @@ def clean_solution_directory():
         else:
             os.makedirs(moltemplates_solvent_single_dir)
         
-        # 9) Clean ./Solution/ratio_calculation/ - keep only specific files and folders
+        # 9) Clean ./Solution/ratio_calculation/ - keep only the scripts
         ratio_calc_dir = os.path.join(solution_dir, "ratio_calculation")
         if os.path.exists(ratio_calc_dir):
             files_to_keep_ratio = {"factoring.py", "number_solvnet.py", "solvent_lt.py"}
-            folders_to_keep_ratio = {"polymer", "solvent"}
             
             for item in os.listdir(ratio_calc_dir):
                 item_path = os.path.join(ratio_calc_dir, item)
@@ -306,50 +356,14 @@ def clean_solution_directory():
                     except Exception:
                         pass
                 
-                elif os.path.isdir(item_path) and item not in folders_to_keep_ratio:
+                elif os.path.isdir(item_path):
                     try:
                         shutil.rmtree(item_path)
                     except Exception:
                         pass
-            
-            # Clean polymer folder - keep only specific files
-            polymer_dir = os.path.join(ratio_calc_dir, "polymer")
-            polymer_files_to_keep = {"polymer_mass.py", "run_polymer_mass.npt2", "system.in", "system.in.init", "system.in.settings"}
-            if os.path.exists(polymer_dir):
-                for item in os.listdir(polymer_dir):
-                    item_path = os.path.join(polymer_dir, item)
-                    if item not in polymer_files_to_keep:
-                        try:
-                            if os.path.isfile(item_path) or os.path.islink(item_path):
-                                os.unlink(item_path)
-                            elif os.path.isdir(item_path):
-                                shutil.rmtree(item_path)
-                        except Exception:
-                            pass
-            else:
-                os.makedirs(polymer_dir)
-            
-            # Clean solvent folder - keep only specific files
-            solvent_calc_dir = os.path.join(ratio_calc_dir, "solvent")
-            solvent_files_to_keep = {"run_solvent_mass.npt2", "solvent_mass.py", "system.in", "system.in.init", "system.in.settings"}
-            if os.path.exists(solvent_calc_dir):
-                for item in os.listdir(solvent_calc_dir):
-                    item_path = os.path.join(solvent_calc_dir, item)
-                    if item not in solvent_files_to_keep:
-                        try:
-                            if os.path.isfile(item_path) or os.path.islink(item_path):
-                                os.unlink(item_path)
-                            elif os.path.isdir(item_path):
-                                shutil.rmtree(item_path)
-                        except Exception:
-                            pass
-            else:
-                os.makedirs(solvent_calc_dir)
         else:
             # Create ratio_calculation directory structure if it doesn't exist
             os.makedirs(ratio_calc_dir)
-            os.makedirs(os.path.join(ratio_calc_dir, "polymer"))
-            os.makedirs(os.path.join(ratio_calc_dir, "solvent"))
         
         # 10) Clean ./Solution/mol2tolt_solvent/test/ - remove all files
         mol2tolt_solvent_test_dir = os.path.join(solution_dir, "mol2tolt_solvent", "test")
@@ -473,61 +487,21 @@ def display_configuration_summary(canonical, solvent_canonical, polymer_config):
     print(f"[DCA+PPD] Count: {polymer_config['cation_count']}")
     print("="*72)
 
-def check_existing_result(monomer_smiles, solvent_smiles):
+def check_existing_result(monomer_smiles, solvent_smiles, store=None):
     """
     Check for existing results - modified to only check monomer since solvent is fixed
-    New format: DCA_SMILES stretched_interE #ofHbond pi_stacking_energy H_bond_interE solution_interE
+    Looks up the canonical monomer SMILES in results.db (imported from result.txt on first use)
     """
-    result_file_path = os.path.join(os.getcwd(), "result.txt")
-    
-    if not os.path.exists(result_file_path):
-        return None
-    
     try:
-        with open(result_file_path, 'r') as f:
-            lines = f.readlines()
-        
-        # Parse each line to find matching system
-        for line_num, line in enumerate(lines, 1):
-            parts = line.strip().split()
-            if len(parts) >= 6:  # New format has 6 columns (removed solvent)
-                saved_monomer = parts[0]
-                saved_stretched_interE = parts[1]
-                saved_hbond_count = parts[2]
-                saved_pi_stacking = parts[3]
-                saved_hbond_interE = parts[4]
-                saved_solution_interE = parts[5]
-                
-                # Canonicalize the saved SMILES for comparison
-                try:
-                    saved_monomer_canonical = canonicalize_smiles(saved_monomer)
-                    
-                    # Skip if canonicalization fails
-                    if saved_monomer_canonical is None:
-                        print(f"Warning: Invalid SMILES found in result.txt line {line_num}, skipping...")
-                        continue
-                    
-                    # Compare canonical forms (only monomer since solvent is fixed)
-                    if saved_monomer_canonical == monomer_smiles:
-                        return {
-                            'monomer_smiles': saved_monomer_canonical,
-                            'stretched_interE': saved_stretched_interE,
-                            'hbond_count': saved_hbond_count,
-                            'pi_stacking_energy': saved_pi_stacking,
-                            'hbond_interE': saved_hbond_interE,
-                            'solution_interE': saved_solution_interE,
-                            'line': line.strip(),
-                            'original_monomer': saved_monomer
-                        }
-                except Exception as e:
-                    print(f"Warning: Error processing SMILES in line {line_num}: {e}")
-                    continue
-    
+        conn = store or result_store.open_store(os.getcwd(), canonicalize=canonicalize_smiles)
+        try:
+            return result_store.get(conn, monomer_smiles)
+        finally:
+            if store is None:
+                conn.close()
     except Exception as e:
-        print(f"Error reading result.txt: {e}")
+        print(f"Error reading result store: {e}")
         return None
-    
-    return None
 
 def display_existing_result(result_data):
     """
@@ -605,23 +579,19 @@ def save_solvent_smiles(smiles, folder="Solution/solvent", filename="solvent.smi
     except Exception as e:
         print(f"Error saving solvent SMILES: {e}")
 
-def run_simulation(name_file_path, monomer_smiles, solvent_smiles):
+def run_simulation(name_file_path, monomer_smiles, solvent_smiles, resume=False):
     set_dir = os.path.dirname(name_file_path)
-    py_path = os.path.abspath(os.path.join(set_dir, "../Util/Util_Polymer_combine.py"))
-
-    if not os.path.isfile(py_path):
-        print(f"Error: Python script not found at {py_path}")
-        return
 
+    # Monomer activation runs in-process (RDKit reaction on the canonical SMILES)
     try:
-        subprocess.run(["python3", py_path], cwd=set_dir, check=True)
+        polymer_combine.combine(set_dir)
         print("Initial simulation (combine) executed successfully.")
-    except subprocess.CalledProcessError as e:
+    except Exception as e:
         print(f"Error during initial simulation execution: {e}")
 
-    copy_structures_to_targets(set_dir, monomer_smiles, solvent_smiles)
+    copy_structures_to_targets(set_dir, monomer_smiles, solvent_smiles, resume)
 
-def copy_structures_to_targets(set_dir, monomer_smiles, solvent_smiles):
+def copy_structures_to_targets(set_dir, monomer_smiles, solvent_smiles, resume=False):
     source = os.path.join(set_dir, "structures")
     if not os.path.exists(source):
         print(f"Source directory {source} does not exist. Skipping copy.")
@@ -658,10 +628,70 @@ def copy_structures_to_targets(set_dir, monomer_smiles, solvent_smiles):
         except Exception as e:
             print(f"Failed to write structure filenames: {e}")
 
-    run_final_stretch(base_dir)
-    run_final_solution(base_dir, monomer_smiles, solvent_smiles)
+    # Stretched and Solution share no state after the structure copy: run them
+    # concurrently on disjoint core budgets and join before collecting results.
+    stretch_cpus, solution_cpus = split_core_budget(candidate_cpus(), stretched_core_share())
+    print(f"Core budget: Stretched {format_cpu_list(stretch_cpus)}, Solution {format_cpu_list(solution_cpus)}")
 
-def run_final_stretch(base_dir):
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        stretch_job = pool.submit(run_final_stretch, base_dir, stretch_cpus, resume)
+        solution_job = pool.submit(run_final_solution, base_dir, solution_cpus, resume)
+        stretch_job.result()
+        solution_job.result()
+
+    print_interaction_energies(base_dir, monomer_smiles, solvent_smiles)
+
+# === Core Budgeting ===
+
+def format_cpu_list(cpus):
+    return ",".join(str(cpu) for cpu in cpus)
+
+def candidate_cpus():
+    """
+    CPUs available to the current candidate.
+
+    Batch workers receive their slice through ARAMIDSIM_CPUS; otherwise the process
+    affinity mask (or all cores) is used.
+    """
+    env_cpus = os.environ.get("ARAMIDSIM_CPUS")
+    if env_cpus:
+        try:
+            return [int(cpu) for cpu in env_cpus.split(",") if cpu.strip()]
+        except ValueError:
+            print(f"Warning: Invalid ARAMIDSIM_CPUS '{env_cpus}', using all cores")
+
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def stretched_core_share():
+    try:
+        share = float(os.environ.get("ARAMIDSIM_STRETCHED_SHARE", DEFAULT_STRETCHED_CORE_SHARE))
+    except ValueError:
+        share = DEFAULT_STRETCHED_CORE_SHARE
+    return min(max(share, 0.0), 1.0)
+
+def split_core_budget(cpus, share):
+    """
+    Split a CPU list into (Stretched, Solution) budgets according to share.
+
+    Each side always gets at least one CPU; with a single CPU both sides share it.
+    """
+    if len(cpus) < 2:
+        return list(cpus), list(cpus)
+    n_stretch = min(max(round(len(cpus) * share), 1), len(cpus) - 1)
+    return list(cpus[:n_stretch]), list(cpus[n_stretch:])
+
+def core_budget_env(cpus):
+    """
+    Environment for a pipeline subprocess restricted to the given CPUs
+    """
+    env = os.environ.copy()
+    env["ARAMIDSIM_CPUS"] = format_cpu_list(cpus)
+    env["ARAMIDSIM_NPROCS"] = str(len(cpus))
+    return env
+
+def run_final_stretch(base_dir, cpus=None, resume=False):
     stretch_dir = os.path.join(base_dir, "Stretched")
     py_path = os.path.abspath(os.path.join(stretch_dir, "../Util/Util_Polymer_run_Stretched.py"))
 
@@ -669,13 +699,15 @@ def run_final_stretch(base_dir):
         print(f"Error: Final stretching Python script not found at {py_path}")
         return
 
+    env = core_budget_env(cpus) if cpus else None
     try:
-        subprocess.run(["python3", py_path], cwd=stretch_dir, check=True)
+        # --resume: continue an interrupted LAMMPS run of the same candidate from its checkpoint
+        subprocess.run(["python3", py_path] + (["--resume"] if resume else []), cwd=stretch_dir, check=True, env=env)
         print("Final stretching simulation executed successfully.")
     except subprocess.CalledProcessError as e:
         print(f"Error during final stretching simulation: {e}")
 
-def run_final_solution(base_dir, monomer_smiles, solvent_smiles):
+def run_final_solution(base_dir, cpus=None, resume=False):
     solution_dir = os.path.join(base_dir, "Solution")
     py_path = os.path.abspath(os.path.join(solution_dir, "../Util/Util_Polymer_run_Solution.py"))
 
@@ -683,14 +715,13 @@ def run_final_solution(base_dir, monomer_smiles, solvent_smiles):
         print(f"Error: Final solution Python script not found at {py_path}")
         return
 
+    env = core_budget_env(cpus) if cpus else None
     try:
-        subprocess.run(["python3", py_path], cwd=solution_dir, check=True)
+        subprocess.run(["python3", py_path] + (["--resume"] if resume else []), cwd=solution_dir, check=True, env=env)
         print("Final solution simulation executed successfully.")
     except subprocess.CalledProcessError as e:
         print(f"Error during final solution simulation: {e}")
 
-    print_interaction_energies(base_dir, monomer_smiles, solvent_smiles)
-
 # === Analysis Functions ===
 
 def read_lammps_data(filename):
@@ -884,9 +915,39 @@ def read_last_energy(filepath):
         print(f"Error reading {filepath}: {e}")
     return None
 
+def read_series_stats(run_dir):
+    """
+    Read stats.json written by the Util_Polymer_Output_*.py scripts
+    
+    Args:
+        run_dir (str): LAMMPS run directory (e.g. ./Stretched/lammps/monomer_0)
+        
+    Returns:
+        dict: Metric name -> {mean, sem, tau, n_eff, ...}, empty if unavailable
+    """
+    stats_path = os.path.join(run_dir, "stats.json")
+    try:
+        with open(stats_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def read_result_stats(base_dir):
+    """
+    Collect the Stretched and Solution series statistics of one candidate
+    
+    Returns:
+        dict: {"stretched": {...}, "solution": {...}}
+    """
+    return {
+        "stretched": read_series_stats(os.path.join(base_dir, "Stretched", "lammps", "monomer_0")),
+        "solution": read_series_stats(os.path.join(base_dir, "Solution", "lammps", "monomer_0")),
+    }
+
 def read_stretched_data(base_dir):
     """
     Read all required data from Stretched directory
+    Uses the equilibrated mean from stats.json, falling back to the last sample
     
     Args:
         base_dir (str): Base directory path
@@ -895,6 +956,7 @@ def read_stretched_data(base_dir):
         dict: Dictionary containing data from each file
     """
     stretched_dir = os.path.join(base_dir, "Stretched", "lammps", "monomer_0")
+    stats = read_series_stats(stretched_dir)
     
     data_files = {
         'stretched_interE': 'output1.txt',
@@ -906,6 +968,9 @@ def read_stretched_data(base_dir):
     results = {}
     
     for key, filename in data_files.items():
+        if key in stats:
+            results[key] = stats[key]["mean"]
+            continue
         filepath = os.path.join(stretched_dir, filename)
         value = read_last_energy(filepath)
         results[key] = value
@@ -940,9 +1005,14 @@ def print_interaction_energies(base_dir, monomer_smiles, solvent_smiles):
     # Read Stretched data
     stretched_data = read_stretched_data(base_dir)
     
-    # Read Solution data (maintain existing approach)
-    solution_ehbond = os.path.join(base_dir, "Solution", "E_h_bond.txt")
-    solution_value = read_first_energy(solution_ehbond)  # Use existing function
+    # Read Solution data: equilibrated mean, falling back to E_h_bond.txt
+    result_stats = read_result_stats(base_dir)
+    solution_stats = result_stats["solution"].get("e_inter_chain_solvent")
+    if solution_stats is not None:
+        solution_value = solution_stats["mean"]
+    else:
+        solution_ehbond = os.path.join(base_dir, "Solution", "E_h_bond.txt")
+        solution_value = read_first_energy(solution_ehbond)  # Use existing function
     
     # Display 5 values in cmd window (maintain existing format)
     stretched_display = f"{stretched_data['stretched_interE']}" if stretched_data['stretched_interE'] is not None else "N/A"
@@ -957,6 +1027,13 @@ def print_interaction_energies(base_dir, monomer_smiles, solvent_smiles):
     print(f"H-bond interE [kcal/(mol·A^3)] : {hbond_interE_display}")
     print(f"Solution interE [kcal/(mol·A^3)] : {solution_display}")
     
+    # Error bars of the equilibrated means (standard error, effective sample size)
+    for label, stats in (("Stretched", result_stats["stretched"].get("stretched_interE")),
+                         ("Solution", solution_stats)):
+        if stats is not None:
+            print(f"{label} interE SEM : {stats['sem']:.2g} (n_eff = {stats['n_eff']:.0f}, "
+                  f"equilibrated from step {stats['equilibration_step']})")
+    
     # Convert each value to string for result.txt (handle None cases as "N/A")
     stretched_interE = f"{stretched_data['stretched_interE']:.6f}" if stretched_data['stretched_interE'] is not None else "N/A"
     hbond_count = f"{stretched_data['hbond_count']:.6f}" if stretched_data['hbond_count'] is not None else "N/A"
@@ -977,6 +1054,14 @@ def print_interaction_energies(base_dir, monomer_smiles, solvent_smiles):
         print(f"Results saved to {result_relative_path}")
     except Exception as e:
         print(f"Error writing to result.txt: {e}")
+
+    # Record in the indexed result store
+    try:
+        conn = result_store.open_store(os.getcwd(), canonicalize=canonicalize_smiles)
+        result_store.put_line(conn, monomer_smiles, result_line, stats=result_stats)
+        conn.close()
+    except Exception as e:
+        print(f"Error writing to result store: {e}")
     
     # Generate analysis plots - only pass monomer SMILES
     plot_path = run_analysis(monomer_smiles=monomer_smiles, solvent_smiles=None)
@@ -985,7 +1070,226 @@ def print_interaction_energies(base_dir, monomer_smiles, solvent_smiles):
     else:
         print("Error: Could not generate analysis plots.")
 
+# === Batch Screening ===
+
+def read_smiles_list(list_path):
+    """
+    Read a SMILES list file (one SMILES per line, first column, '#' comments allowed)
+
+    Args:
+        list_path (str): Path to the SMILES list file
+
+    Returns:
+        list: SMILES strings in file order
+    """
+    smiles_list = []
+    with open(list_path, 'r') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                smiles_list.append(line.split()[0])
+    return smiles_list
+
+def batch_work_name(index, canonical):
+    """
+    Work directory name of a batch candidate: list position plus a hash of the canonical
+    SMILES (sanitize_filename is not injective, e.g. for E/Z isomers or long SMILES)
+    """
+    return f"{index:05d}_{hashlib.sha1(canonical.encode()).hexdigest()[:12]}"
+
+def prepare_workspace(root_dir, work_dir, created):
+    """
+    Create an isolated work directory for one batch candidate.
+
+    The Stretched/ and Solution/ templates are copied and Util/ is linked, so the
+    relative paths used by the Util run scripts resolve as they do in the repository root.
+    An existing directory is only replaced if it is in created (made by this batch);
+    any other one may belong to a running worker and raises FileExistsError.
+    """
+    if os.path.exists(work_dir):
+        if work_dir not in created:
+            raise FileExistsError(f"work directory {work_dir} was not created by this batch")
+        shutil.rmtree(work_dir)
+    os.makedirs(work_dir)
+    created.add(work_dir)
+
+    for target in WORKSPACE_TEMPLATES:
+        shutil.copytree(os.path.join(root_dir, target), os.path.join(work_dir, target),
+                        ignore=WORKSPACE_IGNORE)
+    os.symlink(os.path.join(root_dir, "Util"), os.path.join(work_dir, "Util"))
+
+def init_batch_worker(cpu_slots):
+    """
+    Pool initializer: claim one CPU slot so concurrent candidates use disjoint cores
+    """
+    try:
+        os.environ["ARAMIDSIM_CPUS"] = cpu_slots.get(timeout=5)
+    except queue.Empty:
+        print(f"Warning: Batch worker {os.getpid()} got no CPU slot; "
+              "its candidates may share cores with other workers")
+
+def run_batch_candidate(work_dir, canonical, solvent_canonical):
+    """
+    Run the full pipeline for one candidate inside its own work directory (worker process)
+
+    Returns:
+        tuple: (canonical SMILES, result.txt line or None, plot path or None, series statistics)
+    """
+    # Worker processes must never block on an interactive figure window
+    plt.switch_backend("Agg")
+    os.chdir(work_dir)
+
+    clean_set_directory()
+    clean_stretched_directory()
+    clean_solution_directory()
+
+    name_file_path = save_smiles(canonical)
+    if not name_file_path:
+        return canonical, None, None, None
+    save_solvent_smiles(solvent_canonical)
+    save_polymer_config(get_polymer_configuration())
+
+    run_simulation(name_file_path, canonical, solvent_canonical)
+
+    result_line = None
+    result_file_path = os.path.join(work_dir, "result.txt")
+    if os.path.exists(result_file_path):
+        with open(result_file_path, 'r') as f:
+            lines = [line.strip() for line in f if line.strip()]
+        if lines:
+            result_line = lines[-1]
+
+    plot_path = None
+    for filename in (f"{canonical}.png", f"{sanitize_filename(canonical)}.png"):
+        candidate_plot = os.path.join(work_dir, "Result_plot", filename)
+        if os.path.exists(candidate_plot):
+            plot_path = candidate_plot
+            break
+
+    return canonical, result_line, plot_path, read_result_stats(work_dir)
+
+def run_batch(list_path, workers=None, rerun=False):
+    """
+    Non-interactive screening of a SMILES list on a worker pool.
+
+    Every candidate runs in ./work/<batch start time>/<index>_<SMILES hash>/ so concurrent
+    runs never share the Stretched/, Solution/ or set/ trees. Results are appended to ./result.txt as each
+    candidate finishes.
+
+    Args:
+        list_path (str): SMILES list file
+        workers (int): Number of concurrent candidates (default: number of CPU cores)
+        rerun (bool): Re-run candidates that already have a result
+    """
+    root_dir = os.getcwd()
+    solvent_canonical = canonicalize_smiles(FIXED_SOLVENT_SMILES)
+    if solvent_canonical is None:
+        print(f"Error: Fixed solvent SMILES '{FIXED_SOLVENT_SMILES}' is invalid!")
+        return
+
+    try:
+        smiles_list = read_smiles_list(list_path)
+    except OSError as e:
+        print(f"Error reading SMILES list {list_path}: {e}")
+        return
+
+    store = result_store.open_store(root_dir, canonicalize=canonicalize_smiles)
+    candidates = []
+    seen = set()
+    for smiles in smiles_list:
+        canonical = canonicalize_smiles(smiles)
+        if canonical is None:
+            print(f"Skipping invalid monomer SMILES: {smiles}")
+            continue
+        if canonical in seen:
+            continue
+        seen.add(canonical)
+        if not rerun and check_existing_result(canonical, solvent_canonical, store=store):
+            print(f"Skipping {canonical}: result already in the result store")
+            continue
+        candidates.append(canonical)
+
+    if not candidates:
+        print("No candidates to simulate.")
+        store.close()
+        return
+
+    if workers is None or workers < 1:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(candidates))
+    print(f"Batch screening {len(candidates)} candidates on {workers} workers")
+
+    result_file_path = os.path.join(root_dir, "result.txt")
+    plot_dir = os.path.join(root_dir, "Result_plot")
+
+    # One disjoint CPU slice per worker; each candidate splits its slice between
+    # the Stretched and Solution pipelines
+    all_cpus = candidate_cpus()
+    cpu_slots = multiprocessing.Queue()
+    for i in range(workers):
+        slot = all_cpus[i * len(all_cpus) // workers:(i + 1) * len(all_cpus) // workers]
+        cpu_slots.put(format_cpu_list(slot or [all_cpus[i % len(all_cpus)]]))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_batch_worker,
+                             initargs=(cpu_slots,)) as pool:
+        futures = {}
+        # A fresh parent per batch: work directories of earlier batches are never touched
+        batch_dir = os.path.join(root_dir, BATCH_WORK_DIR, time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}")
+        created = set()
+        for index, canonical in enumerate(candidates):
+            work_dir = os.path.join(batch_dir, batch_work_name(index, canonical))
+            try:
+                prepare_workspace(root_dir, work_dir, created)
+            except OSError as e:
+                print(f"Candidate {canonical} skipped: {e}")
+                continue
+            futures[pool.submit(run_batch_candidate, work_dir, canonical, solvent_canonical)] = canonical
+
+        for future in as_completed(futures):
+            canonical = futures[future]
+            try:
+                _, result_line, plot_path, stats = future.result()
+            except Exception as e:
+                print(f"Candidate {canonical} failed: {e}")
+                continue
+
+            if result_line is None:
+                print(f"Candidate {canonical} finished without a result")
+                continue
+
+            with open(result_file_path, "a") as f:
+                f.write(result_line + "\n")
+            result_store.put_line(store, canonical, result_line, stats=stats)
+            print(f"Result saved for {canonical}: {result_line}")
+
+            if plot_path:
+                os.makedirs(plot_dir, exist_ok=True)
+                shutil.copy(plot_path, os.path.join(plot_dir, os.path.basename(plot_path)))
+
+    store.close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="AramidSim DCA simulation interface")
+    parser.add_argument("--batch", metavar="SMILES_FILE",
+                        help="Run every DCA SMILES in SMILES_FILE non-interactively")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Concurrent candidates in batch mode (default: number of CPU cores)")
+    parser.add_argument("--rerun", action="store_true",
+                        help="Re-run candidates that already have a result in batch mode")
+    parser.add_argument("--stretched-share", type=float, default=None,
+                        help="Fraction of each candidate's cores given to the Stretched pipeline "
+                             f"(default: {DEFAULT_STRETCHED_CORE_SHARE})")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    if args.stretched_share is not None:
+        os.environ["ARAMIDSIM_STRETCHED_SHARE"] = str(args.stretched_share)
+
+    if args.batch:
+        run_batch(args.batch, workers=args.workers, rerun=args.rerun)
+        return
+
     # Get canonical form of the fixed solvent
     solvent_canonical = canonicalize_smiles(FIXED_SOLVENT_SMILES)
     if solvent_canonical is None:
@@ -997,11 +1301,6 @@ def main():
         if smiles_input.lower() == 'q':
             break
         
-        # Clean directories before processing new SMILES
-        clean_set_directory()
-        clean_stretched_directory()
-        clean_solution_directory()
-
         canonical = canonicalize_smiles(smiles_input)
 
         if canonical is None:
@@ -1023,6 +1322,17 @@ def main():
             else:
                 print("\nRe-running simulation as requested...")
         
+        # Clean directories before processing new SMILES. The state of an unfinished run of
+        # the same candidate is kept (finished steps skipped, LAMMPS resumed), except on a re-run.
+        candidate = f"{canonical} {solvent_canonical}"
+        keep = None if existing_result else candidate
+        resume = keep is not None and all(pipeline_candidate(os.path.join(os.getcwd(), target)) == candidate
+                                          for target in WORKSPACE_TEMPLATES)
+        clean_set_directory()
+        clean_stretched_directory(keep)
+        clean_solution_directory(keep)
+        record_candidate(candidate)
+
         name_file_path = save_smiles(canonical)
         if not name_file_path:
             continue
@@ -1033,7 +1343,7 @@ def main():
         if not save_polymer_config(polymer_config):
             print("Failed to save polymer configuration. Continuing anyway...")
         
-        run_simulation(name_file_path, canonical, solvent_canonical)
+        run_simulation(name_file_path, canonical, solvent_canonical, resume=resume)
 
 if __name__ == "__main__":
     main()
@@ -1,17 +1,9 @@
 #!/usr/bin/env python
-with open('system.data', 'r') as f:
-    lines = f.readlines()
+import os
+import sys
 
-start = False
-with open('system_group.data', 'w') as f:
-    for line in lines:
-        parts = line.split()
-        if 'Atoms  # full' in line:
-            start = True
-            f.write(line)
-        elif start and len(parts) == 7:  # Assuming you have atom-ID, molecule-ID, atom-type, charge, x, y, and z
-            parts[1] = '1'  # replace the molecule-ID with your new tag
-            f.write(' '.join(parts) + '\n')
-        else:
-            f.write(line)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Util"))
+from Util_lammps_data import rewrite_column
 
+# Tag every polymer atom with the same molecule-ID so it can be grouped by molecule
+rewrite_column('system.data', 'system_group.data', 'Atoms', 'mol', 1)
@@ -1,20 +1,15 @@
+import os
 import sys
 
-a1 = open(sys.argv[1], 'r').readlines()
-index = [0, 0, 0]
-for i in range(len(a1)):
-    if '@<TRIPOS>ATOM' in a1[i]:
-        index[0] = i
-    if '@<TRIPOS>BOND' in a1[i]:
-        index[1] = i
-    if '@<TRIPOS>SUBSTRUCTURE' in a1[i]:
-        index[2] = i
-a = a1[index[0] + 1:index[1]]
-cation = [
-    [a[i].split()[5], float(a[i].split()[-1]), float(a[i].split()[2]), float(a[i].split()[3]), float(a[i].split()[4])]
-    for i in range(len(a))]
-a = a1[index[1] + 1:index[2]]
-cation_bond = [[i.split()[1], i.split()[2]] for i in a]
+# MOL2 parsing is shared with the monomer-preparation scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Util"))
+from Util_mol2 import read_mol2
+
+mol = read_mol2(sys.argv[1])
+atoms = mol.atoms
+cation = [list(atom) for atom in zip(atoms["type"].tolist(), atoms["charge"].tolist(),
+                                     atoms["x"].tolist(), atoms["y"].tolist(), atoms["z"].tolist())]
+cation_bond = [[str(a1), str(a2)] for a1, a2 in zip(mol.bonds["atom1"].tolist(), mol.bonds["atom2"].tolist())]
 
 a = open(sys.argv[2], 'w')
 print('import "gaff.lt"', file=a)
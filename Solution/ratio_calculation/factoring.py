@@ -1,28 +1,41 @@
 #!/usr/bin/env python
 import math
 
-# Open the file and read the number of solvent molecules
-with open('number_solvent.txt', 'r') as file:
-    num_solvent = int(file.readline())
-
-# Start with the cubic root of the number of solvent molecules
-start = round(num_solvent ** (1/3))
-
-# Try to find three factors
-for i in range(start, 0, -1):
-    if num_solvent % i == 0:
-        temp = num_solvent // i
-        for j in range(start, 0, -1):
-            if temp % j == 0:
-                k = temp // j
-                factors = [i, j, k]
+
+def three_factors(num_solvent):
+    """Split num_solvent into three factors close to its cubic root, in descending order."""
+    # Start with the cubic root of the number of solvent molecules
+    start = round(num_solvent ** (1/3))
+
+    # Try to find three factors
+    factors = None
+    for i in range(start, 0, -1):
+        if num_solvent % i == 0:
+            temp = num_solvent // i
+            for j in range(start, 0, -1):
+                if temp % j == 0:
+                    k = temp // j
+                    factors = [i, j, k]
+                    break
+            if factors is not None:
                 break
-        if 'factors' in locals():
-            break
 
-# Sort the factors in descending order
-factors.sort(reverse=True)
+    if factors is None:
+        raise ValueError(f"Cannot factor number of solvent molecules: {num_solvent}")
+
+    # Sort the factors in descending order
+    factors.sort(reverse=True)
+    return factors
+
+
+def write_factors(factors, path='factors.txt'):
+    with open(path, 'w') as file:
+        file.write(' '.join(map(str, factors)) + '\n')
+
+
+if __name__ == "__main__":
+    # Open the file and read the number of solvent molecules
+    with open('number_solvent.txt', 'r') as file:
+        num_solvent = int(file.readline())
 
-# Open a new file and write the factors
-with open('factors.txt', 'w') as file:
-    file.write(' '.join(map(str, factors)) + '\n')
+    write_factors(three_factors(num_solvent))
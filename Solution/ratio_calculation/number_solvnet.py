@@ -1,7 +1,17 @@
 #!/usr/bin/env python
-# Open the files and read the masses
-with open('extracted_mass.txt', 'r') as file:
-    mass_A = float(file.readline())
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Util"))
+from Util_lammps_data import total_mass
+
+from factoring import three_factors, write_factors
+
+# Polymer mass straight from the moltemplate data file
+polymer_data = sys.argv[1] if len(sys.argv) > 1 else '../moltemplates/system.data'
+mass_A = total_mass(polymer_data)
+
+# Solvent mass computed once by the (cached) solvent build
 with open('extracted_solvent_mass.txt', 'r') as file:
     mass_B = float(file.readline())
 
@@ -14,4 +24,4 @@ print(num_solvent)
 with open('number_solvent.txt', 'w') as file:
     file.write(str(num_solvent) + '\n')
 
-
+write_factors(three_factors(num_solvent))
@@ -1,41 +1,17 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import sys
-
-def read_last_y(filename: str, missing_label: str) -> float:
-    try:
-        with open(filename, "r") as f:
-            tokens = f.read().split()
-    except OSError:
-        sys.stderr.write(f"{missing_label} could not be opened\n")
-        sys.exit(1)
-
-    # Skip first 9 tokens (header)
-    data_tokens = tokens[9:] if len(tokens) > 9 else []
-
-    # Parse numeric pairs until failure
-    pairs = []
-    it = iter(data_tokens)
-    while True:
-        try:
-            a = next(it)
-            b = next(it)
-        except StopIteration:
-            break
-        try:
-            x = float(a)  # kept for parity with C++ but unused
-            y = float(b)
-        except ValueError:
-            # Emulate stream extraction failure (stop reading pairs)
-            break
-        pairs.append((x, y))
-
-    # In the original C++, if there are no valid pairs this would lead to
-    # undefined indexing. Here we raise a clear error to avoid silent failure.
-    if not pairs:
-        raise RuntimeError(f"{missing_label}: no numeric (x, y) pairs after header")
-
-    return pairs[-1][1]
+from Util_timeseries import file_statistics, write_statistics
+
+# fix ave/time files of run_iso.in.npt2_wo_strain_pppm
+METRIC_FILES = {
+    "e_inter_chain_solvent": "output1.txt",
+    "e_inter_chain_chain": "output2.txt",
+    "e_inter_solvent_solvent": "output3.txt",
+    "volume": "output4.txt",
+    "density": "output5.txt",
+}
+# Metrics written to output_all.txt, in column order
+OUTPUT_METRICS = ["e_inter_chain_solvent", "e_inter_chain_chain", "e_inter_solvent_solvent", "volume"]
 
 
 def fmt(v: float) -> str:
@@ -44,12 +20,14 @@ def fmt(v: float) -> str:
 
 
 def main() -> None:
-    y2 = read_last_y("output1.txt", "inputFile1")  # dis2 from output1.txt
-    y1 = read_last_y("output2.txt", "inputFile2")  # dis1 from output2.txt
-    y3 = read_last_y("output3.txt", "inputFile3")
-    y4 = read_last_y("output4.txt", "inputFile4")
-
-    line = f"{fmt(y2)}    {fmt(y1)}    {fmt(y3)}    {fmt(y4)}    \n"
+    # Equilibrated mean, standard error, autocorrelation time and n_eff of every series
+    stats = file_statistics(METRIC_FILES)
+    for number, metric in enumerate(OUTPUT_METRICS, 1):
+        if metric not in stats:
+            raise RuntimeError(f"inputFile{number}: no numeric (x, y) pairs after header")
+    write_statistics(stats, "stats.json")
+
+    line = "".join(f"{fmt(stats[metric]['mean'])}    " for metric in OUTPUT_METRICS) + "\n"
     with open("output_all.txt", "w") as out:
         out.write(line)
 
@@ -2,57 +2,34 @@
 # -*- coding: utf-8 -*-
 import sys
 
-def read_last_y(filename: str, missing_label: str) -> float:
-    try:
-        with open(filename, "r") as f:
-            tokens = f.read().split()
-    except OSError:
-        sys.stderr.write(f"{missing_label} could not be opened\n")
-        sys.exit(1)
-
-    # Skip the first 9 tokens (equivalent to 6 + 3 extractions in C++)
-    if len(tokens) <= 9:
-        sys.stderr.write(f"{missing_label} has insufficient tokens after header\n")
-        sys.exit(1)
-    data_tokens = tokens[9:]
-
-    # Read numeric pairs (x, y) until encountering non-numeric content
-    pairs = []
-    it = iter(data_tokens)
-    while True:
-        try:
-            a = next(it)
-            b = next(it)
-        except StopIteration:
-            break
-        try:
-            x = float(a)  # noqa: F841 (x is unused; kept for parity with C++)
-            y = float(b)
-        except ValueError:
-            # C++ >> extraction would fail here and break out of the loop
-            break
-        pairs.append((x, y))
-
-    if not pairs:
-        sys.stderr.write(f"{missing_label} has no numeric data after header\n")
-        sys.exit(1)
-
-    # Return the last y-value (equivalent to disX[naX-1][1] in the C++ code)
-    return pairs[-1][1]
+from Util_timeseries import file_statistics, write_statistics
+
+# fix ave/time files of run.in.npt2_pppm
+METRIC_FILES = {
+    "stretched_interE": "output1.txt",
+    "hbond_count": "output2.txt",
+    "pi_stacking_energy": "output3.txt",
+    "hbond_interE": "output4.txt",
+    "density": "output5.txt",
+}
+# Metrics written to output_all.txt, in column order
+OUTPUT_METRICS = ["stretched_interE", "hbond_count", "pi_stacking_energy", "hbond_interE"]
 
 
 def main() -> None:
-    # Map input files to their "inputFileN" labels for C++-style error messages
-    y2 = read_last_y("output1.txt", "inputFile1")  # corresponds to dis2 in C++
-    y1 = read_last_y("output2.txt", "inputFile2")  # corresponds to dis1 in C++
-    y3 = read_last_y("output3.txt", "inputFile3")
-    y4 = read_last_y("output4.txt", "inputFile4")
+    # Equilibrated mean, standard error, autocorrelation time and n_eff of every series
+    stats = file_statistics(METRIC_FILES)
+    for number, metric in enumerate(OUTPUT_METRICS, 1):
+        if metric not in stats:
+            sys.stderr.write(f"inputFile{number} has no numeric data after header\n")
+            sys.exit(1)
+    write_statistics(stats, "stats.json")
 
     # Mimic default C++ iostream formatting (precision = 6, general format)
     def fmt(v: float) -> str:
         return f"{v:.6g}"
 
-    line = f"{fmt(y2)}    {fmt(y1)}    {fmt(y3)}    {fmt(y4)}\n"
+    line = "    ".join(fmt(stats[metric]["mean"]) for metric in OUTPUT_METRICS) + "\n"
     with open("output_all.txt", "w") as out:
         out.write(line)
 
@@ -1,169 +1,123 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-
-import subprocess
+"""
+Activate the monomers of name.txt (one canonical dicarboxylic-acid SMILES per line) for
+the aramid build: the first -COOH becomes an amide with p-phenylenediamine (PPD) and the
+next -COOH an acid chloride. The results are written to structures/monomer_<i>.smi and
+their names to name_list.txt.
+
+The activation is an RDKit reaction on the SMILES (no 3D embedding, no obabel). The
+amidated site is the -COOH whose carbon comes first in the atom order of the SMILES, the
+group Util_monomer_matching placed first in the obabel-based build. That build then
+rewrote the SMILES written by obabel with string patterns, which for some asymmetric
+acids amidated the other group; the site now follows the atom order only.
+
+Usage (in the set directory):
+    python Util_Polymer_combine.py
+    python Util_Polymer_combine.py --check      site selection on asymmetric acids
+"""
+import sys
 from pathlib import Path
 
-def run(cmd: str):
-    try:
-        return subprocess.run(cmd, shell=True)
-    except Exception:
+from rdkit import Chem, RDLogger
+from rdkit.Chem import AllChem
+
+# -COOH -> -C(=O)NH-C6H4-NH2 (PPD), then -COOH -> -C(=O)Cl
+AMIDATION = AllChem.ReactionFromSmarts("[CX3:1](=[OX1:2])[OX2H1]>>[C:1](=[O:2])Nc1ccc(N)cc1")
+CHLORINATION = AllChem.ReactionFromSmarts("[CX3:1](=[OX1:2])[OX2H1]>>[C:1](=[O:2])Cl")
+
+
+# Monomer SMILES -> expected activated SMILES (amide on the first -COOH carbon in atom
+# order), checked by --check. The first two are one asymmetric acid written in both atom
+# orders (the second is the canonical SMILES name.txt holds), so they pick opposite ends.
+ACTIVATION_CHECKS = {
+    "CC(C(=O)O)CC(=O)O": "CC(CC(=O)Cl)C(=O)Nc1ccc(N)cc1",
+    "CC(CC(=O)O)C(=O)O": "CC(C(=O)Cl)CC(=O)Nc1ccc(N)cc1",
+    "O=C(O)c1ccc(C(=O)O)cc1": "Nc1ccc(NC(=O)c2ccc(C(=O)Cl)cc2)cc1",
+}
+
+
+def reacted_carbon(product):
+    """Reactant index of the carbonyl carbon (map number 1) of a reaction product."""
+    for atom in product.GetAtoms():
+        if atom.HasProp("old_mapno") and atom.GetIntProp("old_mapno") == 1:
+            return atom.GetIntProp("react_atom_idx")
+    return None
+
+
+def react_first(mol, reaction):
+    """
+    Apply reaction at the matching site whose carbon has the lowest atom index (the
+    first -COOH in atom order); mol if none matches.
+    """
+    products = [product[0] for product in reaction.RunReactants((mol,))]
+    if not products:
+        return mol
+    product = min(products, key=reacted_carbon)
+    Chem.SanitizeMol(product)
+    return product
+
+
+def activate_monomer(smiles):
+    """
+    Amidate the first -COOH of smiles with PPD and turn the next one into -COCl.
+
+    Returns:
+        str or None: Canonical SMILES of the activated monomer (None if smiles is invalid)
+    """
+    mol = Chem.MolFromSmiles(smiles)
+    if mol is None:
         return None
+    mol = react_first(mol, AMIDATION)
+    mol = react_first(mol, CHLORINATION)
+    return Chem.MolToSmiles(mol, isomericSmiles=True)
 
-def main():
-    namelist_path = Path("name.txt")
+
+def combine(work_dir="."):
+    """Activate every monomer of <work_dir>/name.txt into <work_dir>/structures/."""
+    work_dir = Path(work_dir)
+    namelist_path = work_dir / "name.txt"
     if not namelist_path.exists():
         print("Unable to open file")
         return
 
+    RDLogger.DisableLog('rdApp.*')
     names = [line.rstrip("\n") for line in namelist_path.open("r") if line.strip()]
 
-    ikik = 0
-    with Path("name_list.txt").open("w") as name_list_out:
-        for name in names:
-            Path("test_back.smi").write_text(name + "\n")
-            run("cp test_back.smi test.smi")
-            run("taskset --cpu-list 0 obabel -ismi test.smi -omol2 --gen3d --partialcharge eem -O monomer.mol2")
-            run("python ../Util/Util_monomer_matching.py")
-            run("taskset --cpu-list 0 obabel -imol2 monomer_reorder.mol2 -osmi -O test2.smi")
-            system1, system2 = "", ""
-            if Path("test2.smi").exists():
-                tokens = Path("test2.smi").read_text().split()
-                if len(tokens) >= 1:
-                    system1 = tokens[0]
-                if len(tokens) >= 2:
-                    system2 = tokens[1]
-
-            # Replace patterns (-COOH modifications)
-            result_smiles = system1
-            diamine_substitute = "(NC8=CC=C(N)C=C8)"
-
-            # --- Step 1: Replace -COOH oxygen with diamine substitute ---
-            cooh_replaced = False
-
-            # Pattern 1: C(=O)O -> C(=O)[diamine]
-            pos = result_smiles.find("C(=O)O")
-            if pos != -1:
-                result_smiles = (
-                    result_smiles[:pos + 5]
-                    + diamine_substitute
-                    + result_smiles[pos + 5 + 1 :]
-                )
-                cooh_replaced = True
-
-            # Pattern 2: C(O)=O -> C([diamine])=O
-            if not cooh_replaced:
-                pos = result_smiles.find("C(O)=O")
-                if pos != -1:
-                    result_smiles = (
-                        result_smiles[:pos + 2]
-                        + diamine_substitute
-                        + result_smiles[pos + 2 + 1 :]
-                    )
-                    cooh_replaced = True
-
-            # Pattern 3: OC(=O) -> [diamine]C(=O)
-            if not cooh_replaced:
-                pos = result_smiles.find("OC(=O)")
-                if pos != -1:
-                    result_smiles = (
-                        result_smiles[:pos]
-                        + diamine_substitute
-                        + result_smiles[pos + 1 :]
-                    )
-                    cooh_replaced = True
-
-            # Pattern 4: O=C(O) -> O=C([diamine])
-            if not cooh_replaced:
-                pos = result_smiles.find("O=C(O)")
-                if pos != -1:
-                    result_smiles = (
-                        result_smiles[:pos + 4]
-                        + diamine_substitute
-                        + result_smiles[pos + 4 + 1 :]
-                    )
-                    cooh_replaced = True
-
-            # Pattern 5: C(=O)(O) -> C(=O)([diamine])
-            if not cooh_replaced:
-                pos = result_smiles.find("C(=O)(O)")
-                if pos != -1:
-                    result_smiles = (
-                        result_smiles[:pos + 6]
-                        + diamine_substitute
-                        + result_smiles[pos + 6 + 1 :]
-                    )
-                    cooh_replaced = True
-
-            # --- Step 2: Replace remaining -COOH oxygen with Cl ---
-            cooh_cl_replaced = False
-
-            # Pattern 1: C(=O)O -> C(=O)Cl
-            pos = result_smiles.find("C(=O)O")
-            if pos != -1:
-                result_smiles = (
-                    result_smiles[:pos + 5]
-                    + "Cl"
-                    + result_smiles[pos + 5 + 1 :]
-                )
-                cooh_cl_replaced = True
-
-            # Pattern 2: C(O)=O -> C(Cl)=O
-            if not cooh_cl_replaced:
-                pos = result_smiles.find("C(O)=O")
-                if pos != -1:
-                    result_smiles = (
-                        result_smiles[:pos + 2]
-                        + "Cl"
-                        + result_smiles[pos + 2 + 1 :]
-                    )
-                    cooh_cl_replaced = True
-
-            # Pattern 3: OC(=O) -> ClC(=O)
-            if not cooh_cl_replaced:
-                pos = result_smiles.find("OC(=O)")
-                if pos != -1:
-                    result_smiles = (
-                        result_smiles[:pos]
-                        + "Cl"
-                        + result_smiles[pos + 1 :]
-                    )
-                    cooh_cl_replaced = True
-
-            # Pattern 4: O=C(O) -> O=C(Cl)
-            if not cooh_cl_replaced:
-                pos = result_smiles.find("O=C(O)")
-                if pos != -1:
-                    result_smiles = (
-                        result_smiles[:pos + 4]
-                        + "Cl"
-                        + result_smiles[pos + 4 + 1 :]
-                    )
-                    cooh_cl_replaced = True
-
-            # Pattern 5: C(=O)(O) -> C(=O)(Cl)
-            if not cooh_cl_replaced:
-                pos = result_smiles.find("C(=O)(O)")
-                if pos != -1:
-                    result_smiles = (
-                        result_smiles[:pos + 6]
-                        + "Cl"
-                        + result_smiles[pos + 6 + 1 :]
-                    )
-                    cooh_cl_replaced = True
-
-            # Write final SMILES
-            Path("monomer.smi").write_text(result_smiles + "\n")
-
-            # Copy to structures/monomer_<ikik>.smi
-            Path("structures").mkdir(exist_ok=True, parents=True)
-            run(f"cp monomer.smi structures/monomer_{ikik}.smi")
+    structures = work_dir / "structures"
+    structures.mkdir(exist_ok=True, parents=True)
+    with (work_dir / "name_list.txt").open("w") as name_list_out:
+        for ikik, name in enumerate(names):
+            result_smiles = activate_monomer(name.strip())
+            if result_smiles is None:
+                sys.stderr.write(f"Invalid monomer SMILES, written unchanged: {name}\n")
+                result_smiles = name.strip()
+
+            # Write final SMILES (monomer.smi is kept for inspection)
+            (work_dir / "monomer.smi").write_text(result_smiles + "\n")
+            (structures / f"monomer_{ikik}.smi").write_text(result_smiles + "\n")
 
             # Append to name_list.txt
             name_list_out.write(f"monomer_{ikik}\n")
 
-            ikik += 1
+
+def check_activation():
+    """Compare activate_monomer with ACTIVATION_CHECKS; returns the number of mismatches."""
+    failures = 0
+    for smiles, expected in ACTIVATION_CHECKS.items():
+        result = activate_monomer(smiles)
+        expected = Chem.MolToSmiles(Chem.MolFromSmiles(expected), isomericSmiles=True)
+        status = "ok" if result == expected else f"MISMATCH (expected {expected})"
+        print(f"{smiles} -> {result}: {status}")
+        failures += result != expected
+    return failures
+
+
+def main():
+    if sys.argv[1:] == ["--check"]:
+        sys.exit(1 if check_activation() else 0)
+    combine()
+
 
 if __name__ == "__main__":
     main()
-
@@ -1,18 +1,181 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import glob
 import os
 import sys
+import shlex
 import shutil
 import subprocess
 
+from Util_cache import CPU_SCHEDULER, MONOMER_OUTPUTS, enable_moltemplate_cache, monomer_cache_command
+from Util_checkpoint import has_checkpoint
+from Util_config import config_path
+from Util_job_graph import AMBERTOOLS_PROLOGUE, JobGraph, Step, script_inputs
+from Util_lammps_driver import lammps_driver_shell_command
+from Util_profile import start_profile, write_profile
+from Util_stage_inputs import stage_inputs_shell_command
+
+STAGE_INPUTS = {"npt2": "run_iso.in.npt2_wo_strain", "pppm": "run_iso.in.npt2_wo_strain_pppm"}
+SERIES_FILES = [f"output{i}.txt" for i in range(1, 6)]
+# Generated copies in moltemplates/ (every other .lt there is a fixed template)
+MOLTEMPLATE_GENERATED = {"polymer.lt", "system.lt", "monomer_add.lt"}
+# Scripts run by the steps, hashed as step inputs (paths from the pipeline directory)
+MOL2TOLT_SCRIPTS = ["mol2tolt/run.sh", "mol2tolt/mol2tolt2.sh", "mol2tolt/addp.py", "mol2tolt/makelt.py",
+                    "mol2tolt/gaff.lt"]
+MOLTEMPLATE_SCRIPTS = ["../Util/Util_moltemplate_build.py", "../Util/Util_lammps_launcher.py",
+                       "../Util/moltemplate-master/moltemplate/*.py"]
+LAMMPS_SCRIPTS = ["../Util/Util_stage_inputs.py", "../Util/Util_checkpoint.py", "../Util/Util_config.py",
+                  "../Util/Util_lammps_driver.py", "../Util/Util_lammps_launcher.py",
+                  "../Util/Util_convergence_monitor.py", "../Util/Util_cpu_scheduler.py",
+                  "../Util/Util_timeseries.py"]
+
+# Bump when the solvent build chain changes in a way the key files below do not capture
+SOLVENT_CACHE_VERSION = "2"
+SOLVENT_FORCE_FIELD = "gaff/AmberTools23"
+SOLVENT_BUILD_SCRIPT = "solvent_build"
+SOLVENT_KEY_FILES = [
+    "mol2tolt_solvent/gaff.lt",
+    "mol2tolt_solvent/addp.py",
+    "../Util/Util_gaff_index.py",
+    "mol2tolt_solvent/makelt.py",
+    "../Util/Util_mol2.py",
+    "mol2tolt_solvent/mol2tolt2.sh",
+    "moltemplates_solvent_single/system.lt",
+]
+SOLVENT_OUTPUTS = [
+    "solvent_com2.mol2",
+    "mol2tolt_solvent/test/solvent.lt",
+    "ratio_calculation/extracted_solvent_mass.txt",
+]
+
 def run_cmd(cmd: str):
     ret = os.system(cmd)
     if ret != 0:
         sys.stderr.write(f"Command failed: {cmd}\n")
         sys.exit(1)
 
+def write_solvent_build_script():
+    """Solvent parameterization chain (obabel, antechamber, mol2tolt, moltemplate, mass)."""
+    with open(SOLVENT_BUILD_SCRIPT, "w") as sf:
+        sf.write("#!/bin/bash\nset -e\n")
+        sf.write("cp solvent/solvent.smi solvent.smi\n")
+        sf.write(f"{CPU_SCHEDULER} obabel -ismi solvent.smi -omol2 --gen3d --partialcharge eem -O solvent_com1.mol2\n")
+        sf.write(f"{CPU_SCHEDULER} antechamber -i solvent_com1.mol2 -fi mol2 -fo mol2 -o solvent_com2.mol2 -pf y -at gaff\n")
+        sf.write("cp solvent_com2.mol2 mol2tolt_solvent/test/solvent.mol2\n")
+        sf.write("cd mol2tolt_solvent/ && ./run.sh && cp test/solvent.lt ../moltemplates_solvent_single/solvent.lt && cd ..\n")
+        sf.write("cd moltemplates_solvent_single && python ../../Util/Util_moltemplate_build.py system.lt > moltemplate.log 2>&1\n")
+        sf.write("python ../../Util/Util_lammps_data.py mass system.data > ../ratio_calculation/extracted_solvent_mass.txt\n")
+    os.chmod(SOLVENT_BUILD_SCRIPT, 0o770)
+
+
+def solvent_cache_command():
+    """Util_cache.py call that restores the solvent outputs or runs the build script."""
+    write_solvent_build_script()
+    with open("solvent/solvent.smi") as f:
+        solvent_smiles = f.read().strip()
+
+    args = ["python", "../Util/Util_cache.py", "run", "--namespace", "solvent",
+            "--key", f"smiles={solvent_smiles}",
+            "--key", f"forcefield={SOLVENT_FORCE_FIELD}",
+            "--key", f"version={SOLVENT_CACHE_VERSION}"]
+    for path in SOLVENT_KEY_FILES:
+        args += ["--key-file", path]
+    for path in SOLVENT_OUTPUTS:
+        args += ["--output", path]
+    args += ["--", "./" + SOLVENT_BUILD_SCRIPT]
+    return " ".join(shlex.quote(arg) for arg in args)
+
+def pipeline_graph(name, resume=False):
+    """
+    Job graph of one monomer. The polymer side (conformer and charges -> reorder ->
+    mol2tolt -> moltemplate) and the solvent side (solvent parameterization) run in
+    parallel and join in the solvent box, followed by the LAMMPS stages and the analysis.
+
+    With resume and a checkpoint in lammps/<name>/, only the LAMMPS stages (continued
+    with --resume) and the analysis are run.
+    """
+    graph = JobGraph(".", prologue=AMBERTOOLS_PROLOGUE)
+    run_dir = f"lammps/{name}"
+    series = [f"{run_dir}/{path}" for path in SERIES_FILES]
+
+    if resume and has_checkpoint(run_dir):
+        graph.add(Step(f"{name}/lammps", [lammps_driver_shell_command(STAGE_INPUTS, resume=True)],
+                       outputs=series, cwd=run_dir))
+    else:
+        templates = sorted(path for path in glob.glob("moltemplates/*.lt")
+                           if os.path.basename(path) not in MOLTEMPLATE_GENERATED)
+        # Polymer side
+        graph.add(Step(f"{name}/conformer", [
+            f"cp structures/{name}.smi test.smi",
+            # Restored from the monomer cache when already parameterized
+            monomer_cache_command(f"structures/{name}.smi"),
+        ], inputs=[f"structures/{name}.smi"], outputs=MONOMER_OUTPUTS))
+        graph.add(Step(f"{name}/reorder", [
+            "python ../Util/Util_monomer_reorder.py linear",
+        ], inputs=["monomer_com2.mol2"] + script_inputs("../Util/Util_monomer_reorder.py", "../Util/Util_mol2.py"),
+           outputs=["monomer_reorder2.mol2", "polymer_new.lt", "system_new.lt"]))
+        graph.add(Step(f"{name}/mol2tolt", [
+            "cp monomer_reorder2.mol2 mol2tolt/test/monomer.mol2",
+            "cd mol2tolt/ && ./run.sh && cp test/monomer.lt ../moltemplates/monomer_add.lt",
+        ], inputs=["monomer_reorder2.mol2"] + script_inputs(*MOL2TOLT_SCRIPTS),
+           outputs=["moltemplates/monomer_add.lt"]))
+        graph.add(Step(f"{name}/moltemplate", [
+            "cp polymer_new.lt moltemplates/polymer.lt",
+            "cp system_new.lt moltemplates/system.lt",
+            "cd moltemplates && python ../../Util/Util_moltemplate_build.py system.lt > moltemplate.log 2>&1",
+        ], inputs=["polymer_new.lt", "system_new.lt", "moltemplates/monomer_add.lt"] + templates
+           + script_inputs(*MOLTEMPLATE_SCRIPTS),
+           outputs=["moltemplates/system.data"]))
+
+        # Solvent side (restored from the solvent cache when already parameterized)
+        graph.add(Step(f"{name}/solvent", [solvent_cache_command()],
+                       inputs=["solvent/solvent.smi"] + SOLVENT_KEY_FILES, outputs=SOLVENT_OUTPUTS))
+
+        # Solvent system assembly (masses read from the data files in-process)
+        graph.add(Step(f"{name}/solvent_box", [
+            "cd ratio_calculation",
+            "python number_solvnet.py",
+            "python solvent_lt.py",
+            "cp system_solvent.lt ../system_solvent.lt",
+        ], inputs=["moltemplates/system.data", "ratio_calculation/extracted_solvent_mass.txt"]
+           + script_inputs("ratio_calculation/number_solvnet.py", "ratio_calculation/solvent_lt.py",
+                           "ratio_calculation/factoring.py", "../Util/Util_lammps_data.py"),
+           outputs=["system_solvent.lt"]))
+        graph.add(Step(f"{name}/solvent_moltemplate", [
+            "mkdir -p moltemplates_solvent",
+            "cp system_solvent.lt moltemplates_solvent/system.lt",
+            "cp mol2tolt_solvent/test/solvent.lt moltemplates_solvent/solvent.lt",
+            "cd moltemplates_solvent && python ../../Util/Util_moltemplate_build.py system.lt > moltemplate.log 2>&1",
+        ], inputs=["system_solvent.lt", "mol2tolt_solvent/test/solvent.lt"] + script_inputs(*MOLTEMPLATE_SCRIPTS),
+           outputs=["moltemplates_solvent/system.data"]))
+
+        graph.add(Step(f"{name}/lammps", [
+            f"rm -rf {run_dir}",
+            f"mkdir -p {run_dir}",
+            f"cp back/* {run_dir}",
+            f"cp moltemplates/system.data {run_dir}/system.data",
+            f"cp moltemplates_solvent/system.data {run_dir}/system_solvent.data",
+            f"cd {run_dir}",
+            "python ../../group_polymer.py",
+            "python ../../group_solvent.py",
+            stage_inputs_shell_command(STAGE_INPUTS),
+            lammps_driver_shell_command(STAGE_INPUTS),
+        ], inputs=["moltemplates/system.data", "moltemplates_solvent/system.data"]
+           + sorted(glob.glob("back/*")) + ["group_polymer.py", "group_solvent.py", config_path()]
+           + script_inputs(*LAMMPS_SCRIPTS),
+           outputs=series))
+
+    graph.add(Step(f"{name}/analysis", [
+        "python ../../../Util/Util_Polymer_Output_Solution.py",
+    ], inputs=series + script_inputs("../Util/Util_Polymer_Output_Solution.py", "../Util/Util_timeseries.py"),
+       outputs=[f"{run_dir}/output_all.txt"], cwd=run_dir))
+    return graph
+
 def main():
+    # --resume: continue interrupted LAMMPS runs from their checkpoints instead of rebuilding
+    resume = "--resume" in sys.argv[1:]
+
     # Read names
     if not os.path.exists("name.txt"):
         sys.stderr.write("Unable to open file: name.txt\n")
@@ -21,6 +184,8 @@ def main():
     with open("name.txt") as f:
         names = [line.strip() for line in f if line.strip()]
 
+    enable_moltemplate_cache()
+
     # Backup E_h_bond.txt
     if os.path.exists("E_h_bond.txt"):
         shutil.move("E_h_bond.txt", "E_h_bond_back.txt")
@@ -28,72 +193,18 @@ def main():
     # Open result file
     with open("E_h_bond.txt", "a") as out_summary:
         for name in names:
-            # Generate run script
-            with open("run", "w") as runf:
-                runf.write("#!/bin/bash\n")
-                runf.write("rm -rf lammps/*\n")
-                runf.write(f"mkdir lammps/{name}\n")
-                runf.write(f"cp back/* lammps/{name}\n")
-
-                runf.write("if ! command -v conda &> /dev/null; then\n")
-                runf.write("    echo \"❌ Conda not found. Please install Anaconda or Miniconda.\"\n")
-                runf.write("    exit 1\n")
-                runf.write("fi\n")
-
-                runf.write("source \"$(conda info --base)/etc/profile.d/conda.sh\"\n")
-                runf.write("conda activate AmberTools23 || {\n")
-                runf.write("    echo \"❌ AmberTools23 environment not found.\"\n")
-                runf.write("    exit 1\n}\n")
-
-                # Polymer setup
-                runf.write(f"cp structures/{name}.smi test.smi\n")
-                runf.write("taskset --cpu-list 0 obabel -ismi test.smi -omol2 --gen3d --partialcharge eem -O monomer_com1.mol2\n")
-                runf.write("antechamber -i monomer_com1.mol2 -fi mol2 -fo mol2 -o monomer_com2.mol2 -pf y -at gaff\n")
-                runf.write("python ../Util/Util_monomer_reorder.py\n")
-                runf.write("python ../Util/Util_make_lt_linear.py\n")
-                runf.write("cp monomer_reorder2.mol2 mol2tolt/test/monomer.mol2\n")
-                runf.write("cp polymer_new.lt moltemplates/polymer.lt\n")
-                runf.write("cp system_new.lt moltemplates/system.lt\n")
-                runf.write("cd mol2tolt/ && ./run.sh && cp test/monomer.lt ../moltemplates/monomer_add.lt && cd ..\n")
-                runf.write("cd moltemplates && ../../Util/moltemplate-master/moltemplate/scripts/moltemplate.sh system.lt > moltemplate.log 2>&1\n")
-                runf.write(f"cp system.data ../lammps/{name}/system.data\ncd ..\n")
-
-                # Polymer mass
-                runf.write("cd moltemplates && cp system.data ../ratio_calculation/polymer/system.data && cd ../ratio_calculation/polymer\n")
-                runf.write("../../../Util/lammps-2Aug2023/src/lmp_serial -i run_polymer_mass.npt2\n")
-                runf.write("python polymer_mass.py\n")
-                runf.write("cp extracted_mass.txt ../extracted_mass.txt\ncd ../..\n")
-
-                # Solvent setup
-                runf.write("cp solvent/solvent.smi solvent.smi\n")
-                runf.write("taskset --cpu-list 0 obabel -ismi solvent.smi -omol2 --gen3d --partialcharge eem -O solvent_com1.mol2\n")
-                runf.write("antechamber -i solvent_com1.mol2 -fi mol2 -fo mol2 -o solvent_com2.mol2 -pf y -at gaff\n")
-                runf.write("cp solvent_com2.mol2 mol2tolt_solvent/test/solvent.mol2\n")
-                runf.write("cd mol2tolt_solvent/ && ./run.sh && cp test/solvent.lt ../moltemplates_solvent_single/solvent.lt && cd ..\n")
-                runf.write("cd moltemplates_solvent_single && ../../Util/moltemplate-master/moltemplate/scripts/moltemplate.sh system.lt > moltemplate.log 2>&1\n")
-                runf.write("cp system.data ../ratio_calculation/solvent/system.data\n")
-                runf.write("cd ../ratio_calculation/solvent && ../../../Util/lammps-2Aug2023/src/lmp_serial -in run_solvent_mass.npt2\n")
-                runf.write("python solvent_mass.py\n")
-                runf.write("cp extracted_solvent_mass.txt ../extracted_solvent_mass.txt\ncd ..\n")
-
-                # Solvent system assembly
-                runf.write("python number_solvnet.py\npython factoring.py\npython solvent_lt.py\ncp system_solvent.lt ../system_solvent.lt\ncd ..\n")
-                runf.write("cp system_solvent.lt moltemplates_solvent/system.lt\n")
-                runf.write("cd mol2tolt_solvent/ && ./run.sh && cp test/solvent.lt ../moltemplates_solvent/solvent.lt && cd ..\n")
-                runf.write("cd moltemplates_solvent && ../../Util/moltemplate-master/moltemplate/scripts/moltemplate.sh system.lt > moltemplate.log 2>&1\n")
-                runf.write(f"cp system.data ../lammps/{name}/system_solvent.data\ncd ..\n")
-
-                # Run LAMMPS
-                runf.write(f"cd lammps/{name}\n")
-                runf.write("python ../../group_polymer.py\npython ../../group_solvent.py\n")
-                runf.write("../../../Util/lammps-2Aug2023/src/lmp_serial -in run_iso.in.npt2_wo_strain\n")
-                runf.write("../../../Util/lammps-2Aug2023/src/lmp_serial -i run_iso.in.npt2_wo_strain_pppm\n")
-                runf.write("python ../../../Util/Util_Polymer_Output_Solution.py\n")
-
-            # Copy run → run_exe, chmod, execute
-            shutil.copy("run", "run_exe")
-            run_cmd("chmod 770 run_exe")
-            run_cmd("./run_exe")
+            # Build, LAMMPS stages and analysis (unchanged steps are skipped)
+            started = start_profile(name)
+            graph = pipeline_graph(name, resume)
+            succeeded = graph.run()
+
+            # Timing profile (profiles/<name>.json), also written when a step failed
+            lammps_ran = graph.timings.get(f"{name}/lammps", {}).get("status") in ("ran", "failed")
+            write_profile(name, "Solution", graph.timings, f"lammps/{name}",
+                          STAGE_INPUTS if lammps_ran else {}, started)
+            if not succeeded:
+                sys.stderr.write(f"Pipeline failed for {name}\n")
+                sys.exit(1)
 
             # Copy outputs
             run_cmd("cp output_all_back.txt output_all.txt")
@@ -1,17 +1,101 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import glob
 import os
 import sys
 import shutil
 
+from Util_cache import MONOMER_OUTPUTS, enable_moltemplate_cache, monomer_cache_command
+from Util_checkpoint import has_checkpoint
+from Util_config import config_path
+from Util_job_graph import AMBERTOOLS_PROLOGUE, JobGraph, Step, script_inputs
+from Util_lammps_driver import lammps_driver_shell_command
+from Util_profile import start_profile, write_profile
+from Util_stage_inputs import stage_inputs_shell_command
+
+STAGE_INPUTS = {"npt2": "run.in.npt2", "pppm": "run.in.npt2_pppm"}
+SERIES_FILES = [f"output{i}.txt" for i in range(1, 6)]
+# Generated copies in moltemplates/ (every other .lt there is a fixed template)
+MOLTEMPLATE_GENERATED = {"polymer.lt", "system.lt", "monomer_add.lt"}
+# Scripts run by the steps, hashed as step inputs (paths from the pipeline directory)
+MOL2TOLT_SCRIPTS = ["mol2tolt/run.sh", "mol2tolt/mol2tolt2.sh", "mol2tolt/addp.py", "mol2tolt/makelt.py",
+                    "mol2tolt/gaff.lt"]
+MOLTEMPLATE_SCRIPTS = ["../Util/Util_moltemplate_build.py", "../Util/Util_lammps_launcher.py",
+                       "../Util/moltemplate-master/moltemplate/*.py"]
+LAMMPS_SCRIPTS = ["../Util/Util_stage_inputs.py", "../Util/Util_checkpoint.py", "../Util/Util_config.py",
+                  "../Util/Util_lammps_driver.py", "../Util/Util_lammps_launcher.py",
+                  "../Util/Util_convergence_monitor.py", "../Util/Util_cpu_scheduler.py",
+                  "../Util/Util_timeseries.py"]
+
 def run_cmd(cmd: str):
     ret = os.system(cmd)
     if ret != 0:
         sys.stderr.write(f"Command failed: {cmd}\n")
         sys.exit(1)
 
+def pipeline_graph(name, resume=False):
+    """
+    Job graph of one monomer: conformer and charges -> reorder and polymer LT files ->
+    mol2tolt -> moltemplate -> LAMMPS stages -> analysis.
+
+    With resume and a checkpoint in lammps/<name>/, only the LAMMPS stages (continued
+    with --resume) and the analysis are run.
+    """
+    graph = JobGraph(".", prologue=AMBERTOOLS_PROLOGUE)
+    run_dir = f"lammps/{name}"
+    series = [f"{run_dir}/{path}" for path in SERIES_FILES]
+
+    if resume and has_checkpoint(run_dir):
+        graph.add(Step(f"{name}/lammps", [lammps_driver_shell_command(STAGE_INPUTS, resume=True)],
+                       outputs=series, cwd=run_dir))
+    else:
+        templates = sorted(path for path in glob.glob("moltemplates/*.lt")
+                           if os.path.basename(path) not in MOLTEMPLATE_GENERATED)
+        graph.add(Step(f"{name}/conformer", [
+            f"cp structures/{name}.smi test.smi",
+            # Restored from the monomer cache when already parameterized
+            monomer_cache_command(f"structures/{name}.smi"),
+        ], inputs=[f"structures/{name}.smi"], outputs=MONOMER_OUTPUTS))
+        graph.add(Step(f"{name}/reorder", [
+            "python ../Util/Util_monomer_reorder.py fiber",
+        ], inputs=["monomer_com2.mol2"] + script_inputs("../Util/Util_monomer_reorder.py", "../Util/Util_mol2.py"),
+           outputs=["monomer_reorder2.mol2", "polymer_new.lt", "system_new.lt"]))
+        graph.add(Step(f"{name}/mol2tolt", [
+            "cp monomer_reorder2.mol2 mol2tolt/test/monomer.mol2",
+            "cd mol2tolt/ && ./run.sh && cp test/monomer.lt ../moltemplates/monomer_add.lt",
+        ], inputs=["monomer_reorder2.mol2"] + script_inputs(*MOL2TOLT_SCRIPTS),
+           outputs=["moltemplates/monomer_add.lt"]))
+        graph.add(Step(f"{name}/moltemplate", [
+            "cp polymer_new.lt moltemplates/polymer.lt",
+            "cp system_new.lt moltemplates/system.lt",
+            "cd moltemplates && python ../../Util/Util_moltemplate_build.py system.lt > moltemplate.log 2>&1",
+            "python ../../Util/Util_data_mol_modify.py",
+        ], inputs=["polymer_new.lt", "system_new.lt", "moltemplates/monomer_add.lt"] + templates
+           + script_inputs(*MOLTEMPLATE_SCRIPTS, "../Util/Util_data_mol_modify.py", "../Util/Util_lammps_data.py"),
+           outputs=["moltemplates/system2.data"]))
+        graph.add(Step(f"{name}/lammps", [
+            f"rm -rf {run_dir}",
+            f"mkdir -p {run_dir}",
+            f"cp back_S/* {run_dir}",
+            f"cp moltemplates/system2.data {run_dir}/system.data",
+            f"cd {run_dir}",
+            stage_inputs_shell_command(STAGE_INPUTS),
+            lammps_driver_shell_command(STAGE_INPUTS),
+        ], inputs=["moltemplates/system2.data"] + sorted(glob.glob("back_S/*")) + [config_path()]
+           + script_inputs(*LAMMPS_SCRIPTS),
+           outputs=series))
+
+    graph.add(Step(f"{name}/analysis", [
+        "python ../../../Util/Util_Polymer_Output_Stretched.py",
+    ], inputs=series + script_inputs("../Util/Util_Polymer_Output_Stretched.py", "../Util/Util_timeseries.py"),
+       outputs=[f"{run_dir}/output_all.txt"], cwd=run_dir))
+    return graph
+
 def main():
+    # --resume: continue interrupted LAMMPS runs from their checkpoints instead of rebuilding
+    resume = "--resume" in sys.argv[1:]
+
     # Read monomer names
     if not os.path.exists("name.txt"):
         sys.stderr.write("Unable to open file: name.txt\n")
@@ -20,6 +104,8 @@ def main():
     with open("name.txt") as f:
         names = [line.strip() for line in f if line.strip()]
 
+    enable_moltemplate_cache()
+
     # Backup E_h_bond.txt
     if os.path.exists("E_h_bond.txt"):
         shutil.move("E_h_bond.txt", "E_h_bond_back.txt")
@@ -27,49 +113,18 @@ def main():
     # Open summary output
     with open("E_h_bond.txt", "a") as out_summary:
         for name in names:
-            # Generate run script
-            with open("run", "w") as runf:
-                runf.write("#!/bin/bash\n")
-                runf.write("rm -rf lammps/*\n")
-                runf.write(f"mkdir lammps/{name}\n")
-                runf.write(f"cp back_S/* lammps/{name}\n")
-
-                runf.write("if ! command -v conda &> /dev/null; then\n")
-                runf.write("    echo \"❌ Conda not found. Please install Anaconda or Miniconda.\"\n")
-                runf.write("    exit 1\nfi\n")
-
-                runf.write("source \"$(conda info --base)/etc/profile.d/conda.sh\"\n")
-                runf.write("conda activate AmberTools23 || {\n")
-                runf.write("    echo \"❌ AmberTools23 environment not found.\"\n")
-                runf.write("    exit 1\n}\n")
-
-                # Monomer setup
-                runf.write(f"cp structures/{name}.smi test.smi\n")
-                runf.write("taskset --cpu-list 0 obabel -ismi test.smi -omol2 --gen3d --partialcharge eem -O monomer_com1.mol2\n")
-                runf.write("antechamber -i monomer_com1.mol2 -fi mol2 -fo mol2 -o monomer_com2.mol2 -pf y -at gaff\n")
-                runf.write("python ../Util/Util_monomer_reorder.py\n")
-                runf.write("python ../Util/Util_make_lt_fiber.py\n")
-                runf.write("cp monomer_reorder2.mol2 mol2tolt/test/monomer.mol2\n")
-
-                runf.write("cp polymer_new.lt moltemplates/polymer.lt\n")
-                runf.write("cp system_new.lt moltemplates/system.lt\n")
-
-                runf.write("cd mol2tolt/ && ./run.sh && cp test/monomer.lt ../moltemplates/monomer_add.lt && cd ..\n")
-
-                runf.write("cd moltemplates && ../../Util/moltemplate-master/moltemplate/scripts/moltemplate.sh system.lt > moltemplate.log 2>&1\n")
-                runf.write("python ../../Util/Util_data_mol_modify.py\n")
-                runf.write(f"cp system2.data ../lammps/{name}/system.data\ncd ..\n")
-
-                # LAMMPS execution
-                runf.write(f"cd lammps/{name}\n")
-                runf.write("../../../Util/lammps-2Aug2023/src/lmp_serial -i run.in.npt2\n")
-                runf.write("../../../Util/lammps-2Aug2023/src/lmp_serial -i run.in.npt2_pppm\n")
-                runf.write("python ../../../Util/Util_Polymer_Output_Stretched.py\n")
-
-            # Prepare and run script
-            shutil.copy("run", "run_exe")
-            run_cmd("chmod 770 run_exe")
-            run_cmd("./run_exe")
+            # Build, LAMMPS stages and analysis (unchanged steps are skipped)
+            started = start_profile(name)
+            graph = pipeline_graph(name, resume)
+            succeeded = graph.run()
+
+            # Timing profile (profiles/<name>.json), also written when a step failed
+            lammps_ran = graph.timings.get(f"{name}/lammps", {}).get("status") in ("ran", "failed")
+            write_profile(name, "Stretched", graph.timings, f"lammps/{name}",
+                          STAGE_INPUTS if lammps_ran else {}, started)
+            if not succeeded:
+                sys.stderr.write(f"Pipeline failed for {name}\n")
+                sys.exit(1)
 
             # Copy outputs
             run_cmd("cp output_all_back.txt output_all.txt")
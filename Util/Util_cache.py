@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Content-addressed cache for pipeline steps whose outputs depend only on their inputs.
+
+An entry is keyed by sha256(namespace, key strings, key file contents) and stores the
+step's output files under <cache root>/<namespace>/<key[:2]>/<key>/. The cache root is
+./cache in the repository (override with ARAMIDSIM_CACHE_DIR).
+
+Usage from the generated run scripts:
+    python ../Util/Util_cache.py run --namespace solvent --key smiles=O=C1CCCN1C \\
+        --key-file mol2tolt_solvent/gaff.lt --output solvent_com2.mol2 -- sh solvent_build
+
+--key-command name=command adds "name=<first output line of command>" to the key, e.g.
+the version of a tool that is only on PATH inside the run script's environment.
+
+On a hit the outputs are copied back to their relative paths and the command is skipped;
+on a miss the command runs and its outputs are stored. Concurrent runs with the same key
+wait on a lock instead of repeating the work.
+"""
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+from Util_config import REPO_DIR
+
+MANIFEST_NAME = "manifest.json"
+MOLTEMPLATE_NAMESPACE = "moltemplate"
+
+# Monomer conformer + charges (obabel --gen3d, antechamber), shared by Stretched and Solution
+MONOMER_NAMESPACE = "monomer"
+# Bump when the monomer parameterization chain changes
+MONOMER_CACHE_VERSION = "1"
+MONOMER_BUILD_SCRIPT = "monomer_build"
+MONOMER_OUTPUTS = ["monomer_com1.mol2", "monomer_com2.mol2"]
+# antechamber has no version option (a bare call prints its usage). Its version is the
+# AmberTools package record of the active conda environment (conda-meta/ambertools-<version>-
+# <build>.json), or, outside conda, a checksum of the antechamber executable.
+ANTECHAMBER_VERSION_COMMAND = ('{ ls "$CONDA_PREFIX"/conda-meta/ambertools-*.json | sed "s|.*/||"; '
+                               'sha256sum < "$(command -v antechamber)" | cut -d" " -f1; } 2>/dev/null')
+MONOMER_TOOL_VERSIONS = {"obabel": "obabel -V", "antechamber": ANTECHAMBER_VERSION_COMMAND}
+# Prefix of the preparation tools in the build scripts: one scheduled CPU per job
+CPU_SCHEDULER = "python ../Util/Util_cpu_scheduler.py run --"
+
+
+def cache_root():
+    return os.environ.get("ARAMIDSIM_CACHE_DIR", os.path.join(REPO_DIR, "cache"))
+
+
+def enable_moltemplate_cache():
+    """
+    Turn on moltemplate's incremental mode for the child processes of this script:
+    the lexed templates of unchanged .lt files (gaff.lt, PPTA.lt, H_head.lt, ...) are
+    reused, keyed by file content hash (ttree_lex.TemplateCache). An empty
+    MOLTEMPLATE_CACHE_DIR disables it.
+    """
+    os.environ.setdefault("MOLTEMPLATE_CACHE_DIR", os.path.join(cache_root(), MOLTEMPLATE_NAMESPACE))
+
+
+def write_monomer_build_script(path=MONOMER_BUILD_SCRIPT):
+    """Monomer parameterization chain: test.smi -> monomer_com1.mol2 -> monomer_com2.mol2."""
+    with open(path, "w") as f:
+        f.write("#!/bin/bash\nset -e\n")
+        f.write(f"{CPU_SCHEDULER} obabel -ismi test.smi -omol2 --gen3d --partialcharge eem -O monomer_com1.mol2\n")
+        f.write(f"{CPU_SCHEDULER} antechamber -i monomer_com1.mol2 -fi mol2 -fo mol2 -o monomer_com2.mol2 -pf y -at gaff\n")
+    os.chmod(path, 0o770)
+
+
+def monomer_cache_command(smiles_path, cache_script="../Util/Util_cache.py"):
+    """
+    Util_cache.py call that restores monomer_com1/com2.mol2 of the canonical monomer SMILES
+    in smiles_path (written by Util_Polymer_combine) or runs the build script. The key holds
+    the SMILES, the obabel version and the AmberTools version, so the Stretched and Solution
+    pipelines share one parameterization.
+    """
+    write_monomer_build_script()
+    with open(smiles_path) as f:
+        smiles = f.read().strip()
+    args = ["python", cache_script, "run", "--namespace", MONOMER_NAMESPACE,
+            "--key", f"smiles={smiles}",
+            "--key", f"version={MONOMER_CACHE_VERSION}"]
+    for name, command in MONOMER_TOOL_VERSIONS.items():
+        args += ["--key-command", f"{name}={command}"]
+    for path in MONOMER_OUTPUTS:
+        args += ["--output", path]
+    args += ["--", "./" + MONOMER_BUILD_SCRIPT]
+    return " ".join(shlex.quote(arg) for arg in args)
+
+
+def command_key(spec):
+    """'name=command' -> 'name=<first non-empty output line of command>'."""
+    name, _, command = spec.partition("=")
+    try:
+        output = subprocess.run(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                stdin=subprocess.DEVNULL, text=True, timeout=60).stdout
+    except (OSError, subprocess.TimeoutExpired):
+        output = ""
+    lines = [line.strip() for line in output.splitlines() if line.strip()]
+    return f"{name}={lines[0] if lines else ''}"
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cache_key(namespace, keys=(), key_files=()):
+    """sha256 over the namespace, the key strings and the contents of the key files."""
+    h = hashlib.sha256()
+    h.update(f"namespace={namespace}\n".encode())
+    for key in keys:
+        h.update(f"key={key}\n".encode())
+    for path in key_files:
+        h.update(f"file={os.path.basename(path)}:{file_digest(path)}\n".encode())
+    return h.hexdigest()
+
+
+def entry_dir(namespace, key):
+    return os.path.join(cache_root(), namespace, key[:2], key)
+
+
+@contextmanager
+def entry_lock(namespace, key):
+    """Exclusive lock for one cache entry (held while building it)."""
+    lock_dir = os.path.join(cache_root(), namespace, key[:2])
+    os.makedirs(lock_dir, exist_ok=True)
+    with open(os.path.join(lock_dir, f"{key}.lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def lookup(namespace, key):
+    """Return the manifest of a complete entry, or None."""
+    manifest_path = os.path.join(entry_dir(namespace, key), MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def restore(namespace, key, outputs):
+    """Copy cached outputs back to their relative paths. Returns False if any is missing."""
+    entry = entry_dir(namespace, key)
+    for rel_path in outputs:
+        src = os.path.join(entry, "files", rel_path)
+        if not os.path.exists(src):
+            return False
+    for rel_path in outputs:
+        dst_dir = os.path.dirname(rel_path)
+        if dst_dir:
+            os.makedirs(dst_dir, exist_ok=True)
+        shutil.copy(os.path.join(entry, "files", rel_path), rel_path)
+    return True
+
+
+def store(namespace, key, outputs, meta=None):
+    """Store output files atomically (staged in a temp dir, then renamed into place)."""
+    entry = entry_dir(namespace, key)
+    parent = os.path.dirname(entry)
+    os.makedirs(parent, exist_ok=True)
+
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=parent)
+    try:
+        for rel_path in outputs:
+            dst = os.path.join(staging, "files", rel_path)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.copy(rel_path, dst)
+        manifest = {
+            "namespace": namespace,
+            "key": key,
+            "outputs": list(outputs),
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "meta": meta or {},
+        }
+        with open(os.path.join(staging, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        if os.path.exists(entry):
+            shutil.rmtree(entry)
+        os.rename(staging, entry)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def cached_run(namespace, keys, key_files, outputs, command, meta=None):
+    """
+    Restore outputs from the cache, or run command and cache its outputs.
+
+    Returns:
+        int: 0 on a cache hit, otherwise the command's exit code
+    """
+    key = cache_key(namespace, keys, key_files)
+    with entry_lock(namespace, key):
+        if lookup(namespace, key) is not None and restore(namespace, key, outputs):
+            print(f"[cache] {namespace} hit ({key[:12]})")
+            return 0
+
+        print(f"[cache] {namespace} miss ({key[:12]}), running: {' '.join(command)}")
+        ret = subprocess.run(command).returncode
+        if ret != 0:
+            return ret
+
+        missing = [path for path in outputs if not os.path.exists(path)]
+        if missing:
+            sys.stderr.write(f"[cache] {namespace}: outputs not produced, not cached: {missing}\n")
+            return 1
+
+        store(namespace, key, outputs, meta)
+        print(f"[cache] {namespace} stored ({key[:12]})")
+        return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed cache for pipeline steps")
+    sub = parser.add_subparsers(dest="action", required=True)
+
+    run_parser = sub.add_parser("run", help="restore outputs or run the command and cache them")
+    run_parser.add_argument("--namespace", required=True)
+    run_parser.add_argument("--key", action="append", default=[], help="key string (repeatable)")
+    run_parser.add_argument("--key-command", action="append", default=[],
+                            help="name=command whose first output line is part of the key (repeatable)")
+    run_parser.add_argument("--key-file", action="append", default=[],
+                            help="file whose contents are part of the key (repeatable)")
+    run_parser.add_argument("--output", action="append", default=[], required=True,
+                            help="output file relative to the working directory (repeatable)")
+    run_parser.add_argument("command", nargs=argparse.REMAINDER,
+                            help="-- command to run on a cache miss")
+
+    args = parser.parse_args()
+
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+    if not command:
+        parser.error("missing command after --")
+    keys = args.key + [command_key(spec) for spec in args.key_command]
+    sys.exit(cached_run(args.namespace, keys, args.key_file, args.output, command,
+                        meta={"keys": keys}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Checkpoints and stage manifest of the LAMMPS run directories (lammps/<name>/).
+
+Util_stage_inputs.py adds the checkpoint commands to every stage input:
+
+    restart <every> <stage>.a.restart <stage>.b.restart    periodic, before the first run
+    print "-1 $(step)" append <stage>.progress             step at which the stage starts
+    print "<k> $(step)" append <stage>.progress            after the k-th run/minimize
+    write_restart <stage>.<k>.restart
+
+so an interrupted stage can be resumed from the newest restart file: the k of the last
+<stage>.<k>.restart is the last completed run/minimize, and a periodic restart written
+after it lies inside run k + 1, which started at the step printed for k.
+Util_lammps_driver.py records every completed stage in stages.json and, with --resume,
+skips completed stages and restarts the others from their latest checkpoint.
+
+Usage (prints the checkpoint state of a run directory):
+    python Util_checkpoint.py <stage> [<stage> ...]
+"""
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+from Util_config import load_config
+
+MANIFEST_FILENAME = "stages.json"
+PRESERVED_SUFFIX = ".resume"
+
+RUN_COMMAND = re.compile(r"^\s*(run|minimize)\s")
+RESTART_COMMAND = re.compile(r"^\s*restart\s")
+
+
+def checkpoint_every(config=None):
+    """Steps between periodic restart files (0 disables the checkpoint commands)."""
+    if config is None:
+        config = load_config()
+    return int(config["checkpoint"].get("every") or 0)
+
+
+def progress_path(stage):
+    return f"{stage}.progress"
+
+
+def restart_path(stage, ordinal):
+    return f"{stage}.{ordinal}.restart"
+
+
+def periodic_paths(stage):
+    return [f"{stage}.a.restart", f"{stage}.b.restart"]
+
+
+def apply_checkpoints(lines, stage, every):
+    """
+    Add the checkpoint commands to an input file (list of lines).
+
+    Returns:
+        list: New lines (unchanged if every is 0 or the input already has a restart command)
+    """
+    if not every or any(RESTART_COMMAND.match(line) for line in lines):
+        return list(lines)
+
+    out = []
+    ordinal = 0
+    for line in lines:
+        if RUN_COMMAND.match(line):
+            if ordinal == 0:
+                out.append(f"restart {every} {' '.join(periodic_paths(stage))}\n")
+                out.append(f'print "-1 $(step)" append {progress_path(stage)} screen no\n')
+            out.append(line)
+            out.append(f'print "{ordinal} $(step)" append {progress_path(stage)} screen no\n')
+            out.append(f"write_restart {restart_path(stage, ordinal)}\n")
+            ordinal += 1
+            continue
+        out.append(line)
+    return out
+
+
+def read_progress(stage):
+    """{ordinal: step} of the stage's progress file (-1: stage start); later lines win."""
+    progress = {}
+    if not os.path.exists(progress_path(stage)):
+        return progress
+    with open(progress_path(stage), "r") as f:
+        for line in f:
+            parts = line.split()
+            try:
+                progress[int(parts[0])] = int(parts[1])
+            except (IndexError, ValueError):
+                continue
+    return progress
+
+
+def completed_ordinal(stage):
+    """Ordinal of the last run/minimize with a restart file (-1 if none)."""
+    ordinals = [-1]
+    for path in glob.glob(f"{glob.escape(stage)}.*.restart"):
+        middle = path[len(stage) + 1:-len(".restart")]
+        if middle.isdigit():
+            ordinals.append(int(middle))
+    return max(ordinals)
+
+
+def latest_checkpoint(stage):
+    """
+    Newest restart file of a stage.
+
+    Returns:
+        tuple or None: (restart file, last completed ordinal, whether the file lies inside
+                       the next run), None if the stage wrote no restart file
+    """
+    ordinal = completed_ordinal(stage)
+    completed_file = restart_path(stage, ordinal) if ordinal >= 0 else None
+    completed_time = os.path.getmtime(completed_file) if completed_file else -1.0
+
+    periodic = [path for path in periodic_paths(stage)
+                if os.path.exists(path) and os.path.getmtime(path) > completed_time]
+    if periodic:
+        return max(periodic, key=os.path.getmtime), ordinal, True
+    if completed_file:
+        return completed_file, ordinal, False
+    return None
+
+
+def clear_checkpoints(stage, keep=None):
+    """Remove the stage's restart files except keep (after the stage completed)."""
+    paths = glob.glob(f"{glob.escape(stage)}.*.restart")
+    for path in paths:
+        if path != keep:
+            os.remove(path)
+
+
+def read_manifest(path=MANIFEST_FILENAME):
+    """{stage: record} of the completed stages."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def record_stage(stage, input_file, restart_file=None, path=MANIFEST_FILENAME):
+    """Add a completed stage to the manifest."""
+    manifest = read_manifest(path)
+    manifest[stage] = {
+        "input": input_file,
+        "restart": restart_file,
+        "completed": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def has_checkpoint(run_dir):
+    """Whether a run directory holds a stage manifest or restart files to resume from."""
+    return (os.path.exists(os.path.join(run_dir, MANIFEST_FILENAME))
+            or bool(glob.glob(os.path.join(glob.escape(run_dir), "*.restart"))))
+
+
+def series_lines(path):
+    """(header lines, [(step, line)]) of a fix ave/time file."""
+    header, rows = [], []
+    with open(path, "r") as f:
+        for line in f:
+            parts = line.split()
+            if not parts or parts[0].startswith("#"):
+                if not rows:
+                    header.append(line)
+                continue
+            try:
+                rows.append((int(parts[0]), line))
+            except ValueError:
+                break
+    return header, rows
+
+
+def merge_series(prefix_path, path):
+    """Rows of prefix_path before the first step of path, then the rows of path, into path."""
+    header, rows = series_lines(prefix_path)
+    if os.path.exists(path):
+        new_header, new_rows = series_lines(path)
+        first = new_rows[0][0] if new_rows else None
+        rows = [row for row in rows if first is None or row[0] < first] + new_rows
+        header = header or new_header
+    with open(path, "w") as f:
+        f.writelines(header)
+        f.writelines(line if line.endswith("\n") else line + "\n" for _, line in rows)
+
+
+def preserve_series(paths):
+    """
+    Move the fix ave/time files of an interrupted stage aside (LAMMPS truncates them when
+    the fix is defined again); earlier preserved parts are merged in.
+    """
+    for path in paths:
+        preserved = path + PRESERVED_SUFFIX
+        if os.path.exists(preserved):
+            merge_series(preserved, path)
+        if os.path.exists(path):
+            os.replace(path, preserved)
+
+
+def restore_series(paths):
+    """Prepend the preserved part of every file to the series written after the resume."""
+    for path in paths:
+        preserved = path + PRESERVED_SUFFIX
+        if os.path.exists(preserved):
+            merge_series(preserved, path)
+            os.remove(preserved)
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.stderr.write("Usage: python Util_checkpoint.py <stage> [<stage> ...]\n")
+        sys.exit(1)
+    manifest = read_manifest()
+    for stage in sys.argv[1:]:
+        if stage in manifest:
+            print(f"{stage}: completed {manifest[stage]['completed']} ({manifest[stage]['restart']})")
+            continue
+        checkpoint = latest_checkpoint(stage)
+        if checkpoint is None:
+            print(f"{stage}: no checkpoint")
+        else:
+            restart_file, ordinal, inside = checkpoint
+            where = f"inside run/minimize {ordinal + 1}" if inside else f"after run/minimize {ordinal}"
+            print(f"{stage}: {restart_file} ({where}, progress {read_progress(stage)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Optional pipeline configuration shared by the Util scripts.
+
+Settings are read from aramidsim_config.json in the repository root (or from the file
+named by ARAMIDSIM_CONFIG) and merged over DEFAULT_CONFIG, so a config file only needs
+the keys it changes, e.g.
+
+    {"lammps": {"stages": {"pppm": {"ranks": 8, "threads": 2}}}}
+"""
+import copy
+import json
+import os
+import sys
+
+# realpath: batch work directories reach Util/ through a symlink
+UTIL_DIR = os.path.dirname(os.path.realpath(__file__))
+REPO_DIR = os.path.dirname(UTIL_DIR)
+CONFIG_FILENAME = "aramidsim_config.json"
+
+DEFAULT_CONFIG = {
+    "lammps": {
+        # MPI launcher and extra arguments placed before "-np N"
+        "mpirun": "mpirun",
+        "mpirun_args": [],
+        # Stage runner (Util_lammps_driver.py): "python" runs the stages in one in-process
+        # LAMMPS instance, "subprocess" one LAMMPS process per stage, "auto" in process
+        # when the shared library is built and no stage needs MPI ranks
+        "driver": "auto",
+        # Per-stage MPI ranks and OpenMP threads; ranks = null uses all budgeted cores
+        "stages": {
+            "default": {"ranks": None, "threads": 1},
+        },
+    },
+    "trajectory": {
+        # Per-stage trajectory output (Util_stage_inputs.py): xyz (template dumps), none,
+        # final, custom_gz, dcd or xtc, every `stride` steps
+        "default": {"format": "custom_gz", "stride": 5000},
+    },
+    "checkpoint": {
+        # Periodic restart files of the LAMMPS stages (Util_checkpoint.py); 0 disables
+        # checkpoints and resume
+        "every": 10000,
+    },
+    "preparation": {
+        # CPUs for the obabel/antechamber jobs (list or "0-3,8"); null = the pipeline's core budget
+        "cpus": None,
+    },
+    "convergence": {
+        # Stop the production (pppm) runs early once the monitored series plateau
+        "enabled": True,
+        # fix ave/time files to watch: interaction energy and density
+        "files": ["output1.txt", "output5.txt"],
+        # Plateau test over the last window_steps, never before min_steps
+        "window_steps": 100000,
+        "min_steps": 100000,
+        "n_blocks": 5,
+        # Relative drift across the window and relative standard error of the block means
+        "max_drift": 0.02,
+        "max_error": 0.01,
+        "poll_seconds": 30,
+        # Touched by the monitor; the LAMMPS inputs stop via fix halt when it exists
+        "flag_file": "converged.flag",
+    },
+}
+
+
+def merge_config(base, override):
+    """Recursively merge override into a copy of base."""
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def config_path():
+    return os.environ.get("ARAMIDSIM_CONFIG", os.path.join(REPO_DIR, CONFIG_FILENAME))
+
+
+def load_config():
+    """Return DEFAULT_CONFIG merged with the user config file (if any)."""
+    path = config_path()
+    if not os.path.exists(path):
+        return copy.deepcopy(DEFAULT_CONFIG)
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            user_config = json.load(f)
+    except (OSError, ValueError) as e:
+        sys.stderr.write(f"Warning: ignoring invalid config {path}: {e}\n")
+        return copy.deepcopy(DEFAULT_CONFIG)
+
+    return merge_config(DEFAULT_CONFIG, user_config)
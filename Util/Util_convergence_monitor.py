@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Convergence monitor for the production (pppm) LAMMPS runs.
+
+Runs the LAMMPS command, polls the fix ave/time files listed in the "convergence"
+section of the config and, once every series has plateaued (block-averaged drift and
+standard error under the thresholds), touches the flag file. The input scripts check
+the flag with
+
+    variable converged equal is_file(converged.flag)
+    fix halt_converged all halt 1000 v_converged > 0 error continue
+
+so the run ends cleanly and the rest of the input (write_data) still executes.
+A summary is written to convergence.json.
+
+Usage (run inside lammps/<name>/):
+    python Util_convergence_monitor.py -- <lammps command ...>
+"""
+import json
+import os
+import shlex
+import subprocess
+import sys
+import time
+
+from Util_config import load_config
+from Util_lammps_launcher import lammps_command
+from Util_timeseries import check_convergence, read_ave_time, window_samples
+
+SUMMARY_FILENAME = "convergence.json"
+# Path of this script as seen from the run directory (lammps/<name>/)
+MONITOR_SCRIPT = "../../../Util/Util_convergence_monitor.py"
+
+
+def check_series(series, settings):
+    """
+    Convergence check of in-memory series.
+
+    Args:
+        series (dict): File name -> (steps, values) of every monitored file
+
+    Returns:
+        tuple: (all converged, {file: check dict}, last step seen)
+    """
+    checks = {}
+    last_step = None
+    for path in settings["files"]:
+        steps, values = series.get(path, ((), ()))
+        if len(steps) == 0:
+            return False, checks, last_step
+        last_step = int(steps[-1]) if last_step is None else min(last_step, int(steps[-1]))
+        check = check_convergence(values, window_samples(steps, settings["window_steps"]),
+                                  settings["n_blocks"], settings["max_drift"], settings["max_error"])
+        check["converged"] = check["converged"] and int(steps[-1] - steps[0]) >= settings["min_steps"]
+        checks[path] = check
+
+    converged = bool(checks) and all(check["converged"] for check in checks.values())
+    return converged, checks, last_step
+
+
+def check_files(settings):
+    """check_series() of the monitored fix ave/time files."""
+    series = {}
+    for path in settings["files"]:
+        if not os.path.exists(path):
+            break
+        series[path] = read_ave_time(path)
+    return check_series(series, settings)
+
+
+def write_summary(converged_step, checks, settings):
+    summary = {
+        "converged": converged_step is not None,
+        "converged_step": converged_step,
+        "checks": checks,
+        "settings": settings,
+    }
+    with open(SUMMARY_FILENAME, "w") as f:
+        json.dump(summary, f, indent=2)
+
+
+def run_monitored(command, settings):
+    """
+    Run command while polling for convergence.
+
+    Returns:
+        int: Exit code of the command
+    """
+    flag_file = settings["flag_file"]
+    if os.path.exists(flag_file):
+        os.remove(flag_file)
+
+    proc = subprocess.Popen(command)
+    converged_step = None
+    checks = {}
+    while proc.poll() is None:
+        time.sleep(settings["poll_seconds"])
+        if converged_step is not None:
+            continue
+        converged, checks, last_step = check_files(settings)
+        if converged:
+            converged_step = last_step
+            open(flag_file, "w").close()
+            print(f"[convergence] plateau reached at step {last_step}, stopping run")
+
+    write_summary(converged_step, checks if converged_step is not None else check_files(settings)[1], settings)
+    return proc.returncode
+
+
+def monitored_shell_command(stage, input_file, config=None):
+    """
+    Shell command for a production stage: the launcher command wrapped by this monitor
+    when convergence stopping is enabled.
+    """
+    if config is None:
+        config = load_config()
+    command = lammps_command(stage, input_file, config)
+    if config["convergence"]["enabled"]:
+        command = ["python", MONITOR_SCRIPT, "--"] + command
+    return " ".join(shlex.quote(arg) for arg in command)
+
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ["--"]:
+        args = args[1:]
+    if not args:
+        sys.stderr.write("Usage: python Util_convergence_monitor.py -- <lammps command ...>\n")
+        sys.exit(1)
+    sys.exit(run_monitored(args, load_config()["convergence"]))
+
+
+if __name__ == "__main__":
+    main()
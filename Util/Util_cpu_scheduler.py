@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local CPU scheduler for the single-threaded preparation tools (obabel, antechamber).
+
+Every job is pinned to one CPU of the preparation CPU set: the "cpus" list of the
+"preparation" config section, else the pipeline's core budget (ARAMIDSIM_CPUS), else the
+process affinity. A CPU is claimed through an exclusive lock file in a node-local slot
+directory, so concurrent preparations (batch workers, Stretched and Solution) spread over
+the set instead of all running on core 0. When every CPU is taken, the job waits for the
+first one to be released.
+
+Usage (in the generated build scripts):
+    python ../Util/Util_cpu_scheduler.py run -- obabel -ismi test.smi ...
+    python ../Util/Util_cpu_scheduler.py cpus
+"""
+import fcntl
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+from Util_config import load_config
+from Util_profile import record_timing
+
+POLL_SECONDS = 0.1
+
+
+def slot_dir():
+    """Lock files of the claimed CPUs (override with ARAMIDSIM_CPU_SLOT_DIR)."""
+    default = os.path.join(tempfile.gettempdir(), f"aramidsim-cpu-slots-{os.getuid()}")
+    return os.environ.get("ARAMIDSIM_CPU_SLOT_DIR", default)
+
+
+def parse_cpu_list(text):
+    """'0-3,8,10-11' -> [0, 1, 2, 3, 8, 10, 11]"""
+    cpus = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def preparation_cpus(config=None):
+    """CPU set the preparation jobs are scheduled on (limited to the process affinity)."""
+    if config is None:
+        config = load_config()
+    cpus = config["preparation"]["cpus"]
+    if isinstance(cpus, str):
+        cpus = parse_cpu_list(cpus)
+    if not cpus and os.environ.get("ARAMIDSIM_CPUS"):
+        try:
+            cpus = parse_cpu_list(os.environ["ARAMIDSIM_CPUS"])
+        except ValueError:
+            sys.stderr.write(f"Warning: Invalid ARAMIDSIM_CPUS '{os.environ['ARAMIDSIM_CPUS']}'\n")
+            cpus = None
+    if hasattr(os, "sched_getaffinity"):
+        allowed = os.sched_getaffinity(0)
+        cpus = [cpu for cpu in (cpus or sorted(allowed)) if cpu in allowed] or sorted(allowed)
+    return sorted(set(cpus or range(os.cpu_count() or 1)))
+
+
+@contextmanager
+def claim_cpu(cpus):
+    """Hold the lock of one free CPU of cpus (waits while all are taken)."""
+    os.makedirs(slot_dir(), exist_ok=True)
+    # Start the search at a per-process offset so simultaneous jobs do not race for one CPU
+    start = os.getpid() % len(cpus)
+    order = cpus[start:] + cpus[:start]
+    while True:
+        for cpu in order:
+            lock_file = open(os.path.join(slot_dir(), f"cpu{cpu}.lock"), "w")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                continue
+            try:
+                yield cpu
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
+            return
+        time.sleep(POLL_SECONDS)
+
+
+def run_pinned(command, cpus=None):
+    """
+    Run command on one claimed CPU of the preparation set.
+
+    Returns:
+        int: The command's exit code
+    """
+    cpus = cpus or preparation_cpus()
+    requested = time.time()
+    with claim_cpu(cpus) as cpu:
+        start = time.time()
+        pin = (lambda: os.sched_setaffinity(0, {cpu})) if hasattr(os, "sched_setaffinity") else None
+        returncode = subprocess.run(command, preexec_fn=pin).returncode
+        record_timing("tool", os.path.basename(command[0]), time.time() - start, cpu=cpu,
+                      wait=round(start - requested, 3), returncode=returncode)
+        return returncode
+
+
+def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == "cpus":
+        print(",".join(str(cpu) for cpu in preparation_cpus()))
+        return
+    command = sys.argv[2:]
+    if command[:1] == ["--"]:
+        command = command[1:]
+    if len(sys.argv) < 2 or sys.argv[1] != "run" or not command:
+        sys.stderr.write("Usage: python Util_cpu_scheduler.py run -- <command> [args...]\n"
+                         "       python Util_cpu_scheduler.py cpus\n")
+        sys.exit(1)
+    sys.exit(run_pinned(command))
+
+
+if __name__ == "__main__":
+    main()
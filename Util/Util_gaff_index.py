@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compiled GAFF parameter index shared by the mol2tolt pipelines (addp.py).
+
+gaff.lt is parsed once into bond/angle/dihedral/improper dicts keyed by the
+hyphen-joined type names (e.g. "c-n", "ca-c-n") and pickled in the cache directory
+under the sha256 of gaff.lt, so the index is rebuilt automatically when gaff.lt changes.
+
+Usage (same arguments as addp.py):
+    python Util_gaff_index.py <name.frcmod> <name_add.lt> [gaff.lt]
+"""
+import os
+import pickle
+import sys
+import tempfile
+
+from Util_cache import cache_root, file_digest
+
+INDEX_NAMESPACE = "gaff_index"
+# Bump when the index layout changes
+INDEX_VERSION = 1
+
+# gaff.lt coeff lines: prefix -> (section, offset of the type key used by addp.py)
+COEFF_PREFIXES = {
+    "    bond_coeff @bond:": ("bond", 21),
+    "    angle_coeff @angle:": ("angle", 23),
+    "    dihedral_coeff @dihedral:": ("dihedral", 29),
+    # addp.py historically kept the "@improper:" label in the improper key
+    "    improper_coeff @improper:": ("improper", 20),
+}
+SECTIONS = ["bond", "angle", "dihedral", "improper"]
+
+
+def build_index(gaff_path):
+    """
+    Parse gaff.lt into {section: {type key: remainder of the coeff line}}.
+    The remainder keeps its leading whitespace so that "@bond:" + key + remainder
+    reproduces the original coeff line.
+    """
+    index = {section: {} for section in SECTIONS}
+    with open(gaff_path, "r") as f:
+        for line in f:
+            for prefix, (section, offset) in COEFF_PREFIXES.items():
+                if line.startswith(prefix):
+                    key = line[offset:].split()[0]
+                    index[section][key] = line[offset + len(key):-1] if section != "improper" else line[offset:-1]
+                    break
+    return index
+
+
+def index_path(gaff_path):
+    return os.path.join(cache_root(), INDEX_NAMESPACE, f"{file_digest(gaff_path)}.v{INDEX_VERSION}.pickle")
+
+
+def load_gaff_index(gaff_path="gaff.lt"):
+    """Return the compiled index of gaff_path, building and pickling it on first use."""
+    path = index_path(gaff_path)
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass
+
+    index = build_index(gaff_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".index-", dir=os.path.dirname(path))
+    with os.fdopen(fd, "wb") as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return index
+
+
+def write_add_lt(frcmod_path, out_path, index):
+    """Convert a parmchk2 frcmod file into the moltemplate *_add.lt settings (addp.py)."""
+    parm_bond = index["bond"]
+    parm_angle = index["angle"]
+    parm_dihedral = index["dihedral"]
+
+    a = open(frcmod_path, 'r').readlines()
+    index_line = [0, 0, 0, 0, 0]
+    for i in range(len(a)):
+        if 'BOND' in a[i]:
+            index_line[0] = i
+        if 'ANGLE' in a[i]:
+            index_line[1] = i
+        if 'DIHE' in a[i]:
+            index_line[2] = i
+        if 'IMPROPER' in a[i]:
+            index_line[3] = i
+        if 'NONBON' in a[i]:
+            index_line[4] = i
+    bond = a[index_line[0] + 1:index_line[1] - 1]
+    bond = [["".join(i[:5].split()), "".join(i[36:41].split())] for i in bond]
+    bo = [i[0].split("-") for i in bond]
+    angle = a[index_line[1] + 1:index_line[2] - 1]
+    angle = [["".join(i[:8].split()), "".join(i[40:48].split())] for i in angle]
+    an = [i[0].split("-") for i in angle]
+    dihedral = a[index_line[2] + 1:index_line[3] - 1]
+    dihedral = [["".join(i[:11].split()), "".join(i[68:79].split())] for i in dihedral]
+    di = [i[0].split("-") for i in dihedral]
+    improper = a[index_line[3] + 1:index_line[4] - 1]
+    improper = ["".join(i[:11].split()) for i in improper]
+    im = [i.split("-") for i in improper]
+
+    with open(out_path, 'w') as out:
+        print('write_once("In Settings") {', file=out)
+        for i in bond:
+            if i[1] in parm_bond:
+                print(f"    bond_coeff @bond:{i[0] + parm_bond[i[1]]}", file=out)
+        for i in angle:
+            if i[1] in parm_angle:
+                print(f"    angle_coeff @angle:{i[0] + parm_angle[i[1]]}", file=out)
+        for i in dihedral:
+            if i[1] in parm_dihedral:
+                print(f"    dihedral_coeff @dihedral:{i[0] + parm_dihedral[i[1]]}", file=out)
+        for i in improper:
+            print(f"    improper_coeff @improper:{i} cvff 0.3667 -1 2", file=out)
+        print("}", file=out)
+
+        print('write_once("Data Bonds By Type") {', file=out)
+        for i in range(len(bo)):
+            print(f"    @bond:{bond[i][0]} @atom:{bo[i][0]} @atom:{bo[i][1]}", file=out)
+        print("}", file=out)
+
+        print('write_once("Data Angles By Type") {', file=out)
+        for i in range(len(an)):
+            print(f"    @angle:{angle[i][0]} @atom:{an[i][0]} @atom:{an[i][1]} @atom:{an[i][2]}", file=out)
+        print("}", file=out)
+
+        print('write_once("Data Dihedrals By Type") {', file=out)
+        for i in range(len(di)):
+            print(f"    @dihedral:{dihedral[i][0]} @atom:{di[i][0]} @atom:{di[i][1]} @atom:{di[i][2]} @atom:{di[i][3]}", file=out)
+        print("}", file=out)
+
+        print('write_once("Data Impropers By Type") {', file=out)  # (gaff_imp.py) are not used here
+        for i in range(len(im)):
+            print(f"    @improper:{improper[i]} @atom:{im[i][2]} @atom:{im[i][1]} @atom:{im[i][0]} @atom:{im[i][3]}", file=out)
+        print("}", file=out)
+
+
+def main():
+    if len(sys.argv) not in (3, 4):
+        sys.stderr.write("Usage: python Util_gaff_index.py <name.frcmod> <name_add.lt> [gaff.lt]\n")
+        sys.exit(1)
+    gaff_path = sys.argv[3] if len(sys.argv) == 4 else "gaff.lt"
+    write_add_lt(sys.argv[1], sys.argv[2], load_gaff_index(gaff_path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Job graph for the Stretched/Solution pipelines (replaces the generated bash run scripts).
+
+A pipeline is a DAG of steps. Each step is a short list of shell lines with declared
+input and output files (paths relative to the pipeline directory); a step depends on
+the steps that produce its inputs, plus any steps named in `after`. Steps run as soon
+as their dependencies finished, so independent branches (polymer and solvent sides of
+Solution) run concurrently.
+
+Every step is content-hashed: the key covers its shell lines, the contents of its
+inputs and optional extra key strings. A step whose key matches the one recorded in
+.job_graph.json after its last successful run, and whose outputs are still there
+unchanged, is skipped. The scripts a step runs are listed among its inputs
+(script_inputs), so editing one of them re-runs the step.
+
+Usage (prints the recorded state of a pipeline directory):
+    python Util_job_graph.py [pipeline_dir]
+"""
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from Util_lammps_launcher import available_cores
+
+STATE_FILENAME = ".job_graph.json"
+
+# Shell prologue of the AmberTools steps (antechamber, parmchk2 and the Util scripts ran
+# inside this environment in the bash run scripts)
+AMBERTOOLS_PROLOGUE = [
+    "if ! command -v conda &> /dev/null; then",
+    "    echo \"❌ Conda not found. Please install Anaconda or Miniconda.\"",
+    "    exit 1",
+    "fi",
+    "source \"$(conda info --base)/etc/profile.d/conda.sh\"",
+    "conda activate AmberTools23 || {",
+    "    echo \"❌ AmberTools23 environment not found.\"",
+    "    exit 1",
+    "}",
+]
+
+
+class Step:
+    """
+    One pipeline step.
+
+    Attributes:
+        name (str): Unique step name
+        commands (list): Shell lines, run with `set -e` in cwd
+        inputs (list): Files read by the step (relative to the pipeline directory)
+        outputs (list): Files written by the step
+        cwd (str): Working directory of the shell lines (relative to the pipeline directory)
+        after (list): Names of extra steps that must finish first
+        key (list): Extra strings hashed into the step key (settings, versions)
+    """
+
+    def __init__(self, name, commands, inputs=(), outputs=(), cwd=".", after=(), key=()):
+        self.name = name
+        self.commands = list(commands)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.cwd = cwd
+        self.after = list(after)
+        self.key = list(key)
+
+
+def file_digest(path):
+    """sha256 of a file's contents, or None if it does not exist."""
+    if not os.path.isfile(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def script_inputs(*patterns):
+    """Step inputs for the scripts a step runs; glob patterns are expanded, sorted."""
+    paths = []
+    for pattern in patterns:
+        paths += sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+    return paths
+
+
+class JobGraph:
+    """Steps of one pipeline directory, executed in dependency order."""
+
+    def __init__(self, root=".", prologue=(), workers=None):
+        self.root = root
+        self.prologue = list(prologue)
+        self.workers = workers or available_cores()
+        self.steps = {}
+        # {step name: {"status": ran/skipped/failed/not run, "seconds": wall time}} of the last run()
+        self.timings = {}
+
+    def add(self, step):
+        if step.name in self.steps:
+            raise ValueError(f"duplicate step name: {step.name}")
+        self.steps[step.name] = step
+        return step
+
+    def path(self, path):
+        return os.path.normpath(os.path.join(self.root, path))
+
+    def dependencies(self):
+        """{step name: set of step names it waits for}"""
+        producers = {}
+        for step in self.steps.values():
+            for output in step.outputs:
+                producers[os.path.normpath(output)] = step.name
+        deps = {}
+        for step in self.steps.values():
+            names = {producers[os.path.normpath(path)] for path in step.inputs
+                     if os.path.normpath(path) in producers}
+            names.update(step.after)
+            names.discard(step.name)
+            unknown = names - set(self.steps)
+            if unknown:
+                raise ValueError(f"step {step.name} waits for unknown steps: {', '.join(sorted(unknown))}")
+            deps[step.name] = names
+        return deps
+
+    def step_key(self, step):
+        digest = hashlib.sha256()
+        digest.update("\n".join(step.commands).encode())
+        digest.update(step.cwd.encode())
+        for path in sorted(step.inputs):
+            digest.update(f"\0{path}\0{file_digest(self.path(path))}".encode())
+        for item in step.key:
+            digest.update(f"\0{item}".encode())
+        return digest.hexdigest()
+
+    def output_digests(self, step):
+        return {path: file_digest(self.path(path)) for path in step.outputs}
+
+    def read_state(self):
+        path = self.path(STATE_FILENAME)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write_state(self, state):
+        path = self.path(STATE_FILENAME)
+        with open(path + ".tmp", "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def up_to_date(self, step, key, state):
+        record = state.get(step.name)
+        if not record or record.get("key") != key:
+            return False
+        outputs = self.output_digests(step)
+        return all(digest is not None for digest in outputs.values()) and outputs == record.get("outputs")
+
+    def execute(self, step):
+        """Run the step's shell lines; returns the exit code."""
+        script = "\n".join(["set -e"] + self.prologue + step.commands) + "\n"
+        return subprocess.run(["bash", "-c", script], cwd=self.path(step.cwd)).returncode
+
+    def run(self):
+        """
+        Run every step whose key or outputs changed, in dependency order.
+
+        Returns:
+            bool: True if every step succeeded or was up to date
+        """
+        deps = self.dependencies()
+        state = self.read_state()
+        self.timings = {}
+        done, failed, scheduled = set(), set(), set()
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            while True:
+                changed = True
+                while changed:
+                    changed = False
+                    for name, step in self.steps.items():
+                        if name in done or name in failed or name in scheduled or not deps[name] <= done | failed:
+                            continue
+                        changed = True
+                        if deps[name] & failed:
+                            print(f"[graph] {name}: not run (dependency failed)", flush=True)
+                            failed.add(name)
+                            self.timings[name] = {"status": "not run", "seconds": 0.0}
+                            continue
+                        key = self.step_key(step)
+                        if self.up_to_date(step, key, state):
+                            print(f"[graph] {name}: unchanged, skipped", flush=True)
+                            done.add(name)
+                            self.timings[name] = {"status": "skipped", "seconds": 0.0}
+                            continue
+                        print(f"[graph] {name}: running", flush=True)
+                        running[pool.submit(self.execute, step)] = (name, key, time.time())
+                        scheduled.add(name)
+
+                if not running:
+                    if len(done) + len(failed) == len(self.steps):
+                        break
+                    stuck = sorted(set(self.steps) - done - failed)
+                    raise ValueError(f"dependency cycle between steps: {', '.join(stuck)}")
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name, key, start = running.pop(future)
+                    returncode = future.result()
+                    seconds = round(time.time() - start, 3)
+                    self.timings[name] = {"status": "ran" if returncode == 0 else "failed", "seconds": seconds}
+                    if returncode != 0:
+                        sys.stderr.write(f"[graph] {name}: failed (exit code {returncode})\n")
+                        failed.add(name)
+                        state.pop(name, None)
+                    else:
+                        print(f"[graph] {name}: done in {seconds:.1f} s", flush=True)
+                        done.add(name)
+                        state[name] = {"key": key, "outputs": self.output_digests(self.steps[name])}
+                    self.write_state(state)
+        return not failed
+
+
+def main():
+    root = sys.argv[1] if len(sys.argv) > 1 else "."
+    if len(sys.argv) > 2:
+        sys.stderr.write("Usage: python Util_job_graph.py [pipeline_dir]\n")
+        sys.exit(1)
+    state = JobGraph(root).read_state()
+    if not state:
+        print(f"No recorded steps in {os.path.join(root, STATE_FILENAME)}")
+    for name, record in state.items():
+        print(f"{name}: key {record['key'][:12]}, outputs {', '.join(record['outputs']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Array-backed model of LAMMPS data files written by moltemplate (system.data).
+
+The file is streamed once: header counts and box first, then every section
+(Masses, Atoms, Bonds, Angles, Dihedrals, Impropers) as structured NumPy arrays.
+Unknown sections are skipped.
+
+    read_data(path)                      whole file as a LammpsData model
+    iter_section(path, "Atoms")          one section in chunks of DEFAULT_CHUNK_ROWS rows
+    rewrite_column(src, dst, "Atoms", "mol", 1)
+                                         stream a copy with one column replaced
+    write_data(data, path)               moltemplate layout, written chunk by chunk
+
+Usage (prints the total mass in g/mol):
+    python Util_lammps_data.py mass <system.data>
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# Atoms section columns for each atom style (image flags and extra columns are ignored)
+ATOM_STYLE_FIELDS = {
+    "atomic": [("id", "i8"), ("type", "i8"), ("x", "f8"), ("y", "f8"), ("z", "f8")],
+    "charge": [("id", "i8"), ("type", "i8"), ("q", "f8"), ("x", "f8"), ("y", "f8"), ("z", "f8")],
+    "bond": [("id", "i8"), ("mol", "i8"), ("type", "i8"), ("x", "f8"), ("y", "f8"), ("z", "f8")],
+    "angle": [("id", "i8"), ("mol", "i8"), ("type", "i8"), ("x", "f8"), ("y", "f8"), ("z", "f8")],
+    "molecular": [("id", "i8"), ("mol", "i8"), ("type", "i8"), ("x", "f8"), ("y", "f8"), ("z", "f8")],
+    "full": [("id", "i8"), ("mol", "i8"), ("type", "i8"), ("q", "f8"), ("x", "f8"), ("y", "f8"), ("z", "f8")],
+}
+DEFAULT_ATOM_STYLE = "full"
+
+# Rows parsed/formatted per chunk when streaming large (solvated) systems
+DEFAULT_CHUNK_ROWS = 100000
+
+SECTION_FIELDS = {
+    "Masses": [("type", "i8"), ("mass", "f8")],
+    "Bonds": [("id", "i8"), ("type", "i8"), ("atom1", "i8"), ("atom2", "i8")],
+    "Angles": [("id", "i8"), ("type", "i8"), ("atom1", "i8"), ("atom2", "i8"), ("atom3", "i8")],
+    "Dihedrals": [("id", "i8"), ("type", "i8"), ("atom1", "i8"), ("atom2", "i8"), ("atom3", "i8"), ("atom4", "i8")],
+    "Impropers": [("id", "i8"), ("type", "i8"), ("atom1", "i8"), ("atom2", "i8"), ("atom3", "i8"), ("atom4", "i8")],
+}
+
+# Header keyword that gives the number of rows of each section
+SECTION_COUNT_KEYS = {
+    "Masses": "atom types",
+    "Atoms": "atoms",
+    "Bonds": "bonds",
+    "Angles": "angles",
+    "Dihedrals": "dihedrals",
+    "Impropers": "impropers",
+}
+
+# Topology sections in the order moltemplate writes them
+TOPOLOGY_SECTIONS = ["Bonds", "Angles", "Dihedrals", "Impropers"]
+COUNT_KEYS = ["atoms", "bonds", "angles", "dihedrals", "impropers"]
+TYPE_COUNT_KEYS = ["atom types", "bond types", "angle types", "dihedral types", "improper types"]
+BOX_AXES = ["x", "y", "z"]
+
+
+class LammpsData:
+    """
+    Parsed data file.
+
+    Attributes:
+        title (str): First line of the file
+        counts (dict): Header counts, e.g. {"atoms": 4200, "atom types": 9, ...}
+        box (dict): {"x": (lo, hi), "y": (lo, hi), "z": (lo, hi)}
+        tilt (tuple or None): (xy, xz, yz) of a triclinic box
+        extra_header (list): Other header lines, kept verbatim
+        atom_style (str): Style hint of the Atoms section
+        sections (dict): Section name -> structured NumPy array
+    """
+
+    def __init__(self, title="LAMMPS Description"):
+        self.title = title
+        self.counts = {}
+        self.box = {}
+        self.tilt = None
+        self.extra_header = []
+        self.atom_style = DEFAULT_ATOM_STYLE
+        self.sections = {}
+
+    @property
+    def atoms(self):
+        return self.section("Atoms")
+
+    def section(self, name):
+        """Section array, or an empty array of the right dtype when the file has none."""
+        if name in self.sections:
+            return self.sections[name]
+        return np.empty(0, dtype=section_dtype(name, self.atom_style))
+
+
+def section_dtype(name, atom_style=DEFAULT_ATOM_STYLE):
+    if name == "Atoms":
+        return np.dtype(ATOM_STYLE_FIELDS[atom_style])
+    return np.dtype(SECTION_FIELDS[name])
+
+
+def section_name(line):
+    """'Atoms  # full' -> ('Atoms', 'full'); the style hint is None when absent."""
+    head, _, comment = line.partition("#")
+    return head.strip(), (comment.strip() or None)
+
+
+def is_section_header(tokens):
+    return bool(tokens) and tokens[0][0].isalpha()
+
+
+def split_line(line):
+    """Data tokens of a line (comment removed) and the comment text (or None)."""
+    body, sep, comment = line.partition("#")
+    return body.split(), (comment.strip() if sep else None)
+
+
+def parse_header_line(data, tokens, line):
+    """
+    Store a count ('4200 atoms'), box ('0.0 80.0 xlo xhi') or tilt line ('0.0 0.0 0.0 xy xz yz')
+    in data; any other header line is kept verbatim in data.extra_header.
+    """
+    if len(tokens) >= 6 and tokens[3:6] == ["xy", "xz", "yz"]:
+        data.tilt = tuple(float(token) for token in tokens[:3])
+    elif len(tokens) >= 4 and tokens[2][1:] == "lo" and tokens[3][1:] == "hi":
+        data.box[tokens[2][0]] = (float(tokens[0]), float(tokens[1]))
+    elif len(tokens) >= 2 and tokens[0].isdigit():
+        data.counts[" ".join(tokens[1:])] = int(tokens[0])
+    else:
+        data.extra_header.append(line.rstrip("\n"))
+
+
+def fill_section(rows, dtype):
+    """Convert the token rows of one section into a structured array."""
+    arr = np.empty(len(rows), dtype=dtype)
+    if not rows:
+        return arr
+    ncols = len(dtype.names)
+    table = np.array([row[:ncols] for row in rows])
+    for col, name in enumerate(dtype.names):
+        arr[name] = table[:, col].astype(dtype[name])
+    return arr
+
+
+def scan(f):
+    """
+    Stream the lines after the title line.
+
+    Yields:
+        tuple: (section, style, tokens, line); section is None in the header and tokens
+               is None on a section keyword line
+    """
+    section, style = None, None
+    for line in f:
+        tokens = line.split("#", 1)[0].split()
+        if is_section_header(tokens):
+            section, style = section_name(line)
+            yield section, style, None, line
+        else:
+            yield section, style, tokens, line
+
+
+def iter_chunks(f, names=None, chunk_rows=DEFAULT_CHUNK_ROWS, data=None):
+    """
+    Stream sections of an open data file (positioned after the title line) as chunks.
+
+    Args:
+        f: Open data file
+        names (iterable): Sections to return (default: all known sections)
+        chunk_rows (int): Maximum rows per chunk
+        data (LammpsData): If given, header counts, box and atom style are stored in it
+
+    Yields:
+        tuple: (section name, structured array of at most chunk_rows rows)
+    """
+    names = set(SECTION_COUNT_KEYS if names is None else names)
+    remaining = set(names)
+    atom_style = DEFAULT_ATOM_STYLE
+    current, dtype, rows = None, None, []
+
+    for section, style, tokens, line in scan(f):
+        if tokens is None:
+            if rows:
+                yield current, fill_section(rows, dtype)
+                rows = []
+            remaining.discard(current)
+            if not remaining:
+                return
+            if section == "Atoms" and style in ATOM_STYLE_FIELDS:
+                atom_style = style
+                if data is not None:
+                    data.atom_style = style
+            current = section if section in names else None
+            dtype = section_dtype(section, atom_style) if current else None
+            continue
+        if not tokens:
+            continue
+        if section is None:
+            if data is not None:
+                parse_header_line(data, tokens, line)
+        elif current is not None:
+            rows.append(tokens)
+            if len(rows) >= chunk_rows:
+                yield current, fill_section(rows, dtype)
+                rows = []
+
+    if rows:
+        yield current, fill_section(rows, dtype)
+
+
+def iter_section(path, name, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield one section of a data file as structured-array chunks (stops after it)."""
+    with open(path, "r") as f:
+        f.readline()
+        for _, chunk in iter_chunks(f, [name], chunk_rows):
+            yield chunk
+
+
+def read_section(path, name):
+    """One whole section as a structured array."""
+    chunks = list(iter_section(path, name))
+    if not chunks:
+        raise ValueError(f"{path}: no {name} section")
+    return np.concatenate(chunks)
+
+
+def read_data(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Parse a data file into a LammpsData model in a single streaming pass.
+
+    Raises:
+        ValueError: If a section row count disagrees with its header count
+    """
+    with open(path, "r") as f:
+        data = LammpsData(f.readline().strip() or "LAMMPS Description")
+        chunks = {}
+        for name, chunk in iter_chunks(f, chunk_rows=chunk_rows, data=data):
+            chunks.setdefault(name, []).append(chunk)
+
+    for name, parts in chunks.items():
+        data.sections[name] = np.concatenate(parts)
+        count = data.counts.get(SECTION_COUNT_KEYS[name])
+        if count is not None and count != len(data.sections[name]):
+            raise ValueError(f"{path}: section {name} has {len(data.sections[name])} rows, header says {count}")
+    return data
+
+
+def chain_mol_ids(n_atoms, n_chains):
+    """
+    Molecule IDs 1..n_chains for atoms stored chain after chain: atom i (0-based) belongs
+    to chain j+1 when j*n_atoms//n_chains <= i < (j+1)*n_atoms//n_chains.
+    """
+    bounds = np.array([j * n_atoms // n_chains for j in range(1, n_chains)], dtype=np.int64)
+    return np.searchsorted(bounds, np.arange(n_atoms), side="right") + 1
+
+
+def format_rows(section, fields, sep, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield text lines for a structured array, converting chunk_rows rows at a time."""
+    for start in range(0, len(section), chunk_rows):
+        chunk = section[start:start + chunk_rows]
+        columns = [chunk[name].tolist() for name in fields]
+        yield "".join(sep.join(map(str, row)) + "\n" for row in zip(*columns))
+
+
+def write_data(data, path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Write the model in moltemplate's layout (full atom style, standard sections only).
+    Other header counts, the tilt factors and unrecognized header lines follow the box.
+    """
+    with open(path, "w") as f:
+        f.write(f"{data.title}\n\n")
+        f.write("".join(f"{data.counts.get(key, 0)} {key}\n" for key in COUNT_KEYS) + "\n")
+        f.write("".join(f"{data.counts.get(key, 0)} {key}\n" for key in TYPE_COUNT_KEYS) + "\n")
+        f.write("".join(f"{data.box[axis][0]} {data.box[axis][1]} {axis}lo {axis}hi\n" for axis in BOX_AXES))
+        if data.tilt is not None:
+            f.write(" ".join(map(str, data.tilt)) + " xy xz yz\n")
+        f.write("".join(f"{count} {key}\n" for key, count in data.counts.items()
+                        if key not in COUNT_KEYS and key not in TYPE_COUNT_KEYS))
+        f.write("".join(line + "\n" for line in data.extra_header))
+
+        f.write("\nMasses\n\n")
+        masses = data.section("Masses")["mass"].tolist()
+        f.write("".join(f"{i + 1} {mass}\n" for i, mass in enumerate(masses)))
+
+        f.write("\nAtoms # full\n\n")
+        f.writelines(format_rows(data.atoms, ("id", "mol", "type", "q", "x", "y", "z"), "   ", chunk_rows))
+
+        for name in TOPOLOGY_SECTIONS:
+            f.write(f"\n{name}\n\n")
+            section = data.section(name)
+            f.writelines(format_rows(section, section.dtype.names, "  ", chunk_rows))
+        f.write("\n")
+
+
+def rewrite_column(src, dst, section, field, value):
+    """
+    Stream src to dst, replacing one column of a section (e.g. the Atoms molecule ID).
+
+    Lines outside the section are copied verbatim; rewritten rows are re-joined with
+    single spaces. dst may equal src (written through a temporary file).
+
+    Args:
+        section (str): Section name, e.g. "Atoms"
+        field (str): Column name from the section dtype, e.g. "mol"
+        value: Scalar for every row, or a sequence with one value per row
+    """
+    per_row = np.ndim(value) > 0
+    dst_dir = os.path.dirname(os.path.abspath(dst))
+    fd, tmp_path = tempfile.mkstemp(prefix=".rewrite-", dir=dst_dir)
+    try:
+        with open(src, "r") as fin, os.fdopen(fd, "w") as fout:
+            fout.write(fin.readline())
+            atom_style = DEFAULT_ATOM_STYLE
+            column = None
+            row = 0
+            for name, style, tokens, line in scan(fin):
+                if tokens is None:
+                    if name == "Atoms" and style in ATOM_STYLE_FIELDS:
+                        atom_style = style
+                    column = section_dtype(name, atom_style).names.index(field) if name == section else None
+                elif column is not None and tokens:
+                    tokens, comment = split_line(line)
+                    tokens[column] = str(value[row] if per_row else value)
+                    row += 1
+                    line = " ".join(tokens) + (f" # {comment}" if comment is not None else "") + "\n"
+                fout.write(line)
+        os.replace(tmp_path, dst)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return row
+
+
+def total_mass(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Total mass of all atoms in a data file (g/mol with real/metal units), streamed."""
+    masses = []
+    type_counts = np.zeros(1, dtype=np.int64)
+    with open(path, "r") as f:
+        f.readline()
+        for name, chunk in iter_chunks(f, ["Masses", "Atoms"], chunk_rows):
+            if name == "Masses":
+                masses.append(chunk)
+            else:
+                counts = np.bincount(chunk["type"])
+                if len(counts) > len(type_counts):
+                    counts[:len(type_counts)] += type_counts
+                    type_counts = counts
+                else:
+                    type_counts[:len(counts)] += counts
+
+    masses = np.concatenate(masses) if masses else np.empty(0, dtype=section_dtype("Masses"))
+    mass_by_type = np.zeros(max(len(type_counts), masses["type"].max(initial=0) + 1))
+    mass_by_type[masses["type"]] = masses["mass"]
+
+    used = np.flatnonzero(type_counts)
+    missing = sorted(set(used.tolist()) - set(masses["type"].tolist()))
+    if missing:
+        raise ValueError(f"{path}: no Masses entry for atom types {missing}")
+    return float(np.dot(type_counts, mass_by_type[:len(type_counts)]))
+
+
+def main():
+    if len(sys.argv) != 3 or sys.argv[1] != "mass":
+        sys.stderr.write("Usage: python Util_lammps_data.py mass <system.data>\n")
+        sys.exit(1)
+    print(total_mass(sys.argv[2]))
+
+
+if __name__ == "__main__":
+    main()
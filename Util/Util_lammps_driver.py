@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+In-process LAMMPS driver for the stage inputs of a run directory.
+
+The stages (e.g. npt2, then pppm) run in one LAMMPS instance through the bundled Python
+module (Util/lammps-2Aug2023/python, shared library built by set_up.py):
+
+    - the atoms stay resident between stages: the write_data of the file the next stage
+      reads is skipped, and so are the next stage's read_data and the init commands that
+      need an empty box (units, atom_style, bond/angle/dihedral/improper styles);
+      pair_style, kspace_style, pair_modify and the _long settings are applied in place
+    - the production runs of the last stage are advanced in chunks of the fix ave/time
+      output interval; after every chunk the fix values are pulled with extract_fix into
+      NumPy buffers, the convergence check runs on them (Util_convergence_monitor settings)
+      and the stage stops as soon as the series plateau. The buffers are saved to
+      lammps_series.npz, which Util_timeseries reads instead of the text files.
+
+When the shared library is missing or was built without -DLAMMPS_EXCEPTIONS, or the
+launcher would start MPI ranks for a stage, every stage runs as a separate LAMMPS process
+(Util_lammps_launcher, convergence monitor on the last stage) as before. The "driver"
+entry of the "lammps" config section forces either path ("python" or "subprocess";
+default "auto").
+
+Completed stages are recorded in stages.json; with --resume they are skipped and an
+interrupted stage continues from its latest restart file (see Util_checkpoint.py).
+Each stage logs to log.<stage>.lammps, whose timing breakdown Util_profile.py reads.
+
+Usage (in lammps/<name>/, stages in run order):
+    python Util_lammps_driver.py [--resume] npt2=run.in.npt2 pppm=run.in.npt2_pppm
+"""
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+
+from Util_checkpoint import (clear_checkpoints, completed_ordinal, latest_checkpoint, preserve_series,
+                             read_manifest, read_progress, record_stage, restart_path, restore_series,
+                             PRESERVED_SUFFIX)
+from Util_config import UTIL_DIR, load_config
+from Util_convergence_monitor import check_series, run_monitored, write_summary
+from Util_cpu_scheduler import parse_cpu_list
+from Util_lammps_launcher import available_cores, lammps_command, stage_settings
+from Util_profile import stage_log
+from Util_timeseries import SERIES_FILENAME, read_ave_time
+
+LAMMPS_PYTHON_DIR = os.path.join(UTIL_DIR, "lammps-2Aug2023", "python")
+DRIVERS = ["auto", "python", "subprocess"]
+
+# Init commands that require an empty box; the force-field styles are identical in the
+# init and init_long files, so only the pair/kspace settings are re-issued in place
+RESIDENT_SKIP = {"units", "atom_style", "dimension", "boundary", "newton", "atom_modify",
+                 "bond_style", "angle_style", "dihedral_style", "improper_style"}
+# Commands of an interrupted stage that are not replayed after read_restart (the restart
+# file holds their result) when the stage is resumed
+REPLAY_SKIP = {"read_data", "read_restart", "create_box", "create_atoms", "delete_atoms", "replicate",
+               "displace_atoms", "set", "group", "velocity", "change_box", "reset_timestep", "write_data",
+               "write_restart", "write_dump", "minimize", "run", "print"}
+DEFAULT_CHUNK = 5000
+
+
+def load_lammps():
+    """The lammps class of the bundled Python module, or None if it cannot be imported."""
+    if LAMMPS_PYTHON_DIR not in sys.path:
+        sys.path.insert(0, LAMMPS_PYTHON_DIR)
+    try:
+        from lammps import lammps
+    except ImportError:
+        return None
+    return lammps
+
+
+def read_commands(path):
+    """Commands of a LAMMPS input file ('&' continuations joined, blank and comment lines dropped)."""
+    commands, pending = [], ""
+    with open(path, "r") as f:
+        for line in f:
+            line = line.rstrip("\r\n").rstrip()
+            if line.endswith("&"):
+                pending += line[:-1] + " "
+                continue
+            line, pending = (pending + line).strip(), ""
+            if line and not line.startswith("#"):
+                commands.append(line)
+    return commands
+
+
+def command_words(command):
+    """Words of a command with quotes removed and trailing comments dropped."""
+    try:
+        return shlex.split(command, comments=True)
+    except ValueError:
+        return command.split()
+
+
+def expand_includes(commands, skip=frozenset()):
+    """Inline the include files of commands (their commands named in skip are dropped)."""
+    expanded = []
+    for command in commands:
+        words = command_words(command)
+        if words[:1] == ["include"] and len(words) > 1:
+            included = read_commands(words[1])
+            expanded.extend(c for c in expand_includes(included, skip) if command_words(c)[0] not in skip)
+        else:
+            expanded.append(command)
+    return expanded
+
+
+def data_file_read(commands):
+    """File of the first read_data of commands (None if there is none)."""
+    for command in commands:
+        words = command_words(command)
+        if words[:1] == ["read_data"] and len(words) > 1:
+            return words[1]
+    return None
+
+
+def resident_commands(commands, data_file):
+    """
+    Commands of a stage that starts from the atoms already in memory: includes are
+    inlined without the empty-box init commands, and the read_data is dropped.
+    """
+    resident = []
+    for command in expand_includes(commands, RESIDENT_SKIP):
+        words = command_words(command)
+        if words[0] in RESIDENT_SKIP or (words[0] == "read_data" and words[1:2] == [data_file]):
+            continue
+        resident.append(command)
+    return resident
+
+
+def without_write_data(commands, data_file):
+    """commands without the write_data of data_file (the next stage keeps the atoms in memory)."""
+    return [c for c in commands if command_words(c)[:2] != ["write_data", data_file]]
+
+
+def run_bounds(words, step):
+    """
+    (start, stop) timesteps of a run command executed at step, or None for run keywords
+    other than upto/start/stop.
+    """
+    if words[0] != "run" or len(words) < 2:
+        return None
+    n = int(words[1])
+    start, stop = step, step + n
+    rest = words[2:]
+    while rest:
+        if rest[0] == "upto":
+            stop = n
+            rest = rest[1:]
+        elif rest[0] == "start" and len(rest) > 1:
+            start, rest = int(rest[1]), rest[2:]
+        elif rest[0] == "stop" and len(rest) > 1:
+            rest = rest[2:]
+        else:
+            return None
+    return start, stop
+
+
+def resumed_dump(command, words):
+    """Dump command writing to <stem>_from<step>.<ext> so the frames before the resume are kept."""
+    if len(words) < 6 or words[0] != "dump":
+        return command
+    stem, dot, ext = words[5].partition(".")
+    return command.replace(words[5], f"{stem}_from$(step){dot}{ext}", 1)
+
+
+def resume_commands(commands, restart_file, ordinal, inside, start_step):
+    """
+    Commands that continue a stage from a restart file.
+
+    The restart file is read instead of the init/read_data commands. The set-up commands
+    up to run/minimize number ordinal + 1 are replayed (fixes, computes, variables, dumps
+    to new files), while REPLAY_SKIP commands are left out since their results (atoms,
+    groups, velocities) are in the restart file. When the restart file lies inside that run (inside), the run finishes
+    the original step range started at start_step; everything after it runs unchanged.
+    """
+    resumed = [f"read_restart {restart_file}"]
+    index = -1
+    for command in expand_includes(commands, RESIDENT_SKIP):
+        words = command_words(command)
+        if words[0] in RESIDENT_SKIP:
+            continue
+        if words[0] in ("run", "minimize"):
+            index += 1
+        if index > ordinal + 1 or (index == ordinal + 1 and words[0] not in ("run", "minimize")):
+            resumed.append(command)
+        elif index == ordinal + 1:
+            bounds = run_bounds(words, start_step) if inside else None
+            if bounds is not None:
+                start, stop = bounds
+                command = f"run {stop} upto start {start} stop {stop}"
+            resumed.append(command)
+        elif words[0] == "print" and start_step is None:
+            # Stage start marker of a stage that never ran
+            resumed.append(command)
+        elif words[0] == "dump":
+            resumed.append(resumed_dump(command, words))
+        elif words[0] not in REPLAY_SKIP:
+            resumed.append(command)
+    return resumed
+
+
+def deform_active(commands, ordinal):
+    """Whether a fix deform is active during run/minimize number ordinal of commands."""
+    active = set()
+    index = -1
+    for command in commands:
+        words = command_words(command)
+        if words[0] in ("run", "minimize"):
+            index += 1
+            if index == ordinal:
+                return bool(active)
+        elif words[0] == "fix" and len(words) > 3 and words[3] == "deform":
+            active.add(words[1])
+        elif words[0] == "unfix" and len(words) > 1:
+            active.discard(words[1])
+    return False
+
+
+def resume_point(i, stages, stage_commands, manifest):
+    """
+    Where stage i continues after an interruption.
+
+    Returns:
+        tuple or None: resume_commands() arguments (restart file, ordinal, inside,
+                       start step), None when the stage starts from its input
+    """
+    stage = stages[i][0]
+    checkpoint = latest_checkpoint(stage)
+    if checkpoint is not None:
+        restart_file, ordinal, inside = checkpoint
+        start_step = read_progress(stage).get(ordinal)
+        if inside and (start_step is None or deform_active(stage_commands[i], ordinal + 1)):
+            # fix deform takes its reference box at the start of the run: redo the whole run
+            if ordinal < 0:
+                return None
+            restart_file, inside = restart_path(stage, ordinal), False
+        return restart_file, ordinal, inside, start_step
+    # Previous stage completed in process: its data file was never written
+    data_file = data_file_read(stage_commands[i])
+    previous = manifest.get(stages[i - 1][0]) if i > 0 else None
+    if previous and previous.get("restart") and data_file and not os.path.exists(data_file):
+        return previous["restart"], -1, False, None
+    return None
+
+
+def complete_stage(stage, path, commands):
+    """Manifest entry, merged series and checkpoint clean-up of a completed stage."""
+    restore_series(ave_time_files(expand_includes(commands)))
+    ordinal = completed_ordinal(stage)
+    restart_file = restart_path(stage, ordinal) if ordinal >= 0 else None
+    clear_checkpoints(stage, keep=restart_file)
+    record_stage(stage, path, restart_file)
+
+
+def ave_time_files(commands):
+    """
+    Single-value fix ave/time outputs of commands.
+
+    Returns:
+        dict: File name -> (fix ID, Nfreq)
+    """
+    files = {}
+    for command in commands:
+        words = command_words(command)
+        if len(words) > 7 and words[0] == "fix" and words[3] == "ave/time" and "file" in words:
+            file_index = words.index("file")
+            values = words[7:file_index]
+            if len(values) == 1 and file_index + 1 < len(words):
+                files[words[file_index + 1]] = (words[1], int(words[6]))
+    return files
+
+
+class SeriesBuffer:
+    """
+    Per-file NumPy buffers of the fix ave/time scalars sampled after each run chunk.
+
+    The part of a series written before a resume (moved aside by preserve_series) is
+    loaded first, so the statistics and the convergence check see the whole stage.
+    """
+
+    def __init__(self, files):
+        self.files = files
+        self.steps = {name: [] for name in files}
+        self.values = {name: [] for name in files}
+        self.prefix = {}
+        for name in files:
+            if os.path.exists(name + PRESERVED_SUFFIX):
+                self.prefix[name] = read_ave_time(name + PRESERVED_SUFFIX)
+
+    def sample(self, lmp):
+        from lammps import LMP_STYLE_GLOBAL, LMP_TYPE_SCALAR
+        step = lmp.extract_global("ntimestep")
+        for name, (fix_id, nfreq) in self.files.items():
+            if step < nfreq or step % nfreq or (self.steps[name] and self.steps[name][-1] == step):
+                continue
+            self.steps[name].append(step)
+            self.values[name].append(lmp.extract_fix(fix_id, LMP_STYLE_GLOBAL, LMP_TYPE_SCALAR))
+
+    def series(self):
+        """File name -> (steps, values) as NumPy arrays."""
+        series = {}
+        for name in self.files:
+            steps = np.array(self.steps[name], dtype=np.int64)
+            values = np.array(self.values[name], dtype=float)
+            if name in self.prefix:
+                prefix_steps, prefix_values = self.prefix[name]
+                keep = prefix_steps < steps[0] if len(steps) else np.ones(len(prefix_steps), dtype=bool)
+                steps = np.concatenate([prefix_steps[keep], steps])
+                values = np.concatenate([prefix_values[keep], values])
+            series[name] = (steps, values)
+        return series
+
+    def save(self, path=SERIES_FILENAME):
+        np.savez(path, **{name: np.column_stack(series) for name, series in self.series().items()})
+
+
+def clear_stage(lmp):
+    """Drop the fixes, computes and dumps of the previous stage and restart the step count."""
+    for fix_id in lmp.available_ids("fix"):
+        if not fix_id.startswith("package_"):
+            lmp.command(f"unfix {fix_id}")
+    for compute_id in lmp.available_ids("compute"):
+        if not compute_id.startswith("thermo_"):
+            lmp.command(f"uncompute {compute_id}")
+    for dump_id in lmp.available_ids("dump"):
+        lmp.command(f"undump {dump_id}")
+    lmp.command("reset_timestep 0")
+
+
+def run_production(lmp, commands, convergence):
+    """
+    Execute the last stage; its run commands advance in chunks of the smallest ave/time
+    Nfreq, sampling the outputs and stopping early on convergence.
+
+    Returns:
+        bool: Whether the stage stopped on convergence
+    """
+    buffer = SeriesBuffer(ave_time_files(commands))
+    chunk = min((nfreq for _, nfreq in buffer.files.values()), default=DEFAULT_CHUNK)
+    converged_step = None
+    checks = {}
+    for command in commands:
+        words = command_words(command)
+        if converged_step is not None and words[0] in ("run", "minimize"):
+            continue
+        step = lmp.extract_global("ntimestep")
+        bounds = run_bounds(words, step)
+        if bounds is None:
+            lmp.command(command)
+            continue
+
+        start, stop = bounds
+        first = step
+        while step < stop and converged_step is None:
+            n = min(chunk - step % chunk, stop - step)
+            # The timing breakdown is logged for the first and the last chunk only
+            # (Util_profile scales it to the summed loop time of all chunks)
+            post = "yes" if step == first or step + n == stop else "no"
+            lmp.command(f"run {n} start {start} stop {stop} pre {'yes' if step == first else 'no'} post {post}")
+            step += n
+            buffer.sample(lmp)
+            if convergence["enabled"]:
+                converged, checks, last_step = check_series(buffer.series(), convergence)
+                if converged:
+                    converged_step = last_step
+                    print(f"[convergence] plateau reached at step {last_step}, stopping run")
+
+    buffer.save()
+    if convergence["enabled"]:
+        write_summary(converged_step, checks or check_series(buffer.series(), convergence)[1], convergence)
+    return converged_step is not None
+
+
+def driver_threads(stage, config):
+    """OpenMP threads of the in-process run: the launcher's serial-binary rule."""
+    settings = stage_settings(stage, config)
+    threads = max(1, int(settings.get("threads") or 1))
+    if settings.get("ranks") is None:
+        threads *= max(1, available_cores() // threads)
+    return threads
+
+
+def run_in_process(lammps, stages, config, resume=False):
+    """
+    Run the stages [(stage, input file), ...] in one LAMMPS instance.
+
+    Returns:
+        int: 0 on success, 1 if a LAMMPS command failed
+    """
+    if os.environ.get("ARAMIDSIM_CPUS") and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, parse_cpu_list(os.environ["ARAMIDSIM_CPUS"]))
+    threads = driver_threads(stages[-1][0], config)
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    convergence = config["convergence"]
+    if os.path.exists(convergence["flag_file"]):
+        os.remove(convergence["flag_file"])
+
+    lmp = lammps(cmdargs=["-nocite"])
+    if not lmp.has_exceptions:
+        # Without exceptions a failed command would exit the interpreter mid-stage
+        lmp.close()
+        raise OSError("the LAMMPS library was built without -DLAMMPS_EXCEPTIONS (rebuild it with set_up.py)")
+    try:
+        if threads > 1 and lmp.has_package("OPENMP"):
+            lmp.command(f"package omp {threads}")
+            lmp.command("suffix omp")
+        stage_commands = [read_commands(path) for _, path in stages]
+        manifest = read_manifest() if resume else {}
+        resident_data = None
+        for i, commands in enumerate(stage_commands):
+            stage, path = stages[i]
+            if stage in manifest:
+                print(f"[driver] stage {stage}: completed, skipped")
+                continue
+            point = resume_point(i, stages, stage_commands, manifest) if resume and resident_data is None else None
+            if resident_data is not None:
+                clear_stage(lmp)
+                commands = resident_commands(commands, resident_data)
+            elif point is not None:
+                print(f"[driver] stage {stage}: resuming from {point[0]}")
+                preserve_series(ave_time_files(expand_includes(commands)))
+                commands = resume_commands(commands, *point)
+            next_data = data_file_read(stage_commands[i + 1]) if i + 1 < len(stage_commands) else None
+            if next_data is not None:
+                commands = without_write_data(commands, next_data)
+            print(f"[driver] stage {stage}: {path}")
+            # One log per stage for the timing profile (appended to when resumed)
+            lmp.command(f"log {stage_log(stage)}" + (" append" if point is not None else ""))
+            if i + 1 < len(stage_commands):
+                lmp.commands_list(commands)
+            else:
+                run_production(lmp, expand_includes(commands), convergence)
+            complete_stage(stage, path, stage_commands[i])
+            resident_data = next_data
+    except Exception as e:
+        sys.stderr.write(f"LAMMPS stage failed: {e}\n")
+        return 1
+    finally:
+        lmp.close()
+    return 0
+
+
+def run_subprocesses(stages, config, resume=False):
+    """Run every stage as its own LAMMPS process (convergence monitor on the last one)."""
+    stage_commands = [read_commands(path) for _, path in stages]
+    manifest = read_manifest() if resume else {}
+    for i, (stage, path) in enumerate(stages):
+        if stage in manifest:
+            print(f"[driver] stage {stage}: completed, skipped")
+            continue
+        input_file = path
+        log_args = ["-log", stage_log(stage)]
+        point = resume_point(i, stages, stage_commands, manifest) if resume else None
+        if point is not None:
+            print(f"[driver] stage {stage}: resuming from {point[0]}")
+            preserve_series(ave_time_files(expand_includes(stage_commands[i])))
+            input_file = f"{path}.resume"
+            with open(input_file, "w") as f:
+                f.write(f"log {stage_log(stage)} append\n")
+                f.writelines(command + "\n" for command in resume_commands(stage_commands[i], *point))
+            log_args = ["-log", "none"]
+
+        command = lammps_command(stage, input_file, config) + log_args
+        try:
+            if i + 1 == len(stages) and config["convergence"]["enabled"]:
+                returncode = run_monitored(command, config["convergence"])
+            else:
+                returncode = subprocess.run(command).returncode
+        except OSError as e:
+            sys.stderr.write(f"Unable to start LAMMPS for {stage}: {e}\n")
+            return 1
+        if returncode != 0:
+            return returncode
+        complete_stage(stage, path, stage_commands[i])
+    return 0
+
+
+def launcher_uses_mpi(stages, config):
+    mpirun = shutil.which(config["lammps"]["mpirun"])
+    return bool(mpirun) and any(mpirun in lammps_command(stage, path, config) for stage, path in stages)
+
+
+def run_stages(stages, config=None, resume=False):
+    """
+    Run the stages [(stage, input file), ...] in order, in process when possible.
+    With resume, completed stages are skipped and interrupted ones continue from their
+    latest checkpoint.
+
+    Returns:
+        int: Exit code
+    """
+    if config is None:
+        config = load_config()
+    driver = config["lammps"].get("driver", "auto")
+    if driver not in DRIVERS:
+        raise ValueError(f"unknown lammps driver {driver!r} (expected one of {', '.join(DRIVERS)})")
+
+    if driver != "subprocess" and (driver == "python" or not launcher_uses_mpi(stages, config)):
+        lammps = load_lammps()
+        if lammps is not None:
+            try:
+                return run_in_process(lammps, stages, config, resume)
+            except OSError as e:
+                # Shared library not built, or built without exceptions (see set_up.py)
+                if driver == "python":
+                    sys.stderr.write(f"Unable to load the LAMMPS library: {e}\n")
+                    return 1
+        elif driver == "python":
+            sys.stderr.write(f"Unable to import the LAMMPS Python module from {LAMMPS_PYTHON_DIR}\n")
+            return 1
+    return run_subprocesses(stages, config, resume)
+
+
+def lammps_driver_shell_command(inputs, resume=False, script="../../../Util/Util_lammps_driver.py"):
+    """Run-script line that runs {stage: input file} in order in the LAMMPS run directory."""
+    args = ["python", script] + (["--resume"] if resume else [])
+    args += [f"{stage}={path}" for stage, path in inputs.items()]
+    return " ".join(shlex.quote(arg) for arg in args)
+
+
+def main():
+    args = sys.argv[1:]
+    resume = args[:1] == ["--resume"]
+    if resume:
+        args = args[1:]
+    if not args or not all("=" in arg for arg in args):
+        sys.stderr.write("Usage: python Util_lammps_driver.py [--resume] <stage>=<input file> [...]\n")
+        sys.exit(1)
+    stages = [tuple(arg.split("=", 1)) for arg in args]
+    try:
+        sys.exit(run_stages(stages, resume=resume))
+    except ValueError as e:
+        sys.stderr.write(f"{e}\n")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
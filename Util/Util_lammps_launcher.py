@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LAMMPS launcher: picks the best available binary for a stage.
+
+Preference order:
+    1) mpirun -np N lmp_omp/lmp_mpi [-sf omp -pk omp T]   (MPI build + mpirun found)
+    2) lmp_serial -sf omp -pk omp T                       (OPENMP package built)
+    3) lmp_serial                                         (fallback)
+
+Ranks and threads come from the "lammps" section of aramidsim_config.json per stage,
+limited to the core budget exported by Simulation.py (ARAMIDSIM_NPROCS / ARAMIDSIM_CPUS).
+
+Usage (prints the command line):
+    python Util_lammps_launcher.py <stage> <input_file>
+"""
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+from functools import lru_cache
+
+from Util_config import UTIL_DIR, load_config
+
+LAMMPS_SRC_DIR = os.path.join(UTIL_DIR, "lammps-2Aug2023", "src")
+
+# Binaries built by set_up.py ("make omp" / "make mpi" / "make serial")
+MPI_BINARIES = ["lmp_omp", "lmp_mpi"]
+SERIAL_BINARIES = ["lmp_serial"]
+
+
+def find_binary(names):
+    """Return the first existing executable among names (LAMMPS src/ first, then PATH)."""
+    for name in names:
+        path = os.path.join(LAMMPS_SRC_DIR, name)
+        if os.path.isfile(path) and os.access(path, os.X_OK):
+            return path
+    for name in names:
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+
+@lru_cache(maxsize=None)
+def installed_packages(binary):
+    """Parse the 'Installed packages' list from `lmp -h`."""
+    try:
+        out = subprocess.run([binary, "-h"], capture_output=True, text=True, timeout=60).stdout
+    except (OSError, subprocess.SubprocessError):
+        return frozenset()
+
+    packages = set()
+    in_section = False
+    for line in out.splitlines():
+        if line.startswith("Installed packages:"):
+            in_section = True
+            continue
+        if in_section:
+            if not line.strip():
+                if packages:
+                    break
+                continue
+            packages.update(line.split())
+    return frozenset(packages)
+
+
+def has_openmp(binary):
+    return "OPENMP" in installed_packages(binary)
+
+
+def available_cores():
+    """Core budget for this pipeline (set by Simulation.py), else the machine's cores."""
+    try:
+        nprocs = int(os.environ.get("ARAMIDSIM_NPROCS", "0"))
+    except ValueError:
+        nprocs = 0
+    if nprocs > 0:
+        return nprocs
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def stage_settings(stage, config=None):
+    """Ranks/threads for a stage: stage entry merged over the "default" entry."""
+    if config is None:
+        config = load_config()
+    stages = config["lammps"]["stages"]
+    settings = dict(stages.get("default", {}))
+    settings.update(stages.get(stage, {}))
+    return settings
+
+
+def lammps_command(stage, input_file, config=None):
+    """
+    Build the command line (list of arguments) that runs input_file for the given stage.
+    """
+    if config is None:
+        config = load_config()
+    settings = stage_settings(stage, config)
+    cores = available_cores()
+
+    threads = max(1, int(settings.get("threads") or 1))
+    ranks = settings.get("ranks")
+    ranks = max(1, cores // threads) if ranks is None else max(1, int(ranks))
+
+    prefix = []
+    cpus = os.environ.get("ARAMIDSIM_CPUS")
+    taskset = shutil.which("taskset")
+    if cpus and taskset:
+        prefix = [taskset, "--cpu-list", cpus]
+
+    mpi_binary = find_binary(MPI_BINARIES)
+    mpirun = shutil.which(config["lammps"]["mpirun"])
+    if mpi_binary and mpirun and ranks > 1:
+        cmd = prefix + [mpirun] + list(config["lammps"]["mpirun_args"]) + ["-np", str(ranks), mpi_binary]
+        if threads > 1 and has_openmp(mpi_binary):
+            cmd = ["env", f"OMP_NUM_THREADS={threads}"] + cmd + ["-sf", "omp", "-pk", "omp", str(threads)]
+        return cmd + ["-in", input_file]
+
+    serial_binary = find_binary(SERIAL_BINARIES) or mpi_binary
+    if serial_binary is None:
+        # Nothing built yet: keep the historical path so the failure message is explicit
+        serial_binary = os.path.join(LAMMPS_SRC_DIR, "lmp_serial")
+
+    cmd = prefix + [serial_binary]
+    if has_openmp(serial_binary):
+        # No MPI available: unless ranks were pinned, spend the whole budget on threads
+        if settings.get("ranks") is None:
+            threads = ranks * threads
+        if threads > 1:
+            cmd = ["env", f"OMP_NUM_THREADS={threads}"] + cmd + ["-sf", "omp", "-pk", "omp", str(threads)]
+    return cmd + ["-in", input_file]
+
+
+def lammps_shell_command(stage, input_file, config=None):
+    """lammps_command() joined into a single shell-safe string for the generated run scripts."""
+    return " ".join(shlex.quote(arg) for arg in lammps_command(stage, input_file, config))
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.stderr.write("Usage: python Util_lammps_launcher.py <stage> <input_file>\n")
+        sys.exit(1)
+    print(lammps_shell_command(sys.argv[1], sys.argv[2]))
+
+
+if __name__ == "__main__":
+    main()
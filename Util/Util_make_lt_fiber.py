@@ -2,64 +2,35 @@
 import sys
 import os
 
-def calculate_interval(filename="monomer_reorder2.mol2"):
+from Util_mol2 import Mol2Molecule, read_mol2, x_range
+
+def calculate_interval(monomer="monomer_reorder2.mol2"):
     """
-    Read MOL2 file and calculate interval based on x-coordinate range
+    Calculate interval based on the x-coordinate range of the monomer
+    (a Util_mol2.Mol2Molecule or a MOL2 file path)
     Returns range * 1.2 (20% margin)
     """
-    try:
-        with open(filename, 'r') as mol2_file:
-            lines = mol2_file.readlines()
-    except FileNotFoundError:
-        return 10.0  # default value
-    
-    atom_section = False
-    x_min = float('inf')
-    x_max = float('-inf')
-    atom_count = 0
-    
-    for line in lines:
-        line = line.strip()
-        
-        # Check for @<TRIPOS>ATOM section
-        if "@<TRIPOS>ATOM" in line:
-            atom_section = True
-            continue
-        
-        # Check for end of atom section
-        if atom_section and line.startswith("@<TRIPOS>"):
-            break
-        
-        # Parse atom coordinates
-        if atom_section and line:
-            try:
-                parts = line.split()
-                if len(parts) >= 6:
-                    # MOL2 format: atom_id atom_name x y z atom_type ...
-                    x = float(parts[2])
-                    
-                    if x < x_min:
-                        x_min = x
-                    if x > x_max:
-                        x_max = x
-                    atom_count += 1
-            except (ValueError, IndexError):
-                continue
+    if not isinstance(monomer, Mol2Molecule):
+        try:
+            monomer = read_mol2(monomer)
+        except FileNotFoundError:
+            return 10.0  # default value
     
-    if atom_count == 0:
+    range_x = x_range(monomer)
+    if range_x is None:
         return 10.0  # default value
     
-    range_x = x_max - x_min
     interval = range_x * 1.2  # 20% margin
     
     return interval
 
-def generate_polymer_structure():
+def generate_polymer_structure(monomer="monomer_reorder2.mol2"):
     """
     Main function to generate polymer structure files
+    (monomer: in-memory Mol2Molecule or MOL2 file path)
     """
-    # Calculate interval from MOL2 file
-    interval = calculate_interval("monomer_reorder2.mol2")
+    # Calculate interval from the monomer
+    interval = calculate_interval(monomer)
     
     # Generate polymer_new.lt file
     try:
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Array-backed Tripos MOL2 model shared by the monomer-preparation scripts
+(Util_monomer_matching, Util_monomer_reorder, Util_make_lt_*, mol2tolt makelt.py).
+
+A file is read in one streaming pass: records are switched on their @<TRIPOS> line,
+ATOM lines go into a structured atom array and BOND lines into a structured bond
+array. Bond adjacency (CSR over atom rows) is built on first use.
+
+Usage (prints a summary):
+    python Util_mol2.py <file.mol2>
+"""
+import sys
+
+import numpy as np
+
+ATOM_DTYPE = np.dtype([
+    ("id", np.int64),
+    ("name", "U16"),
+    ("x", np.float64),
+    ("y", np.float64),
+    ("z", np.float64),
+    ("type", "U16"),
+    ("subst_id", "U16"),
+    ("subst_name", "U16"),
+    ("charge", np.float64),
+])
+
+BOND_DTYPE = np.dtype([
+    ("id", np.int64),
+    ("atom1", np.int64),
+    ("atom2", np.int64),
+    ("type", "U8"),
+])
+
+# Line layouts of the files written by the pipeline:
+#   compact: Util_monomer_matching output (monomer_reorder.mol2), header copied from the input
+#   aligned: Util_monomer_reorder output (monomer_reorder2.mol2), mol2tolt input
+ATOM_FORMATS = {
+    "compact": "{0} {1} {2:.4f} {3:.4f} {4:.4f} {5} 1 UNL1 {8:.4f}\n",
+    "aligned": "      {0} {1}           {2:.4f}   {3:.4f}    {4:.4f} {5}  1  UNL1    {8:.6f}\n",
+}
+BOND_FORMATS = {
+    "compact": "{0} {1} {2} {3}\n",
+    "aligned": "     {0}    {1}    {2}    {3}\n",
+}
+ALIGNED_SUBSTRUCTURE = "      1 ***         1 TEMP              0 ****  ****    0 ROOT\n"
+
+
+class Mol2Molecule:
+    """
+    One MOL2 molecule.
+
+    Attributes:
+        header (list): Raw lines before the @<TRIPOS>ATOM record
+        atoms (np.ndarray): ATOM_DTYPE records, in file order
+        bonds (np.ndarray): BOND_DTYPE records (atom1/atom2 are atom ids)
+    """
+
+    def __init__(self, atoms, bonds, header=None):
+        self.atoms = atoms
+        self.bonds = bonds
+        self.header = header if header is not None else []
+        self._adjacency = None
+
+    @property
+    def n_atoms(self):
+        return len(self.atoms)
+
+    @property
+    def n_bonds(self):
+        return len(self.bonds)
+
+    @property
+    def coordinates(self):
+        """(n_atoms, 3) float array of x, y, z."""
+        return np.column_stack([self.atoms["x"], self.atoms["y"], self.atoms["z"]])
+
+    def rows_of(self, atom_ids):
+        """Atom rows (0-based indices into atoms) of MOL2 atom ids."""
+        ids = self.atoms["id"]
+        if len(ids) and np.array_equal(ids, np.arange(1, len(ids) + 1)):
+            return np.asarray(atom_ids, dtype=np.int64) - 1
+        index = np.full(int(ids.max()) + 1 if len(ids) else 1, -1, dtype=np.int64)
+        index[ids] = np.arange(len(ids))
+        return index[np.asarray(atom_ids, dtype=np.int64)]
+
+    def bond_rows(self):
+        """(atom1 rows, atom2 rows) of every bond."""
+        return self.rows_of(self.bonds["atom1"]), self.rows_of(self.bonds["atom2"])
+
+    def adjacency(self):
+        """
+        CSR bond adjacency over atom rows, in bond order.
+
+        Returns:
+            tuple: (indptr, neighbor rows, bond indices); the neighbors of row i are
+                   neighbor_rows[indptr[i]:indptr[i + 1]]
+        """
+        if self._adjacency is None:
+            rows1, rows2 = self.bond_rows()
+            bond_index = np.arange(len(self.bonds), dtype=np.int64)
+            source = np.concatenate([rows1, rows2])
+            bond_index = np.concatenate([bond_index, bond_index])
+            order = np.lexsort((bond_index, source))
+            indptr = np.zeros(self.n_atoms + 1, dtype=np.int64)
+            np.cumsum(np.bincount(source, minlength=self.n_atoms), out=indptr[1:])
+            self._adjacency = (indptr, np.concatenate([rows2, rows1])[order], bond_index[order])
+        return self._adjacency
+
+    def neighbors(self, row):
+        """Atom rows bonded to atom row `row`."""
+        indptr, neighbor_rows, _ = self.adjacency()
+        return neighbor_rows[indptr[row]:indptr[row + 1]]
+
+    def count_neighbors(self, mask):
+        """Per atom row, the number of bonded atoms whose row is set in the boolean mask."""
+        indptr, neighbor_rows, _ = self.adjacency()
+        source = np.repeat(np.arange(self.n_atoms), np.diff(indptr))
+        return np.bincount(source[mask[neighbor_rows]], minlength=self.n_atoms)
+
+    def first_neighbor(self, mask):
+        """
+        Per atom row, the first bonded atom (in bond order) whose row is set in the mask.
+
+        Returns:
+            tuple: (neighbor rows, bond indices), -1 where there is no such neighbor
+        """
+        indptr, neighbor_rows, bond_index = self.adjacency()
+        source = np.repeat(np.arange(self.n_atoms), np.diff(indptr))
+        hits = np.flatnonzero(mask[neighbor_rows])
+        rows, first = np.unique(source[hits], return_index=True)
+        first_rows = np.full(self.n_atoms, -1, dtype=np.int64)
+        first_bonds = np.full(self.n_atoms, -1, dtype=np.int64)
+        first_rows[rows] = neighbor_rows[hits[first]]
+        first_bonds[rows] = bond_index[hits[first]]
+        return first_rows, first_bonds
+
+
+def parse_atom_line(parts):
+    return (int(parts[0]), parts[1], float(parts[2]), float(parts[3]), float(parts[4]),
+            parts[5],
+            parts[6] if len(parts) > 6 else "1",
+            parts[7] if len(parts) > 7 else "UNL1",
+            float(parts[8]) if len(parts) > 8 else 0.0)
+
+
+def parse_mol2(lines):
+    """
+    Parse the first molecule of MOL2 text lines (any iterable of lines).
+
+    Records other than MOLECULE, ATOM and BOND are skipped; a second
+    @<TRIPOS>MOLECULE record ends the parse.
+    """
+    header, atoms, bonds = [], [], []
+    record = None
+    for line in lines:
+        if line.startswith("@<TRIPOS>"):
+            record = line[9:].strip()
+            if record == "MOLECULE" and (atoms or bonds):
+                break
+            if record != "ATOM" and not atoms:
+                header.append(line)
+            continue
+        if record == "ATOM":
+            parts = line.split()
+            if len(parts) >= 6:
+                atoms.append(parse_atom_line(parts))
+        elif record == "BOND":
+            parts = line.split()
+            if len(parts) >= 4:
+                bonds.append((int(parts[0]), int(parts[1]), int(parts[2]), parts[3]))
+        elif not atoms:
+            header.append(line)
+    return Mol2Molecule(np.array(atoms, dtype=ATOM_DTYPE), np.array(bonds, dtype=BOND_DTYPE), header)
+
+
+def read_mol2(path):
+    with open(path, "r") as f:
+        return parse_mol2(f)
+
+
+def write_mol2(mol, path, layout="aligned"):
+    """
+    Write mol in one of the pipeline layouts (see ATOM_FORMATS).
+
+    "compact" keeps mol.header; "aligned" writes the MOLECULE/SUBSTRUCTURE records
+    that mol2tolt expects.
+    """
+    atom_format = ATOM_FORMATS[layout]
+    bond_format = BOND_FORMATS[layout]
+    with open(path, "w") as f:
+        if layout == "aligned":
+            f.write(f"@<TRIPOS>MOLECULE\n*****\n {mol.n_atoms} {mol.n_bonds} 0 0 0\nSMALL\nGASTEIGER\n\n")
+        else:
+            f.writelines(mol.header)
+        f.write("@<TRIPOS>ATOM\n")
+        f.writelines(atom_format.format(*atom) for atom in mol.atoms.tolist())
+        f.write("@<TRIPOS>BOND\n")
+        f.writelines(bond_format.format(*bond) for bond in mol.bonds.tolist())
+        if layout == "aligned":
+            f.write("@<TRIPOS>SUBSTRUCTURE\n")
+            f.write(ALIGNED_SUBSTRUCTURE)
+
+
+def x_range(mol):
+    """max(x) - min(x) of the atoms, or None for a molecule without atoms."""
+    if mol.n_atoms == 0:
+        return None
+    return float(mol.atoms["x"].max() - mol.atoms["x"].min())
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.stderr.write("Usage: python Util_mol2.py <file.mol2>\n")
+        sys.exit(1)
+    mol = read_mol2(sys.argv[1])
+    print(f"{mol.n_atoms} atoms, {mol.n_bonds} bonds, total charge {mol.atoms['charge'].sum():.4f}")
+    indptr = mol.adjacency()[0]
+    degrees = np.diff(indptr)
+    for degree in np.unique(degrees):
+        print(f"  degree {degree}: {np.count_nonzero(degrees == degree)} atoms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Run moltemplate in one process (moltemplate.build.Build) instead of through the
+moltemplate.sh shell chain, which starts a new python interpreter for every stage.
+
+The output files are the same as those of "moltemplate.sh system.lt". Only
+system.data and the system.in* scripts are written; the intermediate output_ttree/
+directory is skipped unless --output-ttree is given. The angle, dihedral and improper
+passes run concurrently on the pipeline's core budget (ARAMIDSIM_NPROCS).
+
+Usage (run inside the moltemplates directory):
+    python ../../Util/Util_moltemplate_build.py [--output-ttree] [system.lt]
+"""
+import os
+import sys
+
+MOLTEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "moltemplate-master")
+sys.path.insert(0, MOLTEMPLATE_DIR)
+
+from moltemplate.build import Build  # noqa: E402
+from moltemplate.ttree_lex import InputError  # noqa: E402
+
+from Util_lammps_launcher import available_cores  # noqa: E402
+
+
+def main():
+    args = sys.argv[1:]
+    write_intermediates = "--output-ttree" in args
+    args = [arg for arg in args if arg != "--output-ttree"]
+    if len(args) > 1:
+        sys.stderr.write("Usage: python Util_moltemplate_build.py [--output-ttree] [system.lt]\n")
+        sys.exit(1)
+    system_lt = args[0] if args else "system.lt"
+    if not os.path.exists(system_lt):
+        sys.stderr.write(f"Unable to open file: {system_lt}\n")
+        sys.exit(1)
+
+    try:
+        Build(system_lt, write_intermediates=write_intermediates, processes=available_cores())
+    except (ValueError, InputError) as e:
+        sys.stderr.write(f"\n{e}\n")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
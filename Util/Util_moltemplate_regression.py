@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Regression check of the in-process moltemplate build against moltemplate.sh.
+
+A small system (copies of the PPTA repeat unit of Stretched/moltemplates with the GAFF
+force field of Stretched/mol2tolt) is built
+
+    - with moltemplate.sh of a reference revision (default: the first commit of the
+      repository, before the in-process build, the CSR matcher and the fork pool),
+      extracted with `git archive`
+    - with Util_moltemplate_build.py of the working tree: serial (1 process) and with the
+      angle/dihedral/improper passes in the fork pool, each with an empty and a warm
+      template cache (MOLTEMPLATE_CACHE_DIR)
+
+and every output of the reference (system.data, system.in*) must be byte-identical.
+
+Usage:
+    python Util_moltemplate_regression.py [--ref <git revision>] [--copies N] [--keep <dir>]
+"""
+import difflib
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+UTIL_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(UTIL_DIR)
+MOLTEMPLATE_SH = os.path.join("Util", "moltemplate-master", "moltemplate", "scripts", "moltemplate.sh")
+SYSTEM_FILES = [
+    os.path.join(REPO_DIR, "Stretched", "moltemplates", "PPTA.lt"),
+    os.path.join(REPO_DIR, "Stretched", "mol2tolt", "gaff.lt"),
+]
+DEFAULT_COPIES = 4
+
+
+def system_lt(copies):
+    """system.lt: a row of PPTA units in a box large enough for all of them."""
+    return (
+        'import "PPTA.lt"\n\n'
+        'write_once("Data Boundary") {\n'
+        f"  0.0 {20.0 * copies + 20.0} xlo xhi\n"
+        "  0.0 40.0 ylo yhi\n"
+        "  0.0 40.0 zlo zhi\n"
+        "}\n\n"
+        f"units = new PPTA [{copies}].move(20.0, 0, 0)\n"
+    )
+
+
+def root_revision():
+    out = subprocess.run(["git", "rev-list", "--max-parents=0", "HEAD"], cwd=REPO_DIR,
+                         capture_output=True, text=True, check=True).stdout.split()
+    return out[-1]
+
+
+def extract_reference(revision, dest):
+    """moltemplate-master of revision under dest; returns the path of its moltemplate.sh."""
+    archive = subprocess.run(["git", "archive", revision, "Util/moltemplate-master"], cwd=REPO_DIR,
+                             capture_output=True, check=True).stdout
+    os.makedirs(dest, exist_ok=True)
+    subprocess.run(["tar", "-x", "-C", dest], input=archive, check=True)
+    return os.path.join(dest, MOLTEMPLATE_SH)
+
+
+def make_build_dir(path, copies):
+    os.makedirs(path)
+    for src in SYSTEM_FILES:
+        shutil.copy(src, path)
+    with open(os.path.join(path, "system.lt"), "w") as f:
+        f.write(system_lt(copies))
+
+
+def run_build(command, cwd, env):
+    with open(os.path.join(cwd, "build.log"), "w") as log:
+        returncode = subprocess.run(command, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT).returncode
+    if returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} failed in {cwd} (see build.log)")
+
+
+def output_files(build_dir):
+    names = [os.path.basename(path) for path in glob.glob(os.path.join(build_dir, "system.in*"))]
+    return sorted(names + ["system.data"])
+
+
+def compare(reference_dir, build_dir):
+    """Differences (list of messages) between the reference outputs and a build."""
+    problems = []
+    for name in output_files(reference_dir):
+        path = os.path.join(build_dir, name)
+        if not os.path.exists(path):
+            problems.append(f"{name}: missing")
+            continue
+        with open(os.path.join(reference_dir, name), "rb") as f:
+            expected = f.read()
+        with open(path, "rb") as f:
+            actual = f.read()
+        if expected != actual:
+            diff = difflib.unified_diff(expected.decode(errors="replace").splitlines(),
+                                        actual.decode(errors="replace").splitlines(),
+                                        "reference/" + name, "in-process/" + name, lineterm="", n=1)
+            problems.append(f"{name}: differs\n" + "\n".join(list(diff)[:20]))
+    return problems
+
+
+def main():
+    args = sys.argv[1:]
+    options = {"--ref": None, "--copies": str(DEFAULT_COPIES), "--keep": None}
+    while args:
+        if args[0] not in options or len(args) < 2:
+            sys.stderr.write("Usage: python Util_moltemplate_regression.py "
+                             "[--ref <git revision>] [--copies N] [--keep <dir>]\n")
+            sys.exit(1)
+        options[args[0]] = args[1]
+        args = args[2:]
+
+    work_dir = options["--keep"] or tempfile.mkdtemp(prefix="moltemplate-regression-")
+    os.makedirs(work_dir, exist_ok=True)
+    copies = int(options["--copies"])
+    env = dict(os.environ)
+    env.pop("MOLTEMPLATE_CACHE_DIR", None)
+
+    try:
+        revision = options["--ref"] or root_revision()
+        reference_sh = extract_reference(revision, os.path.join(work_dir, "reference_tree"))
+        reference_dir = os.path.join(work_dir, "reference")
+        make_build_dir(reference_dir, copies)
+        run_build(["bash", reference_sh, "system.lt"], reference_dir, env)
+        print(f"reference: moltemplate.sh of {revision[:12]}, outputs {', '.join(output_files(reference_dir))}")
+
+        cache_dir = os.path.join(work_dir, "template_cache")
+        failed = False
+        for processes in (1, 3):
+            for cache in ("empty cache", "warm cache"):
+                label = f"in-process, {processes} process{'es' if processes > 1 else ''}, {cache}"
+                build_dir = os.path.join(work_dir, f"build_{processes}_{cache.split()[0]}")
+                if cache == "empty cache" and os.path.exists(cache_dir):
+                    shutil.rmtree(cache_dir)
+                make_build_dir(build_dir, copies)
+                run_env = dict(env, ARAMIDSIM_NPROCS=str(processes), MOLTEMPLATE_CACHE_DIR=cache_dir)
+                run_build([sys.executable, os.path.join(UTIL_DIR, "Util_moltemplate_build.py"), "system.lt"],
+                          build_dir, run_env)
+                problems = compare(reference_dir, build_dir)
+                print(f"{label}: {'identical' if not problems else 'DIFFERENT'}")
+                for problem in problems:
+                    print("    " + problem.replace("\n", "\n    "))
+                failed = failed or bool(problems)
+    except (OSError, RuntimeError, subprocess.CalledProcessError) as e:
+        sys.stderr.write(f"{e}\n")
+        sys.exit(1)
+    finally:
+        if not options["--keep"]:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
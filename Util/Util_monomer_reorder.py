@@ -1,7 +1,26 @@
-import re
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Activate the monomer for polymerization: monomer_com1.mol2 (coordinates, charges) and
+monomer_com2.mol2 (GAFF names/types) -> monomer_reorder2.mol2 with N2000/C2000 first.
+
+With a generator name the polymer/system lt files are written from the reordered
+molecule in the same process (no re-read of monomer_reorder2.mol2).
+
+Usage:
+    python Util_monomer_reorder.py [fiber|linear]
+"""
+import importlib
+import sys
+
 import numpy as np
 from typing import List, Tuple, Dict
 
+from Util_mol2 import ATOM_DTYPE, BOND_DTYPE, Mol2Molecule, read_mol2, write_mol2
+
+# Util_make_lt_* module of each polymer layout
+LT_GENERATORS = {"fiber": "Util_make_lt_fiber", "linear": "Util_make_lt_linear"}
+
 class MOL2Processor:
     def __init__(self):
         # Element type constants
@@ -21,6 +40,7 @@ class MOL2Processor:
         self.elements = []  # Element types
         
         # Indices of special atoms
+        # (one entry per reactive site; only the first site of each kind is activated)
         self.ad0 = []  # Nitrogen bonded with 2 hydrogens
         self.ad0_cl = []  # Carbon bonded with both oxygen and chlorine
         self.ad0_del = []  # Hydrogens to be removed
@@ -30,73 +50,16 @@ class MOL2Processor:
 
     def read_mol2_file(self, filename: str, read_charges: bool = True) -> None:
         """Read MOL2 file and store molecular information"""
-        with open(filename, 'r') as f:
-            lines = f.readlines()
-        
-        # Find sections
-        molecule_idx = -1
-        atom_idx = -1
-        bond_idx = -1
-        
-        for i, line in enumerate(lines):
-            if '@<TRIPOS>MOLECULE' in line:
-                molecule_idx = i
-            elif '@<TRIPOS>ATOM' in line:
-                atom_idx = i
-            elif '@<TRIPOS>BOND' in line:
-                bond_idx = i
-        
-        # Read molecule information
-        if molecule_idx != -1:
-            molecule_info = lines[molecule_idx + 2].split()
-            self.na = int(molecule_info[0])
-            self.nb = int(molecule_info[1])
-        
-        # Read atom information
-        if atom_idx != -1:
-            self.atoms = []
-            self.coordinates = []
-            self.charges = []
-            self.elements = []
-            
-            for i in range(atom_idx + 1, atom_idx + 1 + self.na):
-                if i < len(lines):
-                    parts = lines[i].split()
-                    if len(parts) >= 6:
-                        atom_info = {
-                            'id': int(parts[0]),
-                            'name': parts[1],  # Atom name (C1, N2, etc.)
-                            'x': float(parts[2]),
-                            'y': float(parts[3]),
-                            'z': float(parts[4]),
-                            'type': parts[5],  # Element type (actual element symbol)
-                            'subst_id': parts[6] if len(parts) > 6 else '1',
-                            'subst_name': parts[7] if len(parts) > 7 else 'UNL1',
-                            'charge': float(parts[8]) if len(parts) > 8 and read_charges else 0.0
-                        }
-                        self.atoms.append(atom_info)
-                        self.coordinates.append([atom_info['x'], atom_info['y'], atom_info['z']])
-                        self.charges.append(atom_info['charge'])
-                        
-                        # Use the second string (element type, not atom name) as in C++ code
-                        # In MOL2, parts[5] is the element type
-                        element_type = self.identify_element(parts[5])
-                        self.elements.append(element_type)
-        
-        # Read bond information
-        if bond_idx != -1:
-            self.bonds = []
-            for i in range(bond_idx + 1, bond_idx + 1 + self.nb):
-                if i < len(lines):
-                    parts = lines[i].split()
-                    if len(parts) >= 4:
-                        bond_info = {
-                            'id': int(parts[0]),
-                            'atom1': int(parts[1]),
-                            'atom2': int(parts[2]),
-                            'type': parts[3]
-                        }
-                        self.bonds.append(bond_info)
+        self.mol = read_mol2(filename)
+        self.na = self.mol.n_atoms
+        self.nb = self.mol.n_bonds
+        self.atoms = self.mol.atoms
+        self.bonds = self.mol.bonds
+        self.coordinates = self.mol.coordinates.tolist()
+        self.charges = self.mol.atoms['charge'].tolist() if read_charges else [0.0] * self.na
+
+        # Use the atom type (element type, not atom name) as in C++ code
+        self.elements = [self.identify_element(atom_type) for atom_type in self.mol.atoms['type'].tolist()]
 
     def identify_element(self, atom_type: str) -> int:
         """Identify element from atom type"""
@@ -121,59 +84,30 @@ class MOL2Processor:
             return 10  # Unknown element
 
     def find_special_atoms(self) -> None:
-        """Find special atoms (nitrogen bonded with 2 hydrogens, carbon bonded with oxygen-chlorine)"""
-        # Find nitrogen bonded with 2 hydrogens
-        for i, elem in enumerate(self.elements):
-            if elem == self.aN:
-                h_bonds = []
-                h_count = 0
-                
-                for j, bond in enumerate(self.bonds):
-                    if bond['atom1'] == i + 1 and self.elements[bond['atom2'] - 1] == self.aH:
-                        h_count += 1
-                        h_bonds.append((j, bond['atom2'] - 1))
-                    elif bond['atom2'] == i + 1 and self.elements[bond['atom1'] - 1] == self.aH:
-                        h_count += 1
-                        h_bonds.append((j, bond['atom1'] - 1))
-                
-                if h_count == 2:
-                    self.ad0.append(i)
-                    # Set the first hydrogen as removal target
-                    if h_bonds:
-                        bond_idx, h_atom_idx = h_bonds[0]
-                        self.ad0_del.append(h_atom_idx)
-                        self.b_del.append(bond_idx)
-                    break
-        
-        # Find carbon bonded with both oxygen and chlorine
-        for i, elem in enumerate(self.elements):
-            if elem == self.aC:
-                has_oxygen = False
-                has_chlorine = False
-                cl_bond_idx = -1
-                cl_atom_idx = -1
-                
-                for j, bond in enumerate(self.bonds):
-                    if bond['atom1'] == i + 1:
-                        if self.elements[bond['atom2'] - 1] == self.aO:
-                            has_oxygen = True
-                        elif self.elements[bond['atom2'] - 1] == self.aCL:
-                            has_chlorine = True
-                            cl_bond_idx = j
-                            cl_atom_idx = bond['atom2'] - 1
-                    elif bond['atom2'] == i + 1:
-                        if self.elements[bond['atom1'] - 1] == self.aO:
-                            has_oxygen = True
-                        elif self.elements[bond['atom1'] - 1] == self.aCL:
-                            has_chlorine = True
-                            cl_bond_idx = j
-                            cl_atom_idx = bond['atom1'] - 1
-                
-                if has_oxygen and has_chlorine:
-                    self.ad0_cl.append(i)
-                    self.ad0_cl_del.append(cl_atom_idx)
-                    self.b_cl_del.append(cl_bond_idx)
-                    break
+        """
+        Find every reactive site on the bond-adjacency index: nitrogens bonded with 2 hydrogens
+        and carbons bonded with both oxygen and chlorine. Each list holds the sites in atom order;
+        the first site of each kind is the one activated.
+        """
+        elements = np.array(self.elements)
+        is_h = elements == self.aH
+        is_cl = elements == self.aCL
+
+        # Nitrogen bonded with 2 hydrogens (the first hydrogen in bond order is the removal target)
+        h_count = self.mol.count_neighbors(is_h)
+        first_h, first_h_bond = self.mol.first_neighbor(is_h)
+        for i in np.flatnonzero((elements == self.aN) & (h_count == 2)).tolist():
+            self.ad0.append(i)
+            self.ad0_del.append(int(first_h[i]))
+            self.b_del.append(int(first_h_bond[i]))
+
+        # Carbon bonded with both oxygen and chlorine
+        o_count = self.mol.count_neighbors(elements == self.aO)
+        first_cl, first_cl_bond = self.mol.first_neighbor(is_cl)
+        for i in np.flatnonzero((elements == self.aC) & (o_count > 0) & (first_cl >= 0)).tolist():
+            self.ad0_cl.append(i)
+            self.ad0_cl_del.append(int(first_cl[i]))
+            self.b_cl_del.append(int(first_cl_bond[i]))
 
     def redistribute_charges(self) -> None:
         """Redistribute charges of atoms to be removed to remaining hydrogens (same logic as C++ code)"""
@@ -238,141 +172,60 @@ class MOL2Processor:
         
         self.coordinates = coordinates_array.tolist()
 
-    def write_output_file(self, output_filename: str, template_filename: str) -> None:
-        """Save rearranged molecular structure as new MOL2 file"""
-        # Read original format information from template file
-        template_atoms = []
-        template_bonds = []
-        
-        with open(template_filename, 'r') as f:
-            lines = f.readlines()
-        
-        atom_idx = -1
-        bond_idx = -1
-        
-        for i, line in enumerate(lines):
-            if '@<TRIPOS>ATOM' in line:
-                atom_idx = i
-            elif '@<TRIPOS>BOND' in line:
-                bond_idx = i
-        
-        # Read atom information from template
-        if atom_idx != -1:
-            for i in range(atom_idx + 1, atom_idx + 1 + self.na):
-                if i < len(lines):
-                    parts = lines[i].split()
-                    template_atoms.append({
-                        'name': parts[1],
-                        'type': parts[5] if len(parts) > 5 else 'UNL',
-                        'subst_id': parts[6] if len(parts) > 6 else '1',
-                        'subst_name': parts[7] if len(parts) > 7 else 'UNL1'
-                    })
-        
-        # Read bond information from template
-        if bond_idx != -1:
-            for i in range(bond_idx + 1, bond_idx + 1 + self.nb):
-                if i < len(lines):
-                    parts = lines[i].split()
-                    template_bonds.append({
-                        'type': parts[3] if len(parts) > 3 else '1'
-                    })
-        
+    def write_output_file(self, output_filename: str, template_filename: str) -> Mol2Molecule:
+        """Save rearranged molecular structure as new MOL2 file and return it"""
+        # Atom names/types and bond types come from the template file
+        template = read_mol2(template_filename)
+        template_names = template.atoms['name'][:self.na].tolist()
+        template_types = template.atoms['type'][:self.na].tolist()
+        template_bond_types = template.bonds['type'][:self.nb].tolist()
+
         # Create new atom list excluding atoms to be removed
         new_atoms = []
         atom_mapping = {}  # Old index -> New index mapping
-        new_idx = 1
-        
+
+        def add_atom(i, name, atom_type):
+            new_idx = len(new_atoms) + 1
+            x, y, z = self.coordinates[i]
+            new_atoms.append((new_idx, name, x, y, z, atom_type, '1', 'UNL1', self.charges[i]))
+            atom_mapping[i] = new_idx
+
         # First add nitrogen (N2000)
         if self.ad0:
-            new_atoms.append({
-                'id': new_idx,
-                'name': 'N2000',
-                'coord': self.coordinates[self.ad0[0]],
-                'type': 'n',
-                'charge': self.charges[self.ad0[0]]
-            })
-            atom_mapping[self.ad0[0]] = new_idx
-            new_idx += 1
-        
+            add_atom(self.ad0[0], 'N2000', 'n')
+
         # Next add carbon (C2000)
         if self.ad0_cl:
-            template_type = template_atoms[self.ad0_cl[0]]['type'] if self.ad0_cl[0] < len(template_atoms) else 'c3'
-            new_atoms.append({
-                'id': new_idx,
-                'name': 'C2000',
-                'coord': self.coordinates[self.ad0_cl[0]],
-                'type': template_type,
-                'charge': self.charges[self.ad0_cl[0]]
-            })
-            atom_mapping[self.ad0_cl[0]] = new_idx
-            new_idx += 1
-        
+            i = self.ad0_cl[0]
+            add_atom(i, 'C2000', template_types[i] if i < len(template_types) else 'c3')
+
         # Add remaining atoms (excluding removal targets)
+        skipped = set(self.ad0[:1] + self.ad0_cl[:1] + self.ad0_del[:1] + self.ad0_cl_del[:1])
         for i in range(self.na):
-            if (i in self.ad0 or i in self.ad0_cl or 
-                i in self.ad0_del or i in self.ad0_cl_del):
+            if i in skipped:
                 continue
-            
-            template_info = template_atoms[i] if i < len(template_atoms) else {'name': f'X{i}', 'type': 'du'}
-            new_atoms.append({
-                'id': new_idx,
-                'name': template_info['name'],
-                'coord': self.coordinates[i],
-                'type': template_info['type'],
-                'charge': self.charges[i]
-            })
-            atom_mapping[i] = new_idx
-            new_idx += 1
-        
+            if i < len(template_names):
+                add_atom(i, template_names[i], template_types[i])
+            else:
+                add_atom(i, f'X{i}', 'du')
+
         # Create new bond list excluding bonds to be removed
         new_bonds = []
-        bond_idx_new = 1
-        
-        for i, bond in enumerate(self.bonds):
-            if i in self.b_del or i in self.b_cl_del:
+        removed_bonds = set(self.b_del[:1] + self.b_cl_del[:1])
+        rows1, rows2 = self.mol.bond_rows()
+        for i, (old_atom1, old_atom2) in enumerate(zip(rows1.tolist(), rows2.tolist())):
+            if i in removed_bonds:
                 continue
-            
-            old_atom1 = bond['atom1'] - 1
-            old_atom2 = bond['atom2'] - 1
-            
             if old_atom1 in atom_mapping and old_atom2 in atom_mapping:
-                bond_type = template_bonds[i]['type'] if i < len(template_bonds) else '1'
-                new_bonds.append({
-                    'id': bond_idx_new,
-                    'atom1': atom_mapping[old_atom1],
-                    'atom2': atom_mapping[old_atom2],
-                    'type': bond_type
-                })
-                bond_idx_new += 1
-        
-        # Write output file
-        with open(output_filename, 'w') as f:
-            f.write("@<TRIPOS>MOLECULE\n")
-            f.write("*****\n")
-            f.write(f" {len(new_atoms)} {len(new_bonds)} 0 0 0\n")
-            f.write("SMALL\n")
-            f.write("GASTEIGER\n")
-            f.write("\n")
-            f.write("@<TRIPOS>ATOM\n")
-            
-            # Write atom information
-            for atom in new_atoms:
-                coord = atom['coord']
-                f.write(f"      {atom['id']} {atom['name']}           "
-                       f"{coord[0]:.4f}   {coord[1]:.4f}    {coord[2]:.4f} "
-                       f"{atom['type']}  1  UNL1    {atom['charge']:.6f}\n")
-            
-            f.write("@<TRIPOS>BOND\n")
-            
-            # Write bond information
-            for bond in new_bonds:
-                f.write(f"     {bond['id']}    {bond['atom1']}    {bond['atom2']}    {bond['type']}\n")
-            
-            f.write("@<TRIPOS>SUBSTRUCTURE\n")
-            f.write("      1 ***         1 TEMP              0 ****  ****    0 ROOT\n")
+                bond_type = template_bond_types[i] if i < len(template_bond_types) else '1'
+                new_bonds.append((len(new_bonds) + 1, atom_mapping[old_atom1], atom_mapping[old_atom2], bond_type))
+
+        output = Mol2Molecule(np.array(new_atoms, dtype=ATOM_DTYPE), np.array(new_bonds, dtype=BOND_DTYPE))
+        write_mol2(output, output_filename, layout="aligned")
+        return output
 
-    def process_mol2_files(self, input_file1: str, input_file2: str, output_file: str) -> None:
-        """Execute the entire processing workflow"""
+    def process_mol2_files(self, input_file1: str, input_file2: str, output_file: str) -> Mol2Molecule:
+        """Execute the entire processing workflow (returns the written molecule, or None)"""
         # Read coordinates and charges from first file
         self.read_mol2_file(input_file1, read_charges=True)
         
@@ -382,6 +235,10 @@ class MOL2Processor:
         if not self.ad0 or not self.ad0_cl:
             print("Error: Required special atoms not found.")
             return
+        if len(self.ad0) > 1 or len(self.ad0_cl) > 1:
+            print(f"Found {len(self.ad0)} NH2 site(s) (atoms {[i + 1 for i in self.ad0]}) and "
+                  f"{len(self.ad0_cl)} COCl site(s) (atoms {[i + 1 for i in self.ad0_cl]}); "
+                  f"activating atoms {self.ad0[0] + 1} and {self.ad0_cl[0] + 1}.")
         
         # Redistribute charges
         self.redistribute_charges()
@@ -390,18 +247,24 @@ class MOL2Processor:
         self.adjust_molecule_orientation()
         
         # Write output file
-        self.write_output_file(output_file, input_file2)
+        output = self.write_output_file(output_file, input_file2)
         
         print("1 molecule converted to reordered format.")
+        return output
 
 
 def main():
     """Main function - usage example"""
+    if len(sys.argv) > 2 or (len(sys.argv) == 2 and sys.argv[1] not in LT_GENERATORS):
+        sys.stderr.write("Usage: python Util_monomer_reorder.py [fiber|linear]\n")
+        sys.exit(1)
+
     processor = MOL2Processor()
+    output = None
     
     try:
         # Execute file processing
-        processor.process_mol2_files(
+        output = processor.process_mol2_files(
             input_file1="monomer_com1.mol2",  # Coordinate/charge data
             input_file2="monomer_com2.mol2",  # Format information
             output_file="monomer_reorder2.mol2"  # Output file
@@ -412,6 +275,11 @@ def main():
     except Exception as e:
         print(f"Error during processing: {e}")
 
+    if len(sys.argv) == 2:
+        # Falls back to the file on disk if the monomer could not be processed
+        generator = importlib.import_module(LT_GENERATORS[sys.argv[1]])
+        generator.generate_polymer_structure(output if output is not None else "monomer_reorder2.mol2")
+
 
 if __name__ == "__main__":
     main()
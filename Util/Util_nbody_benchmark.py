@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the moltemplate angle/dihedral/improper search on a built system.
+
+The bond graph of a moltemplate data file (e.g. the fiber system.data) is replicated
+N times, as in the fiber bundle, and every bond pattern (nbody_Angles, nbody_Dihedrals,
+nbody_Impropers) is searched with the recursive GraphMatcher and with the CSR-backed
+GraphMatcherCSR. Both results (matches grouped by atom/bond types, as used by
+nbody_by_type_lib.GenInteractions_int) are checked to be identical.
+
+Usage:
+    python Util_nbody_benchmark.py <system.data> [replicas]
+"""
+import os
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from Util_lammps_data import read_data
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "moltemplate-master"))
+from moltemplate import nbody_Angles, nbody_Dihedrals, nbody_Impropers  # noqa: E402
+from moltemplate.nbody_by_type_lib import GroupMatchesByType  # noqa: E402
+from moltemplate.nbody_graph_search import GraphMatcher, GraphMatcherCSR, Ugraph  # noqa: E402
+
+PATTERNS = {
+    "Angles": nbody_Angles.bond_pattern,
+    "Dihedrals": nbody_Dihedrals.bond_pattern,
+    "Impropers": nbody_Impropers.bond_pattern,
+}
+
+
+def bond_graph(path, replicas=1):
+    """Ugraph of the Atoms/Bonds sections (atom and bond types as attributes), replicated."""
+    data = read_data(path)
+    atoms = data.atoms
+    bonds = data.section("Bonds")
+    index = np.full(int(atoms["id"].max()) + 1, -1, dtype=np.int64)
+    index[atoms["id"]] = np.arange(len(atoms))
+    atom1 = index[bonds["atom1"]].tolist()
+    atom2 = index[bonds["atom2"]].tolist()
+    atom_types = atoms["type"].tolist()
+    bond_types = bonds["type"].tolist()
+
+    G = Ugraph()
+    n_atoms = len(atoms)
+    for replica in range(replicas):
+        for i, atom_type in enumerate(atom_types):
+            G.AddVertex(replica * n_atoms + i, atom_type)
+    for replica in range(replicas):
+        offset = replica * n_atoms
+        for i, j, bond_type in zip(atom1, atom2, bond_types):
+            G.AddEdge(offset + i, offset + j, bond_type)
+    return G
+
+
+def group_graph_matcher(G, pattern):
+    """GenInteractions_int's original search: GraphMatcher, grouped one match at a time."""
+    interactions_by_type = defaultdict(list)
+    for atombondids in GraphMatcher(G, pattern).Matches():
+        atombondtypes = (tuple([G.GetVert(Iv).attr for Iv in atombondids[0]]),
+                         tuple([G.GetEdge(Ie).attr for Ie in atombondids[1]]))
+        interactions_by_type[atombondtypes].append(atombondids)
+    return interactions_by_type
+
+
+def group_csr(G, pattern):
+    return GroupMatchesByType(G, *GraphMatcherCSR(G, pattern).MatchArrays())
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.stderr.write("Usage: python Util_nbody_benchmark.py <system.data> [replicas]\n")
+        sys.exit(1)
+    replicas = int(sys.argv[2]) if len(sys.argv) == 3 else 1
+
+    G = bond_graph(sys.argv[1], replicas)
+    print(f"{G.GetNumVerts()} atoms, {G.GetNumEdges()} bonds ({replicas} replicas)")
+    print(f"{'pattern':<10} {'matches':>9} {'GraphMatcher (s)':>17} {'CSR (s)':>9} {'speedup':>8}")
+    total_old = total_new = 0.0
+    for name, pattern in PATTERNS.items():
+        reference, t_old = timed(group_graph_matcher, G, pattern)
+        result, t_new = timed(group_csr, G, pattern)
+        if list(reference.items()) != list(result.items()):
+            sys.stderr.write(f"{name}: GraphMatcherCSR results differ from GraphMatcher\n")
+            sys.exit(1)
+        n_matches = sum(len(matches) for matches in result.values())
+        print(f"{name:<10} {n_matches:>9} {t_old:>17.3f} {t_new:>9.3f} {t_old / t_new:>7.1f}x")
+        total_old += t_old
+        total_new += t_new
+    print(f"{'total':<10} {'':>9} {total_old:>17.3f} {total_new:>9.3f} {total_old / total_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
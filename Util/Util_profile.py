@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Per-candidate timing profile of the Stretched/Solution pipelines.
+
+Three sources are combined into profiles/<name>.json (pipeline directory) after every
+candidate, and the profile is appended to profiles/history.jsonl for the aggregation
+across runs:
+
+    steps   wall time and status of every job-graph step (conformer, reorder, mol2tolt,
+            moltemplate, lammps, analysis, ...; "skipped" when the step was up to date)
+    tools   wall time of each preparation tool call (obabel, antechamber through
+            Util_cpu_scheduler.py, parmchk2 through `Util_profile.py time`), collected
+            in the file named by ARAMIDSIM_PROFILE_LOG
+    lammps  per stage (log.<stage>.lammps), every run/minimize: loop time, procs x
+            threads, steps, atoms, performance, the active integrator fixes, the
+            "MPI task timing breakdown" (Pair, Bond, Kspace, Neigh, Comm, Output, Modify,
+            Other) and the per-rank memory; the chunks of a chunked production run
+            (run N start S stop E) are summed into one entry, its breakdown scaled from
+            the chunks that logged one (the first and the last)
+
+Usage:
+    python Util_profile.py summary [history.jsonl ...]     aggregate over recorded runs
+    python Util_profile.py log <log.lammps>                 print the parsed segments
+    python Util_profile.py time <label> -- <command> [args...]
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+PROFILE_DIR = "profiles"
+HISTORY_FILENAME = "history.jsonl"
+PROFILE_LOG_ENV = "ARAMIDSIM_PROFILE_LOG"
+
+SECTIONS = ["Pair", "Bond", "Kspace", "Neigh", "Comm", "Output", "Modify", "Other"]
+# Fix styles that define the ensemble of a run (accelerator suffixes are stripped)
+INTEGRATORS = {"nve", "nvt", "npt", "nph", "nve/limit", "langevin", "deform", "temp/berendsen",
+               "press/berendsen", "temp/rescale"}
+
+RUN_LINE = re.compile(r"^(run|minimize)\s")
+FIX_LINE = re.compile(r"^fix\s+(\S+)\s+\S+\s+(\S+)")
+UNFIX_LINE = re.compile(r"^unfix\s+(\S+)")
+MEMORY_LINE = re.compile(r"^Per MPI rank memory allocation \(min/avg/max\) = (\S+) \| (\S+) \| (\S+) Mbytes")
+LOOP_LINE = re.compile(r"^Loop time of (\S+) on (\d+) procs for (\d+) steps with (\d+) atoms")
+PERFORMANCE_LINE = re.compile(r"^Performance:\s*(.*)")
+THREADS_LINE = re.compile(r"CPU use with (\d+) MPI tasks x (\d+) OpenMP threads")
+SECTION_LINE = re.compile(r"^(\w+)\s*\|(.*)")
+RUN_BOUNDS = re.compile(r"\sstart\s+(\d+)\s+stop\s+(\d+)")
+
+
+def stage_log(stage):
+    """Log file of a LAMMPS stage in the run directory."""
+    return f"log.{stage}.lammps"
+
+
+def record_timing(kind, label, seconds, **fields):
+    """Append one timing to the file named by ARAMIDSIM_PROFILE_LOG (no-op when unset)."""
+    path = os.environ.get(PROFILE_LOG_ENV)
+    if not path:
+        return
+    entry = {"kind": kind, "label": label, "seconds": round(seconds, 3)}
+    entry.update(fields)
+    with open(path, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def read_timings(path):
+    """Entries written by record_timing ([] if the file does not exist)."""
+    entries = []
+    if not path or not os.path.exists(path):
+        return entries
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+    return entries
+
+
+def parse_sections(lines):
+    """{section: {"min", "avg", "max", "%varavg", "%total"}} of a timing breakdown table."""
+    sections = {}
+    for line in lines:
+        match = SECTION_LINE.match(line)
+        if not match or match.group(1) not in SECTIONS:
+            continue
+        cells = [cell.strip() for cell in match.group(2).split("|")]
+        values = [float(cell) if cell else None for cell in cells]
+        sections[match.group(1)] = dict(zip(["min", "avg", "max", "%varavg", "%total"], values))
+    return sections
+
+
+def parse_performance(text):
+    """'7.000 ns/day, 3.429 hours/ns, 81.000 timesteps/s' -> {"ns/day": 7.0, ...}"""
+    performance = {}
+    for part in text.split(","):
+        words = part.split()
+        if len(words) == 2:
+            try:
+                performance[words[1]] = float(words[0])
+            except ValueError:
+                continue
+    return performance
+
+
+def parse_log(path):
+    """
+    Run/minimize segments of a LAMMPS log file, in order.
+
+    Returns:
+        list: One dict per run/minimize command (chunked production runs merged)
+    """
+    segments = []
+    fixes = {}
+    current = None
+    memory = None
+    with open(path, "r", errors="replace") as f:
+        lines = [line.rstrip("\n") for line in f]
+
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        match = FIX_LINE.match(line)
+        if match:
+            style = match.group(2).split("/omp")[0].split("/kk")[0]
+            if style in INTEGRATORS:
+                fixes[match.group(1)] = style
+            else:
+                fixes.pop(match.group(1), None)
+        elif UNFIX_LINE.match(line):
+            fixes.pop(UNFIX_LINE.match(line).group(1), None)
+        elif RUN_LINE.match(line):
+            current = {"command": line, "kind": line.split()[0], "ensemble": sorted(set(fixes.values()))}
+            memory = None
+        elif MEMORY_LINE.match(line):
+            memory = [float(value) for value in MEMORY_LINE.match(line).groups()]
+        elif LOOP_LINE.match(line) and current is not None:
+            loop_time, procs, steps, atoms = LOOP_LINE.match(line).groups()
+            current.update({"loop_time": float(loop_time), "procs": int(procs), "threads": None,
+                            "steps": int(steps), "atoms": int(atoms), "sections": {}})
+            if memory is not None:
+                current["memory_mb"] = dict(zip(["min", "avg", "max"], memory))
+            segments.append(current)
+            current = None
+        elif segments and PERFORMANCE_LINE.match(line) and "performance" not in segments[-1]:
+            segments[-1]["performance"] = parse_performance(PERFORMANCE_LINE.match(line).group(1))
+        elif segments and THREADS_LINE.search(line):
+            segments[-1]["threads"] = int(THREADS_LINE.search(line).group(2))
+        elif segments and line.startswith("Section |"):
+            table = []
+            i += 2
+            while i < len(lines) and SECTION_LINE.match(lines[i].strip()):
+                table.append(lines[i].strip())
+                i += 1
+            segments[-1]["sections"] = parse_sections(table)
+            continue
+        i += 1
+    return merge_chunks(segments)
+
+
+def merge_chunks(segments):
+    """
+    Merge consecutive chunks of one run (same "start S stop E" bounds) into one segment.
+
+    Loop time and steps are summed over the chunks. Only the chunks run with "post yes"
+    log a timing breakdown; their sections are scaled to the loop time of the whole run.
+    """
+    merged = []
+    for segment in segments:
+        bounds = RUN_BOUNDS.search(segment["command"])
+        previous = merged[-1] if merged else None
+        if bounds and previous is not None and previous.get("bounds") == bounds.groups():
+            for key in ("loop_time", "steps"):
+                previous[key] += segment[key]
+            previous["chunks"] += 1
+            if segment["threads"] is not None:
+                previous["threads"] = segment["threads"]
+            if segment["sections"]:
+                previous["timed_time"] += segment["loop_time"]
+                for name, times in segment["sections"].items():
+                    total = previous["sections"].setdefault(name, dict.fromkeys(times, 0.0))
+                    for column in ("min", "avg", "max"):
+                        if times.get(column) is not None:
+                            total[column] = (total.get(column) or 0.0) + times[column]
+            if "performance" not in previous and "performance" in segment:
+                previous["performance"] = segment["performance"]
+            if "memory_mb" in segment:
+                previous["memory_mb"] = segment["memory_mb"]
+            continue
+        segment = dict(segment, chunks=1, timed_time=segment["loop_time"] if segment["sections"] else 0.0)
+        if bounds:
+            segment["bounds"] = bounds.groups()
+        merged.append(segment)
+
+    for segment in merged:
+        segment.pop("bounds", None)
+        timed_time = segment.pop("timed_time")
+        if segment["chunks"] > 1 and segment["sections"] and timed_time:
+            # Shares of the timed chunks, scaled to the whole run (the per-chunk %varavg is dropped)
+            scale = segment["loop_time"] / timed_time
+            for times in segment["sections"].values():
+                times["%varavg"] = None
+                times["%total"] = 100.0 * (times.get("avg") or 0.0) / timed_time
+                for column in ("min", "avg", "max"):
+                    if times.get(column) is not None:
+                        times[column] *= scale
+        performance = segment.get("performance")
+        if segment["chunks"] > 1 and segment["loop_time"] and performance and performance.get("timesteps/s"):
+            # Rescale the rates of the chunk that printed them to the whole run
+            ratio = segment["steps"] / segment["loop_time"] / performance["timesteps/s"]
+            for unit, value in performance.items():
+                performance[unit] = value / ratio if unit.startswith("hours/") else value * ratio
+        if segment["threads"] is None:
+            segment["threads"] = 1
+        segment["core_hours"] = segment["loop_time"] * segment["procs"] * segment["threads"] / 3600.0
+    return merged
+
+
+def stage_profile(log_path):
+    """Segments of a stage log plus its totals (loop time, core-hours, sections, peak memory)."""
+    segments = parse_log(log_path)
+    sections = {}
+    for segment in segments:
+        for name, times in segment["sections"].items():
+            sections[name] = sections.get(name, 0.0) + (times.get("avg") or 0.0)
+    memory = [segment["memory_mb"]["max"] for segment in segments if "memory_mb" in segment]
+    return {
+        "log": os.path.basename(log_path),
+        "segments": segments,
+        "loop_time": sum(segment["loop_time"] for segment in segments),
+        "core_hours": sum(segment["core_hours"] for segment in segments),
+        "atoms": max((segment["atoms"] for segment in segments), default=0),
+        "sections": sections,
+        "memory_mb": max(memory, default=None),
+    }
+
+
+def lammps_profile(run_dir, stages):
+    """{stage: stage_profile} of the stage logs present in run_dir."""
+    profile = {}
+    for stage in stages:
+        path = os.path.join(run_dir, stage_log(stage))
+        if os.path.exists(path):
+            profile[stage] = stage_profile(path)
+    return profile
+
+
+def profile_paths(name, root="."):
+    """(profile JSON, tool timing log) of a candidate."""
+    directory = os.path.join(root, PROFILE_DIR)
+    return os.path.join(directory, f"{name}.json"), os.path.join(directory, f"{name}.timings.jsonl")
+
+
+def start_profile(name, root="."):
+    """Reset the tool timing log of a candidate and point ARAMIDSIM_PROFILE_LOG at it."""
+    _, timings_path = profile_paths(name, root)
+    os.makedirs(os.path.dirname(timings_path), exist_ok=True)
+    if os.path.exists(timings_path):
+        os.remove(timings_path)
+    os.environ[PROFILE_LOG_ENV] = os.path.abspath(timings_path)
+    return time.time()
+
+
+def write_profile(name, pipeline, step_timings, run_dir, stages, started, root="."):
+    """
+    Write profiles/<name>.json and append it to profiles/history.jsonl.
+
+    Args:
+        step_timings (dict): JobGraph.timings of the candidate's graph
+        stages (iterable): LAMMPS stages whose logs are read (empty when the LAMMPS step
+                           was skipped, so the logs of an earlier run are not counted again)
+
+    Returns:
+        dict: The profile
+    """
+    profile_path, timings_path = profile_paths(name, root)
+    profile = {
+        "name": name,
+        "pipeline": pipeline,
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+        "wall_time": round(time.time() - started, 3),
+        "host": os.uname().nodename,
+        "cpus": len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count(),
+        "steps": {step.split("/", 1)[-1]: timing for step, timing in step_timings.items()},
+        "tools": [entry for entry in read_timings(timings_path) if entry.get("kind") == "tool"],
+        "lammps": lammps_profile(os.path.join(root, run_dir), stages),
+    }
+    os.makedirs(os.path.dirname(profile_path), exist_ok=True)
+    with open(profile_path, "w") as f:
+        json.dump(profile, f, indent=2)
+    with open(os.path.join(root, PROFILE_DIR, HISTORY_FILENAME), "a") as f:
+        f.write(json.dumps(profile) + "\n")
+    return profile
+
+
+def mean(values):
+    return sum(values) / len(values) if values else 0.0
+
+
+def summarize(profiles):
+    """
+    Aggregate profiles: per step, tool and LAMMPS stage the run count, mean and total
+    wall time; per stage also the mean section shares, core-hours and peak memory.
+    """
+    steps, tools, stages = {}, {}, {}
+    for profile in profiles:
+        for step, timing in profile.get("steps", {}).items():
+            if timing.get("status") == "ran":
+                steps.setdefault(step, []).append(timing["seconds"])
+        for entry in profile.get("tools", []):
+            tools.setdefault(entry["label"], []).append(entry["seconds"])
+        for stage, data in profile.get("lammps", {}).items():
+            stages.setdefault(stage, []).append(data)
+
+    summary = {"runs": len(profiles), "steps": {}, "tools": {}, "lammps": {}}
+    for label, values in steps.items():
+        summary["steps"][label] = {"count": len(values), "mean": mean(values), "total": sum(values)}
+    for label, values in tools.items():
+        summary["tools"][label] = {"count": len(values), "mean": mean(values), "total": sum(values)}
+    for stage, runs in stages.items():
+        loop_times = [run["loop_time"] for run in runs]
+        shares = {}
+        for section in SECTIONS:
+            values = [100.0 * run["sections"].get(section, 0.0) / run["loop_time"] for run in runs if run["loop_time"]]
+            if any(values):
+                shares[section] = mean(values)
+        memory = [run["memory_mb"] for run in runs if run.get("memory_mb") is not None]
+        summary["lammps"][stage] = {
+            "count": len(runs),
+            "mean": mean(loop_times),
+            "total": sum(loop_times),
+            "core_hours": sum(run["core_hours"] for run in runs),
+            "atoms": max(run["atoms"] for run in runs),
+            "sections": shares,
+            "memory_mb": max(memory, default=None),
+        }
+    return summary
+
+
+def read_history(paths):
+    profiles = []
+    for path in paths:
+        with open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    profiles.append(json.loads(line))
+    return profiles
+
+
+def print_summary(summary):
+    print(f"{summary['runs']} recorded runs")
+    for title in ("steps", "tools"):
+        if summary[title]:
+            print(f"\n{title.capitalize():<24}{'count':>6}{'mean [s]':>12}{'total [s]':>12}")
+        for label, row in sorted(summary[title].items(), key=lambda item: -item[1]["total"]):
+            print(f"{label:<24}{row['count']:>6}{row['mean']:>12.1f}{row['total']:>12.1f}")
+    for stage, row in summary["lammps"].items():
+        memory = f"{row['memory_mb']:.1f} MB/rank" if row["memory_mb"] is not None else "memory n/a"
+        print(f"\nLAMMPS {stage}: {row['count']} runs, mean {row['mean']:.1f} s, "
+              f"{row['core_hours']:.2f} core-hours, up to {row['atoms']} atoms, {memory}")
+        print("    " + "  ".join(f"{section} {share:.1f}%" for section, share in row["sections"].items()))
+
+
+def time_command(label, command):
+    """Run command and record its wall time as a tool timing."""
+    start = time.time()
+    returncode = subprocess.run(command).returncode
+    record_timing("tool", label, time.time() - start, returncode=returncode)
+    return returncode
+
+
+def main():
+    usage = ("Usage: python Util_profile.py summary [history.jsonl ...]\n"
+             "       python Util_profile.py log <log.lammps>\n"
+             "       python Util_profile.py time <label> -- <command> [args...]\n")
+    args = sys.argv[1:]
+    if args[:1] == ["summary"]:
+        paths = args[1:] or [os.path.join(PROFILE_DIR, HISTORY_FILENAME)]
+        missing = [path for path in paths if not os.path.exists(path)]
+        if missing:
+            sys.stderr.write(f"Unable to open file: {missing[0]}\n")
+            sys.exit(1)
+        print_summary(summarize(read_history(paths)))
+    elif args[:1] == ["log"] and len(args) == 2:
+        print(json.dumps(parse_log(args[1]), indent=2))
+    elif args[:1] == ["time"] and len(args) > 3 and args[2] == "--":
+        sys.exit(time_command(args[1], args[3:]))
+    else:
+        sys.stderr.write(usage)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite result store keyed by canonical monomer SMILES.
+
+Replaces the linear scan of result.txt: lookups are a primary-key query and every
+write is its own transaction. result.txt is still appended as a plain-text export.
+
+The first time a store is opened next to an existing result.txt, that file is imported
+once. A manual re-import is also available:
+    python Util_result_store.py import [result.txt] [results.db]
+"""
+import json
+import os
+import sqlite3
+import sys
+
+RESULT_DB_FILENAME = "results.db"
+RESULT_TXT_FILENAME = "result.txt"
+
+# result.txt columns after the monomer SMILES
+RESULT_FIELDS = ["stretched_interE", "hbond_count", "pi_stacking_energy", "hbond_interE", "solution_interE"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    monomer_smiles TEXT PRIMARY KEY,
+    original_monomer TEXT NOT NULL,
+    stretched_interE TEXT,
+    hbond_count TEXT,
+    pi_stacking_energy TEXT,
+    hbond_interE TEXT,
+    solution_interE TEXT,
+    line TEXT NOT NULL,
+    stats TEXT,
+    updated TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+# Columns added after the first release of the store (name -> SQL type)
+MIGRATED_COLUMNS = {"stats": "TEXT"}
+
+# Store state; IMPORTED_KEY is set in the transaction that imports result.txt
+META_SCHEMA = "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+IMPORTED_KEY = "result_txt_imported"
+
+
+def rdkit_canonicalize(smiles):
+    from rdkit import Chem, RDLogger
+    RDLogger.DisableLog('rdApp.*')
+    mol = Chem.MolFromSmiles(smiles)
+    if mol is None:
+        return None
+    return Chem.MolToSmiles(mol, isomericSmiles=True)
+
+
+def parse_result_line(line):
+    """
+    Split a result.txt line into a record dict (values kept as the strings written).
+
+    Returns:
+        dict or None: None for blank or short lines
+    """
+    parts = line.strip().split()
+    if len(parts) < 1 + len(RESULT_FIELDS):
+        return None
+    record = {"original_monomer": parts[0], "line": line.strip()}
+    record.update(zip(RESULT_FIELDS, parts[1:1 + len(RESULT_FIELDS)]))
+    return record
+
+
+def connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=60)
+    conn.row_factory = sqlite3.Row
+    # WAL: readers never block the writer (interactive and batch runs may overlap)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(SCHEMA)
+    existing = {row["name"] for row in conn.execute("PRAGMA table_info(results)")}
+    for column, sql_type in MIGRATED_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE results ADD COLUMN {column} {sql_type}")
+    has_meta = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'meta'").fetchone()
+    conn.execute(META_SCHEMA)
+    if not has_meta and conn.execute("SELECT 1 FROM results LIMIT 1").fetchone():
+        # Store from before the meta table: its first import already ran
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, '1')", (IMPORTED_KEY,))
+    conn.commit()
+    return conn
+
+
+def is_imported(conn):
+    return conn.execute("SELECT 1 FROM meta WHERE key = ?", (IMPORTED_KEY,)).fetchone() is not None
+
+
+def open_store(base_dir=None, canonicalize=None):
+    """
+    Open <base_dir>/results.db, importing <base_dir>/result.txt the first time. The import
+    and its "imported" flag are committed together, so an interrupted import is retried.
+
+    Args:
+        base_dir (str): Directory holding result.txt (default: current directory)
+        canonicalize (callable): SMILES canonicalizer used by the import (default: RDKit)
+    """
+    base_dir = base_dir or os.getcwd()
+    db_path = os.path.join(base_dir, RESULT_DB_FILENAME)
+    conn = connect(db_path)
+    if is_imported(conn):
+        return conn
+
+    txt_path = os.path.join(base_dir, RESULT_TXT_FILENAME)
+    if os.path.exists(txt_path):
+        imported = import_result_txt(conn, txt_path, canonicalize)
+        print(f"Imported {imported} results from {txt_path} into {db_path}")
+    else:
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, '1')", (IMPORTED_KEY,))
+    return conn
+
+
+def put(conn, monomer_smiles, record):
+    """
+    Insert or replace the result of one canonical monomer SMILES (atomic).
+
+    record["stats"] (optional) holds the per-metric statistics (mean, sem, tau, n_eff, ...)
+    written by the output scripts; it is stored as JSON.
+    """
+    with conn:
+        insert_record(conn, monomer_smiles, record)
+
+
+def insert_record(conn, monomer_smiles, record):
+    """INSERT OR REPLACE of one record inside the caller's transaction."""
+    stats = record.get("stats")
+    conn.execute(
+        "INSERT OR REPLACE INTO results "
+        "(monomer_smiles, original_monomer, stretched_interE, hbond_count, pi_stacking_energy, "
+        "hbond_interE, solution_interE, line, stats, updated) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)",
+        (monomer_smiles, record.get("original_monomer", monomer_smiles),
+         *(record.get(field) for field in RESULT_FIELDS), record["line"],
+         json.dumps(stats) if stats is not None else None),
+    )
+
+
+def put_line(conn, monomer_smiles, line, stats=None):
+    """put() a result.txt-formatted line. Returns False if the line is malformed."""
+    record = parse_result_line(line)
+    if record is None:
+        return False
+    record["stats"] = stats
+    put(conn, monomer_smiles, record)
+    return True
+
+
+def get(conn, monomer_smiles):
+    """
+    Look up a canonical monomer SMILES.
+
+    Returns:
+        dict or None: Keys monomer_smiles, original_monomer, line, stats and RESULT_FIELDS
+    """
+    row = conn.execute("SELECT * FROM results WHERE monomer_smiles = ?", (monomer_smiles,)).fetchone()
+    if row is None:
+        return None
+    result = dict(row)
+    result["stats"] = json.loads(result["stats"]) if result["stats"] else None
+    return result
+
+
+def import_result_txt(conn, txt_path, canonicalize=None):
+    """
+    Import a whitespace-delimited result.txt. Later lines win for repeated monomers
+    (a re-run appends a newer result). All lines and the "imported" flag are written in
+    one transaction: a failure part-way leaves the store as it was.
+
+    Returns:
+        int: Number of lines imported
+    """
+    canonicalize = canonicalize or rdkit_canonicalize
+    imported = 0
+    with conn, open(txt_path, "r") as f:
+        for line_num, line in enumerate(f, 1):
+            record = parse_result_line(line)
+            if record is None:
+                continue
+            canonical = canonicalize(record["original_monomer"])
+            if canonical is None:
+                print(f"Warning: Invalid SMILES found in {txt_path} line {line_num}, skipping...")
+                continue
+            insert_record(conn, canonical, record)
+            imported += 1
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, '1')", (IMPORTED_KEY,))
+    return imported
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] != "import" or len(sys.argv) > 4:
+        sys.stderr.write("Usage: python Util_result_store.py import [result.txt] [results.db]\n")
+        sys.exit(1)
+
+    txt_path = sys.argv[2] if len(sys.argv) > 2 else RESULT_TXT_FILENAME
+    db_path = sys.argv[3] if len(sys.argv) > 3 else os.path.join(os.path.dirname(txt_path), RESULT_DB_FILENAME)
+    if not os.path.exists(txt_path):
+        sys.stderr.write(f"Unable to open file: {txt_path}\n")
+        sys.exit(1)
+
+    conn = connect(db_path)
+    imported = import_result_txt(conn, txt_path)
+    conn.close()
+    print(f"Imported {imported} results from {txt_path} into {db_path}")
+
+
+if __name__ == "__main__":
+    main()
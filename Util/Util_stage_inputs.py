@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Trajectory-output policy of the LAMMPS stage inputs (run.in.npt2, run_iso.in.npt2_wo_strain, ...).
+
+The template inputs write the same frames three times as text XYZ (three overlapping
+"dump ... xyz" outputs with 71-entry element lists). When the inputs are copied into a
+run directory, that block is replaced according to the "trajectory" section of
+aramidsim_config.json (per stage, merged over "default"):
+
+    xyz         keep the template dumps unchanged
+    none        no trajectory
+    final       final frame only (write_dump before write_data)
+    custom_gz   one gzip-compressed custom dump (id mol type x y z) every `stride` steps
+    dcd / xtc   one binary dump every `stride` steps (EXTRA-DUMP package)
+
+The checkpoint commands of Util_checkpoint.py (periodic restart files, progress markers
+and a restart file after every run/minimize) are added at the same time.
+
+Usage (in the run directory, before LAMMPS starts):
+    python Util_stage_inputs.py npt2=run.in.npt2 pppm=run.in.npt2_pppm
+"""
+import os
+import re
+import shlex
+import sys
+
+from Util_checkpoint import apply_checkpoints, checkpoint_every
+from Util_config import load_config
+
+POLICIES = ["xyz", "none", "final", "custom_gz", "dcd", "xtc"]
+TRAJECTORY_ID = "traj"
+CUSTOM_COLUMNS = "id mol type x y z"
+
+XYZ_DUMP = re.compile(r"^\s*dump\s+(\S+)\s+\S+\s+xyz\s+\d+\s+(\S+)")
+DUMP_MODIFY = re.compile(r"^\s*dump_modify\s+(\S+)\s")
+WRITE_DATA = re.compile(r"^\s*write_data\s")
+
+
+def trajectory_settings(stage, config=None):
+    """Trajectory policy of a stage: stage entry merged over the "default" entry."""
+    if config is None:
+        config = load_config()
+    tiers = config["trajectory"]
+    settings = dict(tiers.get("default", {}))
+    settings.update(tiers.get(stage, {}))
+    if settings.get("format") not in POLICIES:
+        raise ValueError(f"unknown trajectory format for {stage}: {settings.get('format')!r} "
+                         f"(expected one of {', '.join(POLICIES)})")
+    return settings
+
+
+def trajectory_lines(settings, base):
+    """Input lines replacing the XYZ dump block (base: file name stem of the first dump)."""
+    policy = settings["format"]
+    stride = int(settings.get("stride", 5000))
+    if policy == "custom_gz":
+        return [f"dump {TRAJECTORY_ID} all custom {stride} {base}.lammpstrj.gz {CUSTOM_COLUMNS}\n"]
+    if policy in ("dcd", "xtc"):
+        return [f"dump {TRAJECTORY_ID} all {policy} {stride} {base}.{policy}\n"]
+    return []
+
+
+def apply_trajectory_policy(lines, settings):
+    """
+    Rewrite the XYZ dumps of an input file (list of lines) according to settings.
+
+    Returns:
+        list: New lines (unchanged if the policy is "xyz" or the input has no XYZ dumps)
+    """
+    dump_ids = set()
+    first = None
+    for i, line in enumerate(lines):
+        match = XYZ_DUMP.match(line)
+        if match:
+            dump_ids.add(match.group(1))
+            if first is None:
+                first, base = i, os.path.splitext(match.group(2))[0]
+    if settings["format"] == "xyz" or first is None:
+        return list(lines)
+
+    out = []
+    for i, line in enumerate(lines):
+        if i == first:
+            out.extend(trajectory_lines(settings, base))
+        match = XYZ_DUMP.match(line) or DUMP_MODIFY.match(line)
+        if match and match.group(1) in dump_ids:
+            continue
+        if settings["format"] == "final" and WRITE_DATA.match(line):
+            out.append(f"write_dump all custom {base}_final.lammpstrj.gz {CUSTOM_COLUMNS}\n")
+        out.append(line)
+    return out
+
+
+def prepare_stage_input(stage, path, config=None):
+    """Apply the stage's trajectory policy and checkpoint commands to the input file in place."""
+    if config is None:
+        config = load_config()
+    settings = trajectory_settings(stage, config)
+    with open(path, "r") as f:
+        lines = f.readlines()
+    new_lines = apply_trajectory_policy(lines, settings)
+    new_lines = apply_checkpoints(new_lines, stage, checkpoint_every(config))
+    if new_lines != lines:
+        with open(path, "w") as f:
+            f.writelines(new_lines)
+
+
+def stage_inputs_shell_command(inputs, script="../../../Util/Util_stage_inputs.py"):
+    """Run-script line that prepares {stage: input file} in the LAMMPS run directory."""
+    args = ["python", script] + [f"{stage}={path}" for stage, path in inputs.items()]
+    return " ".join(shlex.quote(arg) for arg in args)
+
+
+def main():
+    if len(sys.argv) < 2 or not all("=" in arg for arg in sys.argv[1:]):
+        sys.stderr.write("Usage: python Util_stage_inputs.py <stage>=<input file> [...]\n")
+        sys.exit(1)
+    config = load_config()
+    for arg in sys.argv[1:]:
+        stage, _, path = arg.partition("=")
+        try:
+            prepare_stage_input(stage, path, config)
+        except (OSError, ValueError) as e:
+            sys.stderr.write(f"Unable to prepare {path}: {e}\n")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
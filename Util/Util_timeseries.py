@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Time-series helpers for the fix ave/time output files (output1.txt ... output5.txt).
+
+Statistics follow the usual MD practice: the equilibration cut t0 is chosen to maximize
+the effective sample size of the remaining samples (Chodera, JCTC 2016), the
+autocorrelation time is the statistical inefficiency of the remaining samples, and the
+standard error of the mean is std / sqrt(n_eff).
+
+Usage (prints the statistics and convergence check of each file):
+    python Util_timeseries.py output1.txt [output5.txt ...]
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+# fix ave/time series saved by the in-process LAMMPS driver (Util_lammps_driver.py)
+SERIES_FILENAME = "lammps_series.npz"
+
+
+def read_ave_time(path):
+    """
+    Read a single-value fix ave/time file ('# ...' header lines, then 'step value').
+
+    A partially written last line (file still being written by LAMMPS) is ignored.
+
+    Returns:
+        tuple: (steps, values) as NumPy arrays
+    """
+    steps, values = [], []
+    with open(path, "r") as f:
+        for line in f:
+            parts = line.split()
+            if not parts or parts[0].startswith("#"):
+                continue
+            try:
+                step, value = int(parts[0]), float(parts[1])
+            except (IndexError, ValueError):
+                break
+            steps.append(step)
+            values.append(value)
+    return np.array(steps, dtype=np.int64), np.array(values, dtype=float)
+
+
+def read_series(path):
+    """
+    (steps, values) of a fix ave/time file: from the driver's lammps_series.npz next to
+    it when that holds the file's series, else read_ave_time(path).
+    """
+    series_path = os.path.join(os.path.dirname(path), SERIES_FILENAME)
+    if os.path.exists(series_path):
+        with np.load(series_path) as series:
+            name = os.path.basename(path)
+            if name in series.files:
+                data = series[name].reshape(-1, 2)
+                return data[:, 0].astype(np.int64), data[:, 1]
+    return read_ave_time(path)
+
+
+def autocorrelation(values):
+    """Normalized autocorrelation function (FFT, zero-padded), or None for a constant series."""
+    x = np.asarray(values, dtype=float)
+    x = x - x.mean()
+    n = len(x)
+    spectrum = np.fft.rfft(x, 2 * n)
+    acf = np.fft.irfft(spectrum * np.conj(spectrum))[:n]
+    if acf[0] <= 0:
+        return None
+    return acf / acf[0]
+
+
+def integrated_autocorrelation_time(values, min_lag=3):
+    """
+    Statistical inefficiency g = 1 + 2 * sum_t (1 - t/n) * acf[t] in samples, summed until
+    the autocorrelation first drops to zero (past min_lag). n_eff = n / g.
+    """
+    n = len(values)
+    if n < 4:
+        return 1.0
+    acf = autocorrelation(values)
+    if acf is None:
+        return 1.0
+    lags = np.arange(1, n)
+    nonpositive = np.flatnonzero((acf[1:] <= 0) & (lags > min_lag))
+    cut = nonpositive[0] if len(nonpositive) else n - 1
+    tau = 1.0 + 2.0 * np.sum((1.0 - lags[:cut] / n) * acf[1:cut + 1])
+    return float(max(tau, 1.0))
+
+
+def detect_equilibration(values, max_candidates=100):
+    """
+    Equilibration cut that maximizes the effective sample size of values[t0:].
+
+    Returns:
+        tuple: (t0, tau of values[t0:], n_eff of values[t0:])
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n < 4:
+        return 0, 1.0, float(n)
+
+    # Keep at least a quarter of the run; test at most max_candidates cuts
+    candidates = np.unique(np.linspace(0, 3 * n // 4, min(max_candidates, 3 * n // 4 + 1)).astype(int))
+    taus = np.array([integrated_autocorrelation_time(values[t0:]) for t0 in candidates])
+    n_effs = (n - candidates) / taus
+    best = int(np.argmax(n_effs))
+    return int(candidates[best]), float(taus[best]), float(n_effs[best])
+
+
+def series_statistics(steps, values):
+    """
+    Equilibrated mean and error bars of one series.
+
+    Returns:
+        dict: mean, sem, tau (samples), tau_steps, n_samples, n_eff, t0,
+              equilibration_step and last (final sample)
+    """
+    steps = np.asarray(steps)
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        raise ValueError("empty series")
+
+    t0, tau, n_eff = detect_equilibration(values)
+    production = values[t0:]
+    std = np.std(production, ddof=1) if len(production) > 1 else 0.0
+    interval = float(np.median(np.diff(steps))) if len(steps) > 1 else 0.0
+    return {
+        "mean": float(production.mean()),
+        "sem": float(std / np.sqrt(n_eff)) if n_eff > 0 else float("nan"),
+        "tau": tau,
+        "tau_steps": tau * interval,
+        "n_samples": int(len(values)),
+        "n_eff": n_eff,
+        "t0": t0,
+        "equilibration_step": int(steps[t0]),
+        "last": float(values[-1]),
+    }
+
+
+def file_statistics(files):
+    """
+    series_statistics() of several ave/time files.
+
+    Args:
+        files (dict): Metric name -> file path
+
+    Returns:
+        dict: Metric name -> statistics (missing or empty files are skipped)
+    """
+    stats = {}
+    for metric, path in files.items():
+        try:
+            steps, values = read_series(path)
+            stats[metric] = series_statistics(steps, values)
+        except (OSError, ValueError) as e:
+            sys.stderr.write(f"Skipping statistics of {path}: {e}\n")
+    return stats
+
+
+def write_statistics(stats, path="stats.json"):
+    with open(path, "w") as f:
+        json.dump(stats, f, indent=2)
+
+
+def block_means(values, n_blocks):
+    """Means of n_blocks equal consecutive blocks (leading samples that do not fit are dropped)."""
+    values = np.asarray(values, dtype=float)
+    size = len(values) // n_blocks
+    if size == 0:
+        return np.empty(0)
+    return values[len(values) - size * n_blocks:].reshape(n_blocks, size).mean(axis=1)
+
+
+def relative_drift(values):
+    """Change of the least-squares line across the series, relative to its mean."""
+    values = np.asarray(values, dtype=float)
+    if len(values) < 2:
+        return np.inf
+    slope = np.polyfit(np.arange(len(values)), values, 1)[0]
+    mean = np.mean(values)
+    return abs(slope * (len(values) - 1)) / abs(mean) if mean != 0 else np.inf
+
+
+def relative_block_error(values, n_blocks):
+    """Standard error of the mean from block averages, relative to the mean."""
+    means = block_means(values, n_blocks)
+    if len(means) < 2:
+        return np.inf
+    mean = np.mean(means)
+    error = np.std(means, ddof=1) / np.sqrt(len(means))
+    return error / abs(mean) if mean != 0 else np.inf
+
+
+def window_samples(steps, window_steps):
+    """Number of trailing samples that fall within the last window_steps timesteps."""
+    steps = np.asarray(steps)
+    if len(steps) == 0:
+        return 0
+    return int(np.count_nonzero(steps > steps[-1] - window_steps))
+
+
+def check_convergence(values, window, n_blocks, max_drift, max_error):
+    """
+    Block-averaged plateau test on the last `window` samples.
+
+    Returns:
+        dict: samples, drift, error and converged (bool)
+    """
+    values = np.asarray(values, dtype=float)
+    tail = values[len(values) - window:] if window > 0 else values[:0]
+    drift = relative_drift(tail)
+    error = relative_block_error(tail, n_blocks)
+    return {
+        "samples": int(len(values)),
+        "drift": float(drift),
+        "error": float(error),
+        "converged": bool(len(tail) >= n_blocks and drift <= max_drift and error <= max_error),
+    }
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.stderr.write("Usage: python Util_timeseries.py <ave/time file> [...]\n")
+        sys.exit(1)
+
+    from Util_config import load_config
+    settings = load_config()["convergence"]
+    for path in sys.argv[1:]:
+        steps, values = read_series(path)
+        result = check_convergence(values, window_samples(steps, settings["window_steps"]),
+                                   settings["n_blocks"], settings["max_drift"], settings["max_error"])
+        print(f"{path}: {series_statistics(steps, values)}")
+        print(f"{path}: {result}")
+
+
+if __name__ == "__main__":
+    main()
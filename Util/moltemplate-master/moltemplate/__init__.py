@@ -42,6 +42,7 @@ from .genpoly_lt import main, GenPoly, GPSettings
 from .genpoly_modify_lt import main, GenPolyMod, GPModSettings, DistributePeriodic, DistributeRandom
 from .interpolate_curve import main, ResampleCurve, CalcNaturalCubicSplineCoeffs, SplineEval, SplineEvalD1, SplineEvalD2, SplineInterpEval, SplineInterpEvalD1, SplineInterpEvalD2, SplineCurvature2D, SplineInterpCurvature2D
 from .nbody_by_type import main
+from .build import main, Build
 
 __all__ = [# General modules for parsing and rendering text templates:
            'ttree','ttree_lex','ttree_render',
@@ -64,5 +65,6 @@ __all__ = [# General modules for parsing and rendering text templates:
            'renumber_DATA_first_column',
            'remove_duplicate_atoms','remove_duplicates_nbody',
            'bonds_by_type','charge_by_bond',
+           'build',
            # ESPResSo specific:
            'ettree','ettree_styles','extract_espresso_atom_types']
@@ -175,6 +175,8 @@ def LookupBondTypes(bond_types,
     for ie in range(0, len(bond_ids)):
         bond_types.append(None)
 
+    atomtypes2coefftype = {}
+
     for ie in range(0, len(bond_ids)):
         bondid = bond_ids[ie]
         (atomid1, atomid2) = bond_pairs[ie]
@@ -198,14 +200,21 @@ def LookupBondTypes(bond_types,
         atomtype1 = atomids2types[atomid1]
         atomtype2 = atomids2types[atomid2]
 
-        for typepattern, coefftype in typepattern_to_coefftypes:
+        # The bond type only depends on the pair of atom types, so the
+        # (long) list of patterns is only scanned once for each pair.
+        if (atomtype1, atomtype2) not in atomtypes2coefftype:
+            coefftype_found = None
+            for typepattern, coefftype in typepattern_to_coefftypes:
+
+                # use string comparisons to check if atom types match the pattern
+                if (ttree_lex.MatchesAll((atomtype1, atomtype2), typepattern) or
+                        ttree_lex.MatchesAll((atomtype2, atomtype1), typepattern)):
+                    # ("MatchesAll()" defined in "ttree_lex.py")
 
-            # use string comparisons to check if atom types match the pattern
-            if (ttree_lex.MatchesAll((atomtype1, atomtype2), typepattern) or
-                    ttree_lex.MatchesAll((atomtype2, atomtype1), typepattern)):
-                # ("MatchesAll()" defined in "ttree_lex.py")
+                    coefftype_found = coefftype
+            atomtypes2coefftype[(atomtype1, atomtype2)] = coefftype_found
 
-                bond_types[ie] = coefftype
+        bond_types[ie] = atomtypes2coefftype[(atomtype1, atomtype2)]
 
     for ie in range(0, len(bond_ids)):
         if not bond_types[ie]:
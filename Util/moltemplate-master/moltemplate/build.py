@@ -0,0 +1,1098 @@
+#!/usr/bin/env python
+
+# License: MIT License  (See LICENSE.md)
+
+"""
+   build.py
+
+   An in-process version of the moltemplate.sh pipeline.
+
+   moltemplate.sh runs lttree_check.py, lttree.py and a chain of smaller
+   post-processing scripts (bonds_by_type.py, nbody_by_type.py,
+   ttree_render.py, ...), each one in a new python interpreter, and passes
+   the intermediate results between them through files ("Data Atoms.template",
+   "ttree_assignments.txt", ...).  Build() runs the same stages, in the same
+   order and with the same arguments, in the current process and keeps the
+   intermediate files in memory.  Only the final files are written to disk
+   (system.data, system.in, system.in.init, system.in.settings, ...), together
+   with the "output_ttree/" directory (unless write_intermediates=False).
+   The files it creates are identical to the files created by moltemplate.sh.
+
+   Only the options needed to build a system from .lt files are supported:
+   -atomstyle, -nocheck, -checkff, -allow-wildcards, -forbid-wildcards and
+   the arguments understood by lttree.py.  (Use moltemplate.sh to read atom
+   coordinates from -pdb/-xyz/-raw/-dump files, or to use -molc, -vmd, or the
+   -overlay-* options.)
+
+   Usage (as a library):
+
+      from moltemplate import Build
+      Build('system.lt', outdir='moltemplates')
+
+   Usage (stand-alone):
+
+      build.py [-atomstyle style] [-nocheck] [-checkff] [-no-output-ttree] \\
+               [-nprocs n] system.lt
+
+   The angles, dihedrals, and impropers are generated concurrently
+   (by up to "-nprocs" forked processes) when more than one CPU is available.
+
+"""
+
+import os
+import sys
+import errno
+import multiprocessing
+import shutil
+import re
+from io import StringIO
+
+try:
+    from .ttree import StaticObj, InstanceObj, BasicUI, WriteFileCommand, \
+        WriteVarBindingsFile
+    from .ttree_lex import InputError
+    from .lttree import LttreeSettings, LttreeParseArgs, ExecCommands
+    from . import lttree_check, lttree_postprocess, ttree_render, \
+        bonds_by_type, nbody_by_type, nbody_fix_ttree_assignments, \
+        charge_by_bond, postprocess_coeffs, postprocess_input_script, \
+        remove_duplicate_atoms, remove_duplicates_nbody, \
+        renumber_DATA_first_column, nbody_reorder_atoms
+except (ImportError, SystemError, ValueError):
+    # not installed as a package
+    from ttree import StaticObj, InstanceObj, BasicUI, WriteFileCommand, \
+        WriteVarBindingsFile
+    from ttree_lex import InputError
+    from lttree import LttreeSettings, LttreeParseArgs, ExecCommands
+    import lttree_check, lttree_postprocess, ttree_render, \
+        bonds_by_type, nbody_by_type, nbody_fix_ttree_assignments, \
+        charge_by_bond, postprocess_coeffs, postprocess_input_script, \
+        remove_duplicate_atoms, remove_duplicates_nbody, \
+        renumber_DATA_first_column, nbody_reorder_atoms
+
+try:
+    from collections import defaultdict
+except ImportError:
+    pass
+
+g_program_name = __file__.split('/')[-1]  # = 'build.py'
+g_version_str = '0.1.0'
+g_date_str = '2026-10-17'
+
+g_moltemplate_cite = 'Jewett et al. J.Mol.Biol. (2021) (https://doi.org/10.1016/j.jmb.2021.166841)'
+
+# (These names match the variables in moltemplate.sh)
+data_header = 'Data Header'
+data_atoms = 'Data Atoms'
+data_masses = 'Data Masses'
+data_velocities = 'Data Velocities'
+data_bonds = 'Data Bonds'
+data_bond_list = 'Data Bond List'
+data_angles = 'Data Angles'
+data_dihedrals = 'Data Dihedrals'
+data_impropers = 'Data Impropers'
+data_pair_coeffs = 'Data Pair Coeffs'
+data_pairij_coeffs = 'Data PairIJ Coeffs'
+data_bond_coeffs = 'Data Bond Coeffs'
+data_angle_coeffs = 'Data Angle Coeffs'
+data_dihedral_coeffs = 'Data Dihedral Coeffs'
+data_improper_coeffs = 'Data Improper Coeffs'
+data_cmap = 'Data CMAP'
+data_charge_by_bond = 'Data Charge By Bond'
+data_bonds_by_type = 'Data Bonds By Type'
+data_angles_by_type = 'Data Angles By Type'
+data_dihedrals_by_type = 'Data Dihedrals By Type'
+data_impropers_by_type = 'Data Impropers By Type'
+data_ellipsoids = 'Data Ellipsoids'
+data_lines = 'Data Lines'
+data_triangles = 'Data Triangles'
+data_boundary = 'Data Boundary'
+data_pbc = 'Data PBC'
+in_init = 'In Init'
+in_settings = 'In Settings'
+in_charges = 'In Charges'
+
+# Sections of the data file, in the order moltemplate.sh writes them
+# (The "Masses" and "Atoms" sections are handled separately.)
+g_coeff_sections = [(data_pair_coeffs, 'Pair Coeffs'),
+                    (data_pairij_coeffs, 'PairIJ Coeffs'),
+                    (data_bond_coeffs, 'Bond Coeffs'),
+                    (data_angle_coeffs, 'Angle Coeffs'),
+                    (data_dihedral_coeffs, 'Dihedral Coeffs'),
+                    (data_improper_coeffs, 'Improper Coeffs'),
+                    ('Data BondBond Coeffs', 'BondBond Coeffs'),
+                    ('Data BondAngle Coeffs', 'BondAngle Coeffs'),
+                    ('Data MiddleBondTorsion Coeffs', 'MiddleBondTorsion Coeffs'),
+                    ('Data EndBondTorsion Coeffs', 'EndBondTorsion Coeffs'),
+                    ('Data AngleTorsion Coeffs', 'AngleTorsion Coeffs'),
+                    ('Data AngleAngleTorsion Coeffs', 'AngleAngleTorsion Coeffs'),
+                    ('Data BondBond13 Coeffs', 'BondBond13 Coeffs'),
+                    ('Data AngleAngle Coeffs', 'AngleAngle Coeffs')]
+g_topology_sections = [(data_ellipsoids, 'Ellipsoids'),
+                       (data_triangles, 'Triangles'),
+                       (data_lines, 'Lines'),
+                       (data_velocities, 'Velocities'),
+                       (data_bonds, 'Bonds'),
+                       (data_angles, 'Angles'),
+                       (data_dihedrals, 'Dihedrals'),
+                       (data_impropers, 'Impropers')]
+
+# The files moltemplate.sh moves to "output_ttree/" ($MOLTEMPLATE_TEMP_FILES)
+g_temp_files = set(['ttree_assignments.txt',
+                    data_masses, data_pair_coeffs, data_pairij_coeffs,
+                    data_bond_coeffs, data_angle_coeffs, data_dihedral_coeffs,
+                    data_improper_coeffs, data_atoms, data_velocities,
+                    data_bonds, data_bond_list, data_angles, data_dihedrals,
+                    data_impropers, 'Data BondBond Coeffs',
+                    'Data BondAngle Coeffs', 'Data MiddleBondTorsion Coeffs',
+                    'Data EndBondTorsion Coeffs', 'Data AngleTorsion Coeffs',
+                    'Data AngleAngleTorsion Coeffs', 'Data BondBond13 Coeffs',
+                    'Data AngleAngle Coeffs', data_ellipsoids, data_lines,
+                    data_triangles, data_boundary, data_header,
+                    data_charge_by_bond, in_init, in_settings])
+g_temp_prefixes = (data_bonds_by_type, data_angles_by_type,
+                   data_dihedrals_by_type, data_impropers_by_type)
+
+g_coeff_commands = set(['pair_coeff', 'bond_coeff', 'angle_coeff',
+                        'dihedral_coeff', 'improper_coeff'])
+
+g_run_section = """
+# ----------------- Run Section -----------------
+
+# The lines above define the system you want to simulate.
+# What you do next is up to you.
+# Typically a user would minimize and equilibrate
+# the system using commands similar to the following:
+#  ----   examples   ----
+#
+#  -- minimize --
+# minimize 1.0e-5 1.0e-7 1000 10000
+# (Note: Some fixes, for example "shake", interfere with the minimize command,
+#        You can use the "unfix" command to disable them before minimization.)
+#  -- declare time step for normal MD --
+# timestep 1.0
+#  -- run at constant pressure (Nose-Hoover)--
+# fix   fxnpt all npt temp 300.0 300.0 100.0 iso 1.0 1.0 1000.0 drag 1.0
+#  -- ALTERNATELY, run at constant volume (Nose-Hoover) --
+# fix   fxnvt all nvt temp 300.0 300.0 500.0 tchain 1
+#  -- ALTERNATELY, run at constant volume using Langevin dynamics. --
+#  -- (This is good for sparse CG polymers in implicit solvent.)   --
+# fix fxLAN all langevin 300.0 300.0 5000 48279
+# fix fxNVE all nve  #(<--needed by fix langevin)
+#  -- Now, finally run the simulation --
+# run   50000
+#  ---- (end of examples) ----
+
+"""
+
+
+def IsTempFile(file_name):
+    return (file_name.endswith('.template') or
+            (file_name in g_temp_files) or
+            file_name.startswith(g_temp_prefixes))
+
+
+class FileDict(object):
+    """
+    A replacement for the built-in open() function which is installed
+    in the module of a stage script while it runs.  Files which are in
+    the "files" dictionary are read from memory instead of from the disk.
+    (Intermediate files which have not been created yet do not exist,
+     even if a file with that name happens to be lying around on the disk.)
+    All other files are opened normally.
+
+    """
+
+    def __init__(self, files):
+        self.files = files
+
+    def __call__(self, file_name, mode='r', *args, **kwargs):
+        if ('r' in mode) and ('+' not in mode):
+            if file_name in self.files:
+                return StringIO(self.files[file_name])
+            elif IsTempFile(file_name):
+                raise IOError(errno.ENOENT, 'No such file or directory',
+                              file_name)
+        return open(file_name, mode, *args, **kwargs)
+
+
+def RunScript(module, args, stdin_text='', files=None):
+    """
+    Invoke the main() function of one of the stand-alone scripts
+    (eg. "ttree_render.py") as moltemplate.sh would, except that
+    sys.argv, sys.stdin and sys.stdout are replaced by the "args" list,
+    the "stdin_text" string, and the string returned by this function.
+    If "files" is not None, the files the script opens are read from
+    that dictionary (see FileDict).
+
+    """
+    script_name = module.__name__.split('.')[-1] + '.py'
+    orig_argv, orig_stdin, orig_stdout = sys.argv, sys.stdin, sys.stdout
+    sys.argv = [script_name] + list(args)
+    sys.stdin = StringIO(stdin_text)
+    sys.stdout = StringIO()
+    if files is not None:
+        module.open = FileDict(files)
+    try:
+        try:
+            module.main()
+        except SystemExit as err:
+            if err.code not in (None, 0):
+                raise InputError('Error: \"' + script_name + '\" failed '
+                                 '(exit status ' + str(err.code) + ')\n')
+        return sys.stdout.getvalue()
+    finally:
+        sys.argv, sys.stdin, sys.stdout = orig_argv, orig_stdin, orig_stdout
+        if files is not None:
+            del module.open
+
+
+def RunLttree(ttree_args, files):
+    """
+    The equivalent of running lttree.py.  Instead of writing the templates
+    and the rendered files (and "ttree_assignments.txt") to the disk, they
+    are stored in the "files" dictionary.  (Like lttree.py, text written
+    to the file named '' is printed to the standard output.)
+
+    """
+    settings = LttreeSettings()
+    LttreeParseArgs([g_program_name] + list(ttree_args),
+                    settings, main=True, show_warnings=True)
+
+    g_objectdefs = StaticObj('', None)
+    g_objects = InstanceObj('', None)
+    g_static_commands = []
+    g_instance_commands = []
+    BasicUI(settings,
+            g_objectdefs,
+            g_objects,
+            g_static_commands,
+            g_instance_commands)
+
+    sys.stderr.write(' done\nbuilding templates...')
+    templates_content = defaultdict(list)
+    ExecCommands(g_static_commands, templates_content, settings, False)
+    ExecCommands(g_instance_commands, templates_content, settings, False)
+
+    # Every file mentioned in a write() command exists (even if it is empty)
+    for command in g_static_commands + g_instance_commands:
+        if isinstance(command, WriteFileCommand):
+            if (command.filename != None) and (command.filename != ''):
+                files[command.filename] = ''
+                files[command.filename + '.template'] = ''
+    for file_name, str_list in templates_content.items():
+        if (file_name != None) and (file_name != ''):
+            files[file_name + '.template'] += ''.join(str_list)
+
+    sys.stderr.write(' done\nbuilding and rendering templates...')
+    rendered_content = defaultdict(list)
+    ExecCommands(g_static_commands, rendered_content, settings, True)
+    ExecCommands(g_instance_commands, rendered_content, settings, True)
+    for file_name, str_list in rendered_content.items():
+        if file_name == '':
+            sys.stdout.write(''.join(str_list))
+        elif file_name != None:
+            files[file_name] += ''.join(str_list)
+    sys.stderr.write(' done\n')
+
+    sys.stderr.write('writing \"ttree_assignments.txt\" file...')
+    assignments = StringIO()
+    WriteVarBindingsFile(g_objectdefs, assignments)
+    WriteVarBindingsFile(g_objects, assignments)
+    files['ttree_assignments.txt'] = assignments.getvalue()
+    sys.stderr.write(' done\n')
+
+
+def CountLines(text):
+    """ The number of lines in the text, as counted by awk 'END{print NR}' """
+    n = text.count('\n')
+    if (len(text) > 0) and (not text.endswith('\n')):
+        n += 1
+    return n
+
+
+def CountTypes(assignments, cat_name):
+    """ The number of @cat_name types, or '' if there are none """
+    prefix = '@/' + cat_name + ':'
+    n = 0
+    for line in assignments.split('\n'):
+        if line.startswith(prefix):
+            n += 1
+    if n == 0:
+        return ''
+    return str(n)
+
+
+def LastFieldMatch(text, i_test, test_value, i_value):
+    """
+    Find the last line whose (i_test)th column equals test_value and
+    return its (i_value)th column.  (eg. awk '{if ($3=="xlo") {xlo=$1}}')
+    """
+    value = ''
+    for line in text.split('\n'):
+        tokens = line.split()
+        if (len(tokens) > i_test) and (tokens[i_test] == test_value):
+            if i_value < len(tokens):
+                value = tokens[i_value]
+            else:
+                value = ''
+    return value
+
+
+def HasCoeffCommands(text):
+    for line in text.split('\n'):
+        tokens = line.split()
+        if (len(tokens) > 0) and (tokens[0] in g_coeff_commands):
+            return True
+    return False
+
+
+def HasCoeffWildcards(text):
+    for line in text.split('\n'):
+        tokens = line.split()
+        if ((len(tokens) > 0) and ('_coeff' in tokens[0]) and
+            re.search(r'[*,?]', line)):
+            return True
+    return False
+
+
+def RemoveCommand(text, command_name):
+    """ Delete the lines beginning with command_name """
+    lines = text.split('\n')
+    if text.endswith('\n'):
+        lines.pop()
+    return ''.join([line + '\n' for line in lines
+                    if (line.split()[:1] != [command_name])])
+
+
+def VersionSortKey(file_name):
+    """ Sort file names the way "ls -v" does """
+    return [(0, int(s), '') if s.isdigit() else (1, 0, s)
+            for s in re.split(r'(\d+)', file_name) if s != '']
+
+
+
+
+def NbodyByTypePasses(files, section_name, cat_name, n_body,
+                      atom_style, checkff_args):
+    """
+    List the nbody_by_type.py passes which generate the Angles (or Dihedrals,
+    or Impropers) from the bond topology using the rules in the
+    "Data Angles By Type*" files, in the order moltemplate.sh runs them.
+    Each pass is a tuple (section_name, cat_name, message, arguments).
+    Returns the passes, the subgraph script used (if any), and the names
+    of the last two rule files used (to detect conflicting rules).
+
+    """
+    by_type_prefix = 'Data ' + section_name + ' By Type'
+    passes = []
+    subgraph_script_section = ''
+    file_by_type1 = ''
+    file_by_type2 = ''
+    rule_files = [file_name for file_name in files
+                  if (file_name.startswith(by_type_prefix) and
+                      file_name.endswith('.template'))]
+    for file_name in sorted(rule_files, key=VersionSortKey):
+        if (files[file_name] == '') or (files.get(data_bonds, '') == ''):
+            break
+        message = ('Generating ' + str(n_body) + '-body ' + cat_name +
+                   ' interactions by atom/bond type\n')
+
+        # Example: file_name = "Data Angles By Type (gaff_angle.py).template"
+        #          subgraph_script = "gaff_angle.py"
+        subgraph_script = ''
+        if re.search(r'\(.*\)', file_name):
+            subgraph_script = file_name.split('(', 1)[1].split(')')[0]
+        if subgraph_script_section != '':
+            subgraph_script = subgraph_script_section
+        elif subgraph_script != '':
+            subgraph_script_section = subgraph_script
+        if subgraph_script == '':
+            subgraph_script = 'nbody_' + section_name + '.py'
+        else:
+            message += ('(using the rules in \"' + subgraph_script +
+                        '\")\n')
+
+        file_by_type2 = file_by_type1
+        file_by_type1 = file_name
+
+        passes.append((section_name, cat_name, message,
+                       ['-subgraph', subgraph_script,
+                        '-section', section_name,
+                        '-sectionbytype', section_name + ' By Type',
+                        '-atom-style', atom_style,
+                        '-atoms', data_atoms + '.template',
+                        '-bonds', data_bonds + '.template',
+                        '-nbodybytype', file_name] +
+                       checkff_args +
+                       ['-prefix', '$/' + cat_name + ':bytype']))
+
+    return passes, subgraph_script_section, file_by_type1, file_by_type2
+
+
+# The passes (and files) used by the forked processes in RunPassesInParallel()
+g_pool_passes = None
+g_pool_files = None
+
+
+def RunPoolPass(i_pass):
+    """
+    Run the i_pass'th nbody_by_type.py pass (in a forked process).
+    Returns the text it printed to the standard output and standard error,
+    and the error message (or None if it succeeded).
+
+    """
+    args = g_pool_passes[i_pass][3]
+    orig_stderr = sys.stderr
+    sys.stderr = StringIO()
+    try:
+        try:
+            gen_template = RunScript(nbody_by_type, args, files=g_pool_files)
+            return gen_template, sys.stderr.getvalue(), None
+        except InputError as err:
+            return '', sys.stderr.getvalue(), str(err)
+    finally:
+        sys.stderr = orig_stderr
+
+
+def RunPassesInParallel(passes, files, atom_style, processes):
+    """
+    Run the nbody_by_type.py passes concurrently, in a pool of forked
+    processes.  The passes are independent: each one reads the same atoms,
+    bonds, and its own rule file.  The bond graph is parsed once, before
+    forking, and every process inherits it (see nbody_by_type.ReadBondGraph).
+    Returns the results of RunPoolPass() for each pass (in order).
+
+    """
+    global g_pool_passes, g_pool_files
+    try:
+        nbody_by_type.ReadBondGraph(
+            [line for line in
+             StringIO(files[data_atoms + '.template']).readlines()
+             if ((len(line.strip()) > 0) and (line.strip()[0] != '#'))],
+            [line for line in
+             StringIO(files[data_bonds + '.template']).readlines()
+             if ((len(line.strip()) > 0) and (line.strip()[0] != '#'))],
+            atom_style)
+    except InputError:
+        pass  # (The passes will report the error.)
+
+    g_pool_passes = passes
+    g_pool_files = files
+    pool = multiprocessing.get_context('fork').Pool(min(processes,
+                                                        len(passes)))
+    try:
+        return pool.map(RunPoolPass, range(0, len(passes)), chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+        g_pool_passes = None
+        g_pool_files = None
+
+
+def AddInteractionsByType(files, section_name, cat_name, gen_template):
+    """
+    Add the interactions generated by a nbody_by_type.py pass to the
+    "Data Angles.template" file (for example), add them to
+    ttree_assignments.txt (nbody_fix_ttree_assignments.py), and render
+    the "Data Angles" file.
+
+    """
+    data_section = 'Data ' + section_name
+    gen_file_name = 'gen_' + cat_name + 's.template.tmp'
+    files[data_section + '.template'] = \
+        gen_template + files.get(data_section + '.template', '')
+
+    sys.stderr.write('(Repairing ttree_assignments.txt file after ' +
+                     cat_name + 's added.)\n')
+    files['ttree_assignments.txt'] = \
+        RunScript(nbody_fix_ttree_assignments,
+                  ['/' + cat_name, gen_file_name],
+                  files['ttree_assignments.txt'],
+                  files={gen_file_name: gen_template})
+
+    sys.stderr.write('(Rendering ttree_assignments.tmp file after ' +
+                     cat_name + 's added.)\n')
+    files[data_section] = Render(files[data_section + '.template'], files)
+    sys.stderr.write('\n')
+
+
+def Render(template_text, files):
+    """ Substitute the variables using ttree_assignments.txt """
+    return RunScript(ttree_render, ['ttree_assignments.txt'],
+                     template_text, files=files)
+
+
+def CleanUp(out_file_base):
+    """
+    Delete the files left over from an earlier run of moltemplate.
+    (moltemplate.sh does this before it begins.)
+    """
+    for file_name in os.listdir('.'):
+        if not os.path.isfile(file_name):
+            continue
+        if ((file_name == out_file_base + '.data') or
+            (file_name == out_file_base + '.in') or
+            (file_name.startswith(out_file_base + '.in.') and
+             ('.lt' not in file_name)) or
+            IsTempFile(file_name) or
+            (file_name in ('tmp_atom_coords.dat', 'tmp_dump.dat',
+                           'tmp_ellips_quat.dat'))):
+            os.remove(file_name)
+    if os.path.isdir('output_ttree'):
+        shutil.rmtree('output_ttree')
+
+
+def WriteTextFiles(files, names, directory='.'):
+    for file_name in names:
+        path = os.path.join(directory, file_name)
+        if os.path.dirname(path) and not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        f = open(path, 'w')
+        f.write(files[file_name])
+        f.close()
+
+
+def Build(system_lt='system.lt',
+          outdir='.',
+          atom_style=None,
+          check=True,
+          checkff=False,
+          ttree_args=None,
+          check_args=None,
+          write_intermediates=True,
+          processes=None):
+    """
+    Build a LAMMPS data file and input scripts from a moltemplate file.
+    This is equivalent to running "moltemplate.sh system.lt" from
+    within the "outdir" directory.  (The path of system_lt is relative to
+    the current directory.)
+
+    atom_style      the LAMMPS atom_style  (-atomstyle, default: "full")
+    check           check the files for common mistakes  (False: -nocheck)
+    checkff         pass -checkff to nbody_by_type.py
+    ttree_args      other arguments passed to lttree.py
+    check_args      other arguments passed to lttree_check.py
+                    (eg. ["-allow-wildcards"])
+    write_intermediates   create the "output_ttree/" directory containing
+                    the intermediate files (like moltemplate.sh does)
+    processes       number of processes used to generate the angles,
+                    dihedrals, and impropers concurrently
+                    (default: the number of CPUs this process may use)
+
+    Returns the names of the files created in outdir.
+
+    """
+    lt_file = os.path.relpath(os.path.abspath(system_lt),
+                              os.path.abspath(outdir))
+    if processes is None:
+        if hasattr(os, 'sched_getaffinity'):
+            processes = len(os.sched_getaffinity(0))
+        else:
+            processes = os.cpu_count() or 1
+    orig_dir = os.getcwd()
+    os.chdir(outdir)
+    try:
+        return _Build(lt_file, atom_style, check, checkff,
+                      list(ttree_args or []), list(check_args or []),
+                      write_intermediates, processes)
+    finally:
+        os.chdir(orig_dir)
+
+
+def _Build(lt_file, atom_style, check, checkff, ttree_args, check_args,
+           write_intermediates, processes):
+
+    out_file_base = 'system'
+    lt_basename = os.path.basename(lt_file)
+    for ext in ('.lt', '.LT'):
+        if lt_basename.endswith(ext) and (lt_basename != ext):
+            out_file_base = lt_basename[:-len(ext)]
+            break
+    out_file_input_script = out_file_base + '.in'
+    out_file_init = out_file_base + '.in.init'
+    out_file_settings = out_file_base + '.in.settings'
+    out_file_data = out_file_base + '.data'
+
+    lttree_args = []
+    if atom_style:
+        lttree_args += ['-atomstyle', atom_style]
+    lttree_args += ttree_args + [lt_file]
+    if not atom_style:
+        atom_style = 'full'
+    checkff_args = []
+    if checkff:
+        checkff_args = ['-checkff']
+
+    CleanUp(out_file_base)
+
+    if check:
+        RunScript(lttree_check, lttree_args + check_args)
+
+    # The contents of the files created so far (file name -> text)
+    files = {}
+
+    sys.stderr.write('lttree.py v' + g_version_str + ' (build.py)\n')
+    RunLttree(lttree_args, files)
+    sys.stderr.write('\n')
+
+    assignments = files['ttree_assignments.txt']
+    n_atom_types = CountTypes(assignments, 'atom')
+    n_bond_types = CountTypes(assignments, 'bond')
+    n_angle_types = CountTypes(assignments, 'angle')
+    n_dihedral_types = CountTypes(assignments, 'dihedral')
+    n_improper_types = CountTypes(assignments, 'improper')
+
+    if n_atom_types == '':
+        # Moltemplate can be used as a simple hierarchical template renderer
+        # that knows nothing about LAMMPS.  In that case we are done.
+        WriteTextFiles(files, files.keys())
+        return sorted(files.keys())
+
+    for file_name in files:
+        if IsTempFile(file_name):
+            files[file_name] = files[file_name].replace('\r', '')
+
+    if files.get(data_atoms, '') != '':
+        files[data_atoms] = RunScript(remove_duplicate_atoms, [],
+                                      files[data_atoms])
+        files[data_atoms + '.template'] = \
+            RunScript(remove_duplicate_atoms, [],
+                      files[data_atoms + '.template'])
+        files[data_atoms] = RunScript(renumber_DATA_first_column, [],
+                                      files[data_atoms])
+    else:
+        raise InputError('Error: There are no atoms in your system.\n'
+                         '       Your files must contain at least one\n'
+                         '           write(\"' + data_atoms + '\")\n'
+                         '       command.  (This error also occurs if your input files lack \"new\" commands.)\n')
+
+    if files.get(data_bond_list + '.template', '') != '':
+        if files.get(data_bonds_by_type, '') == '':
+            raise InputError('Error: You have a \"Data Bond List\", section somewhere\n'
+                             '       without a \"Data Bonds By Type\" section to support it.\n'
+                             '       (Did you mean to use \"Data Bonds\" instead?)\n')
+        sys.stderr.write('Looking up bond types according to atom type\n')
+        gen_template = RunScript(bonds_by_type,
+                                 ['-atom-style', atom_style,
+                                  '-atoms', data_atoms + '.template',
+                                  '-bond-list', data_bond_list + '.template',
+                                  '-bondsbytype',
+                                  data_bonds_by_type + '.template',
+                                  '-prefix', '$/bond:bytype'],
+                                 files=files)
+        files[data_bonds + '.template'] = \
+            gen_template + files.get(data_bonds + '.template', '')
+        files[data_bonds] = Render(files[data_bonds + '.template'], files)
+        sys.stderr.write('\n\n')
+
+    subgraph_scripts = {'Bonds': ''}
+    rule_files = {}
+    passes = []
+    for section_name, cat_name, n_body, section_checkff_args in \
+            (('Angles', 'angle', 3, checkff_args),
+             ('Dihedrals', 'dihedral', 4, checkff_args),
+             ('Impropers', 'improper', 4, [])):
+        section_passes, subgraph_script, file_by_type1, file_by_type2 = \
+            NbodyByTypePasses(files, section_name, cat_name, n_body,
+                              atom_style, section_checkff_args)
+        passes += section_passes
+        subgraph_scripts[section_name] = subgraph_script
+        rule_files[section_name] = (file_by_type1, file_by_type2)
+
+    # The passes do not depend on each other, so they can run concurrently.
+    # (Their results are added to ttree_assignments.txt in the usual order.)
+    results = None
+    if ((processes > 1) and (len(passes) > 1) and
+            ('fork' in multiprocessing.get_all_start_methods())):
+        results = RunPassesInParallel(passes, files, atom_style, processes)
+    for i_pass, (section_name, cat_name, message, args) in enumerate(passes):
+        sys.stderr.write(message)
+        if results is None:
+            gen_template = RunScript(nbody_by_type, args, files=files)
+        else:
+            gen_template, stderr_text, err_msg = results[i_pass]
+            sys.stderr.write(stderr_text)
+            if err_msg is not None:
+                raise InputError(err_msg)
+        AddInteractionsByType(files, section_name, cat_name, gen_template)
+
+    # Expand the wildcard characters in the "_coeff" commands
+    files_with_coeff_commands = [file_name for file_name in sorted(files)
+                                 if (file_name.endswith('.template') and
+                                     HasCoeffCommands(files[file_name]))]
+    sys.stderr.write('expanding wildcards in \"_coeff\" commands\n')
+    for file_name in files_with_coeff_commands:
+        if HasCoeffWildcards(files[file_name]):
+            sys.stderr.write('  expanding wildcards in \"_coeff\" commands in \"' +
+                             file_name + '\"\n')
+            files[file_name] = RunScript(postprocess_coeffs,
+                                         ['ttree_assignments.txt'],
+                                         files[file_name], files=files)
+            files[file_name[:-len('.template')]] = \
+                Render(files[file_name], files)
+
+    if check:
+        sys.stderr.write('\n')
+        RunScript(lttree_postprocess, lttree_args, files=files)
+        sys.stderr.write('\n')
+
+    if files.get(data_masses, '') != '':
+        files[data_masses] = RunScript(remove_duplicate_atoms, [],
+                                       files[data_masses])
+
+    for section_name, n_body in (('Bonds', 2), ('Angles', 3),
+                                 ('Dihedrals', 4), ('Impropers', 4)):
+        data_section = 'Data ' + section_name
+        if files.get(data_section, '') == '':
+            continue
+        subgraph_script = (subgraph_scripts[section_name] or
+                           'nbody_' + section_name + '.py')
+        files[data_section] = RunScript(nbody_reorder_atoms,
+                                        [section_name, subgraph_script],
+                                        files[data_section])
+        files[data_section] = RunScript(remove_duplicates_nbody,
+                                        [str(n_body)], files[data_section])
+        files[data_section + '.template'] = \
+            RunScript(remove_duplicates_nbody, [str(n_body)],
+                      files[data_section + '.template'])
+        files[data_section] = RunScript(renumber_DATA_first_column, [],
+                                        files[data_section])
+        if (section_name in rule_files) and (rule_files[section_name][1] != ''):
+            sys.stderr.write('\nWARNING:\n'
+                             '  It appears as though multiple conflicting rules were used to generate\n' +
+                             section_name.upper() + ' interactions.  In your case, you are using rules defined here:\n'
+                             '   \"' + rule_files[section_name][1] + '\"\n'
+                             '   \"' + rule_files[section_name][0] + '\"\n'
+                             'Please check the list of ' + section_name.lower() +
+                             ' to make sure they are correct!\n\n')
+
+    if files.get(data_charge_by_bond, '') != '':
+        sys.stderr.write('Looking up partial charge contributions from bonds\n')
+        gen_template = RunScript(charge_by_bond,
+                                 ['-atom-style', atom_style,
+                                  '-atoms', data_atoms + '.template',
+                                  '-bonds', data_bonds + '.template',
+                                  '-bond-list', data_bond_list + '.template',
+                                  '-chargebybond',
+                                  data_charge_by_bond + '.template'],
+                                 files=files)
+        files[in_charges + '.template'] = \
+            gen_template + files.get(in_charges + '.template', '')
+        files[in_charges] = (files.get(in_charges, '') +
+                             Render(files[in_charges + '.template'], files))
+        sys.stderr.write('\n\n')
+
+    # (moltemplate.sh deletes this file)
+    files.pop('ttree_replacements.txt', None)
+
+    # Files which are not moved to "output_ttree/" (eg. "log.cite.gaff")
+    # stay where they are, together with the files created below.
+    outputs = {}
+    for file_name in files:
+        if not (IsTempFile(file_name) or
+                file_name.startswith('Data ') or (file_name == 'Data') or
+                file_name.startswith('In ') or (file_name == 'In')):
+            outputs[file_name] = files[file_name]
+    rendered_files = [file_name[:-len('.template')] for file_name in files
+                      if (file_name.endswith('.template') and
+                          (file_name[:-len('.template')] in files))]
+
+    # ---------------- the LAMMPS data file ----------------
+
+    n_atoms = n_bonds = n_angles = n_dihedrals = n_impropers = n_cmap = '0'
+    n_ellipsoids = ''
+    if files.get(data_atoms, '') != '':
+        n_atoms = str(CountLines(files[data_atoms]))
+    if files.get(data_ellipsoids, '') != '':
+        n_ellipsoids = str(CountLines(files[data_ellipsoids]))
+    if files.get(data_bonds, '') != '':
+        n_bonds = str(CountLines(files[data_bonds]))
+    if files.get(data_angles, '') != '':
+        n_angles = str(CountLines(files[data_angles]))
+    if files.get(data_dihedrals, '') != '':
+        n_dihedrals = str(CountLines(files[data_dihedrals]))
+    if files.get(data_impropers, '') != '':
+        n_impropers = str(CountLines(files[data_impropers]))
+    if files.get(data_cmap, '') != '':
+        n_cmap = str(CountLines(files[data_cmap]))
+
+    data = ['LAMMPS Description\n',
+            '\n',
+            '     ' + n_atoms + '  atoms\n']
+    if n_ellipsoids != '':
+        data.append('     ' + n_ellipsoids + '  ellipsoids\n')
+    data.append('     ' + n_bonds + '  bonds\n')
+    data.append('     ' + n_angles + '  angles\n')
+    data.append('     ' + n_dihedrals + '  dihedrals\n')
+    data.append('     ' + n_impropers + '  impropers\n')
+    if int(n_cmap) > 0:
+        data.append('     ' + n_cmap + '  crossterms\n')
+    data.append('\n')
+    data.append('     ' + n_atom_types + '  atom types\n')
+    for n_types, cat_name in ((n_bond_types, 'bond'),
+                              (n_angle_types, 'angle'),
+                              (n_dihedral_types, 'dihedral'),
+                              (n_improper_types, 'improper')):
+        if n_types != '':
+            data.append('     ' + n_types + '  ' + cat_name + ' types\n')
+    data.append('\n')
+
+    if files.get(data_header, '') != '':
+        data.append(files[data_header] + '\n')
+
+    if (files.get(data_pbc, '') != '') and (files.get(data_boundary, '') == ''):
+        files[data_boundary] = files.pop(data_pbc)
+        sys.stderr.write('WARNING: write_once(\"' + data_pbc + '\") is depreciated\n'
+                         '     Use write_once(\"' + data_boundary + '\") instead\n')
+
+    box = None
+    boundary = files.get(data_boundary, '').replace('\r', '')
+    if boundary != '':
+        box = []
+        for lo, hi in (('xlo', 'xhi'), ('ylo', 'yhi'), ('zlo', 'zhi')):
+            box_lo = LastFieldMatch(boundary, 2, lo, 0)
+            box_hi = LastFieldMatch(boundary, 3, hi, 1)
+            if (box_lo == '') or (box_hi == ''):
+                raise InputError('Error: Problem with box boundary format (\"' +
+                                 lo + ' ' + hi + '\") in \"' +
+                                 data_boundary + '\"\n')
+            box.append('  ' + box_lo + ' ' + box_hi + ' ' + lo + ' ' + hi + '\n')
+        tilt = [LastFieldMatch(boundary, 3, 'xy', 0),
+                LastFieldMatch(boundary, 4, 'xz', 1),
+                LastFieldMatch(boundary, 5, 'yz', 2)]
+        if tilt != ['', '', '']:
+            if '' in tilt:
+                raise InputError('Error: Problem with triclinic format (\"xy xz yz\") in \"' +
+                                 data_boundary + '\"\n')
+            sys.stderr.write('triclinic parameters: XY XZ YZ = ' +
+                             ' '.join(tilt) + '\n\n')
+            box.append('  ' + ' '.join(tilt) + ' xy xz yz\n')
+    if box is None:
+        sys.stderr.write('Periodic boundary conditions unspecified. Attempting to generate automatically.\n'
+                         '----------------------------------------------------------------------\n'
+                         '---- WARNING: Unable to determine periodic boundary conditions.   ----\n'
+                         '----           (A default cube of volume=(200.0)^3 was used.      ----\n'
+                         '----               This is probably not what you want!)           ----\n'
+                         '---- It is recommended that you specify your periodic boundary    ----\n'
+                         '---- by adding a write_once(\"Data Boundary\") command to your .lt file. ----\n'
+                         '----------------------------------------------------------------------\n')
+        box = ['  -100.0 100.0 xlo xhi\n',
+               '  -100.0 100.0 ylo yhi\n',
+               '  -100.0 100.0 zlo zhi\n']
+    data += box
+    data.append('\n')
+
+    if files.get(data_masses, '') != '':
+        data.append('Masses\n\n' + files[data_masses] + '\n')
+    else:
+        sys.stderr.write('WARNING: missing file \"' + data_masses + '\"\n')
+
+    settings_text = files.get(in_settings, '')
+    for file_name, section_name in g_coeff_sections:
+        if files.get(file_name, '') != '':
+            data.append(section_name + '\n\n' + files[file_name] + '\n')
+    if ((files.get(data_pair_coeffs, '') != '') or
+        (files.get(data_pairij_coeffs, '') != '')):
+        if 'pair_coeff' not in settings_text:
+            sys.stderr.write('WARNING: no pair coeffs have been set!\n')
+    for file_name, n_types, cat_name in \
+            ((data_bond_coeffs, n_bond_types, 'bond'),
+             (data_angle_coeffs, n_angle_types, 'angle'),
+             (data_dihedral_coeffs, n_dihedral_types, 'dihedral'),
+             (data_improper_coeffs, n_improper_types, 'improper')):
+        if ((files.get(file_name, '') == '') and (n_types != '') and
+            (cat_name + '_coeff' not in settings_text)):
+            sys.stderr.write('WARNING: no ' + cat_name +
+                             ' coeffs have been set!\n')
+
+    if files.get(data_atoms, '') != '':
+        data.append('Atoms  # ' + atom_style + '\n\n' +
+                    files[data_atoms] + '\n')
+    else:
+        sys.stderr.write('WARNING: missing file \"' + data_atoms + '\"\n')
+
+    for file_name, section_name in g_topology_sections:
+        if files.get(file_name, '') != '':
+            data.append(section_name + '\n\n' + files[file_name] + '\n')
+
+    # ---------------- the LAMMPS input script ----------------
+
+    input_script = []
+    if files.get(in_init, '') != '':
+        outputs[out_file_init] = files[in_init]
+        input_script.append('\n'
+                            '\n'
+                            '# ----------------- Init Section -----------------\n'
+                            '\n'
+                            'include \"' + out_file_init + '\"\n'
+                            '\n')
+    input_script.append('\n'
+                        '# ----------------- Atom Definition Section -----------------\n'
+                        '\n'
+                        'read_data \"' + out_file_data + '\"\n'
+                        '\n'
+                        '# ----------------- Settings Section -----------------\n'
+                        '\n')
+    if settings_text != '':
+        if outputs.get(out_file_settings, '') != '':
+            sys.stderr.write('WARNING: The text in \"' + in_settings + '\" and \"' +
+                             out_file_settings + '\" was combined.\n'
+                             '         You should choose one file name or the other, but not both.\n')
+        outputs[out_file_settings] = (outputs.get(out_file_settings, '') +
+                                      settings_text)
+        input_script.append('include \"' + out_file_settings + '\"\n\n')
+
+    # Any other "Data ..." files become sections of the data file, and
+    # any other "In ..." files become "system.in.*" files.
+    for file_name in sorted(files):
+        if file_name.startswith('Data ') and not IsTempFile(file_name):
+            data.append('\n' + file_name[len('Data '):] + '\n\n' +
+                        files[file_name] + '\n')
+    if 'Data' in files:
+        data.append('\n' + files['Data'] + '\n')
+    outputs[out_file_data] = ''.join(data).replace('\r', '')
+
+    for file_name in sorted(files):
+        if file_name.startswith('In ') and not IsTempFile(file_name):
+            section_name = file_name[len('In '):]
+            suffix_file_name = (out_file_input_script + '.' +
+                                section_name.lower().replace(' ', '.'))
+            input_script.append('\n# ----------------- ' + section_name +
+                                ' Section -----------------\n')
+            if outputs.get(suffix_file_name, '') != '':
+                sys.stderr.write('WARNING: The text in \"' + file_name + '\" and \"' +
+                                 suffix_file_name + '\" was combined.\n'
+                                 '         You should choose one file name or the other, but not both.\n')
+            outputs[suffix_file_name] = (outputs.get(suffix_file_name, '') +
+                                         files[file_name])
+    if 'In' in files:
+        input_script.append('\n' + files['In'] + '\n')
+
+    # Post-process the input scripts (in the order LAMMPS reads them)
+    input_scripts_so_far = '\n'
+    rendered_files = set([file_name for file_name in rendered_files
+                          if file_name in outputs])
+    if out_file_init in outputs:
+        rendered_files.add(out_file_init)
+    for file_name in sorted(rendered_files):
+        if ((outputs[file_name] == '') or
+            (not HasCoeffCommands(outputs[file_name]))):
+            continue
+        sys.stderr.write('postprocessing file \"' + file_name + '\"\n')
+        outputs[file_name] = RunScript(postprocess_input_script,
+                                       ['input_scripts_so_far.tmp'],
+                                       outputs[file_name],
+                                       files={'input_scripts_so_far.tmp':
+                                              input_scripts_so_far})
+        sys.stderr.write('\n')
+        input_scripts_so_far += outputs[file_name].replace('\r', '')
+        for n_types, style_command in ((n_bond_types, 'bond_style'),
+                                       (n_angle_types, 'angle_style'),
+                                       (n_dihedral_types, 'dihedral_style'),
+                                       (n_improper_types, 'improper_style')):
+            if n_types == '':
+                outputs[file_name] = RemoveCommand(outputs[file_name],
+                                                   style_command)
+
+    for file_name in sorted(outputs):
+        if ((not file_name.startswith(out_file_input_script + '.')) or
+            (file_name in (out_file_init, out_file_settings)) or
+            file_name.endswith('.tmp') or file_name.endswith('.template')):
+            continue
+        sys.stderr.write('postprocessing file \"' + file_name + '\"\n')
+        outputs[file_name] = RunScript(postprocess_input_script,
+                                       ['input_scripts_so_far.tmp'],
+                                       outputs[file_name],
+                                       files={'input_scripts_so_far.tmp':
+                                              input_scripts_so_far})
+        sys.stderr.write('\n')
+        input_scripts_so_far += outputs[file_name]
+
+    input_script.append(g_run_section)
+    outputs[out_file_input_script] = ''.join(input_script)
+
+    # ---------------- write the files ----------------
+
+    WriteTextFiles(outputs, outputs.keys())
+    if write_intermediates:
+        os.mkdir('output_ttree')
+        WriteTextFiles(files,
+                       [file_name for file_name in files
+                        if ((file_name not in outputs) or
+                            IsTempFile(file_name))],
+                       'output_ttree')
+
+    sys.stderr.write('-------------------------------------------------------------\n'
+                     'If this software is useful in your research, please cite\n' +
+                     g_moltemplate_cite + '\n'
+                     '-------------------------------------------------------------\n')
+    return sorted(outputs.keys())
+
+
+def main():
+    sys.stderr.write(g_program_name + ' v' +
+                     g_version_str + ' ' + g_date_str + '\n')
+    atom_style = None
+    check = True
+    checkff = False
+    write_intermediates = True
+    processes = None
+    ttree_args = []
+    check_args = []
+    lt_file = None
+    try:
+        argv = sys.argv[1:]
+        i = 0
+        while i < len(argv):
+            arg = argv[i]
+            if arg in ('-atomstyle', '-atom-style', '-atom_style'):
+                if (i + 1 >= len(argv)) or (argv[i + 1] == ''):
+                    raise InputError('Error: The \"' + arg + '\" argument should be followed by an atom style.\n')
+                atom_style = argv[i + 1]
+                i += 1
+            elif arg == '-nocheck':
+                check = False
+            elif arg == '-checkff':
+                checkff = True
+            elif arg in ('-allow-wildcards', '-forbid-wildcards'):
+                check_args.append(arg)
+            elif arg == '-no-output-ttree':
+                write_intermediates = False
+            elif arg == '-nprocs':
+                if (i + 1 >= len(argv)) or (not argv[i + 1].isdigit()) or \
+                        (int(argv[i + 1]) < 1):
+                    raise InputError('Error: The \"' + arg + '\" argument should be followed by a positive integer.\n')
+                processes = int(argv[i + 1])
+                i += 1
+            elif arg in ('-pdb', '-xyz', '-raw', '-dump', '-molc', '-vmd') or \
+                    arg.startswith('-overlay'):
+                raise InputError('Error: ' + g_program_name + ' does not support the \"' +
+                                 arg + '\" argument.  (Use moltemplate.sh instead.)\n')
+            elif arg.endswith('.lt') or arg.endswith('.LT'):
+                lt_file = arg
+            else:
+                ttree_args.append(arg)
+            i += 1
+        if lt_file is None:
+            raise InputError('Syntax: ' + g_program_name +
+                             ' [-atomstyle style] [-nocheck] [-checkff] [-no-output-ttree]\n'
+                             '       [-nprocs n] file.lt\n')
+
+        Build(lt_file,
+              atom_style=atom_style,
+              check=check,
+              checkff=checkff,
+              ttree_args=ttree_args,
+              check_args=check_args,
+              write_intermediates=write_intermediates,
+              processes=processes)
+
+    except (ValueError, InputError) as err:
+        sys.stderr.write('\n' + str(err) + '\n')
+        sys.exit(1)
+
+    return
+
+
+if __name__ == '__main__':
+    main()
@@ -167,28 +167,38 @@ else:
 
 try:
     from .extract_lammps_data import *
-    from .nbody_by_type_lib import GenInteractions_str
+    from .nbody_by_type_lib import GenInteractions_str, GenBondGraph
     from .ttree_lex import *
     from .lttree_styles import AtomStyle2ColNames, ColNames2AidAtypeMolid
 except (ImportError, SystemError, ValueError):
     from extract_lammps_data import *
-    from nbody_by_type_lib import GenInteractions_str
+    from nbody_by_type_lib import GenInteractions_str, GenBondGraph
     from ttree_lex import *
     from lttree_styles import AtomStyle2ColNames, ColNames2AidAtypeMolid
 
 
 
-def GenInteractions_lines(lines_atoms,
-                          lines_bonds,
-                          lines_nbody,
-                          lines_nbodybytype,
-                          atom_style,
-                          g_bond_pattern,
-                          canonical_order,  # function to sort atoms and bonds
-                          prefix='',
-                          suffix='',
-                          report_progress=False,
-                          check_undefined=False):
+# The bond graph of the last system read by ReadBondGraph():
+#   [(atom_style, lines_atoms, lines_bonds), (atomids_str, bond_graph)]
+# (Generating angles, dihedrals, and impropers for the same system
+#  reads the same "Atoms" and "Bonds" lines each time.  If the lines are
+#  the same, the graph is not parsed again.  When the interactions are
+#  generated in forked processes, they all inherit this graph.)
+g_last_bond_graph = [None, None]
+
+
+def ReadBondGraph(lines_atoms,
+                  lines_bonds,
+                  atom_style):
+    """
+    Parse the lines from the "Atoms" and "Bonds" sections and build the
+    bond graph (see nbody_by_type_lib.GenBondGraph()).
+    Returns a tuple (atomids_str, bond_graph).
+
+    """
+    key = (atom_style, tuple(lines_atoms), tuple(lines_bonds))
+    if g_last_bond_graph[0] == key:
+        return g_last_bond_graph[1]
 
     column_names = AtomStyle2ColNames(atom_style)
     i_atomid, i_atomtype, i_molid = ColNames2AidAtypeMolid(column_names)
@@ -228,6 +238,32 @@ def GenInteractions_lines(lines_atoms,
             bond_pairs.append((EscCharStrToChar(tokens[2]),
                                EscCharStrToChar(tokens[3])))
 
+    bond_graph = GenBondGraph(bond_pairs,
+                              atomids_str,
+                              atomtypes_str,
+                              bondids_str,
+                              bondtypes_str)
+    g_last_bond_graph[0] = key
+    g_last_bond_graph[1] = (atomids_str, bond_graph)
+    return g_last_bond_graph[1]
+
+
+def GenInteractions_lines(lines_atoms,
+                          lines_bonds,
+                          lines_nbody,
+                          lines_nbodybytype,
+                          atom_style,
+                          g_bond_pattern,
+                          canonical_order,  # function to sort atoms and bonds
+                          prefix='',
+                          suffix='',
+                          report_progress=False,
+                          check_undefined=False):
+
+    atomids_str, bond_graph = ReadBondGraph(lines_atoms,
+                                            lines_bonds,
+                                            atom_style)
+
     typepattern_to_coefftypes = []
 
     for i in range(0, len(lines_nbodybytype)):
@@ -266,16 +302,17 @@ def GenInteractions_lines(lines_atoms,
 
             typepattern_to_coefftypes.append([typepattern, coefftype])
 
-    coefftype_to_atomids_str = GenInteractions_str(bond_pairs,
+    coefftype_to_atomids_str = GenInteractions_str(None,
                                                    g_bond_pattern,
                                                    typepattern_to_coefftypes,
                                                    canonical_order,
                                                    atomids_str,
-                                                   atomtypes_str,
-                                                   bondids_str,
-                                                   bondtypes_str,
+                                                   None,
+                                                   None,
+                                                   None,
                                                    report_progress,
-                                                   check_undefined)
+                                                   check_undefined,
+                                                   bond_graph)
     lines_nbody_new = []
     for coefftype, atomids_list in coefftype_to_atomids_str.items():
         for atomids_found in atomids_list:
@@ -28,16 +28,100 @@ else:
 from collections import defaultdict
 
 try:
-    from .nbody_graph_search import Ugraph, GraphMatcher
+    from .nbody_graph_search import Ugraph, GraphMatcherCSR, NewGraphMatcher, np
     from .ttree_lex import MatchesPattern, MatchesAll, InputError
 except (ImportError, SystemError, ValueError):
     # not installed as a package
-    from nbody_graph_search import Ugraph, GraphMatcher
+    from nbody_graph_search import Ugraph, GraphMatcherCSR, NewGraphMatcher, np
     from ttree_lex import MatchesPattern, MatchesAll, InputError
 
 #import gc
 
 
+def ReportSearchProgress(oldatomid, startatomid, num_verts):
+    """
+    Print the percentage of the atoms in the system which have been used
+    as the first atom in a match so far (whenever it changes enough).
+
+    """
+    percent_complete = (100 * startatomid) // num_verts
+    # report less often as more progress made
+    if percent_complete <= 4:
+        old_pc = (100 * oldatomid) // num_verts
+        if percent_complete > old_pc:
+            sys.stderr.write('  ' + str(percent_complete) + '%')
+    elif percent_complete <= 8:
+        pc_d2 = (100 * startatomid) // (2 * num_verts)
+        oldpc_d2 = (100 * oldatomid) // (2 * num_verts)
+        if pc_d2 > oldpc_d2:
+            sys.stderr.write('  ' + str(percent_complete) + '%')
+    elif percent_complete <= 20:
+        pc_d4 = (100 * startatomid) // (4 * num_verts)
+        oldpc_d4 = (100 * oldatomid) // (4 * num_verts)
+        if pc_d4 > oldpc_d4:
+            sys.stderr.write('  ' + str(percent_complete) + '%')
+    else:
+        pc_d10 = (100 * startatomid) // (10 * num_verts)
+        oldpc_d10 = (100 * oldatomid) // (10 * num_verts)
+        if pc_d10 > oldpc_d10:
+            sys.stderr.write('  ' + str(percent_complete) + '%')
+
+
+def GroupMatchesByType(G_system, match_verts, match_edges):
+    """
+    Organize the matches found by GraphMatcherCSR.MatchArrays() in a
+    dictionary indexed by atom and bond types, the same way the matches
+    from GraphMatcher.Matches() are organized by GenInteractions_int().
+    (The types are looked up with numpy instead of one match at a time.)
+    Returns None if the atom or bond types are not integers.
+
+    """
+    interactions_by_type = defaultdict(list)
+    if len(match_verts) == 0:
+        return interactions_by_type
+
+    vert_types = np.array([G_system.GetVert(Iv).attr
+                           for Iv in range(0, G_system.GetNumVerts())])
+    edge_types = np.array([G_system.GetEdge(Ie).attr
+                           for Ie in range(0, G_system.GetNumEdges())])
+    if ((vert_types.dtype.kind not in 'iu') or
+            (match_edges.shape[1] > 0 and edge_types.dtype.kind not in 'iu')):
+        return None
+
+    nv = match_verts.shape[1]
+    types = np.hstack((vert_types[match_verts],
+                       edge_types[match_edges].astype(vert_types.dtype)))
+    # Sorting one integer per match is much faster than sorting the rows,
+    # so encode the types of each match in a single (mixed radix) number,
+    # unless there are too many atom and bond types to fit in an int64.
+    radix = int(max(vert_types.max(), edge_types.max() if len(edge_types) else 0)) + 1
+    if vert_types.min() >= 0 and (len(edge_types) == 0 or edge_types.min() >= 0) \
+       and radix ** types.shape[1] < 2 ** 63:
+        keys = types.astype(np.int64).dot(radix ** np.arange(types.shape[1],
+                                                             dtype=np.int64))
+        unique_keys, first, group = np.unique(keys, return_index=True,
+                                              return_inverse=True)
+        unique_types = types[first]
+    else:
+        unique_types, first, group = np.unique(types, axis=0,
+                                               return_index=True,
+                                               return_inverse=True)
+    group = group.reshape(-1)
+    # Keep the matches of each group in order, and the groups in the
+    # order in which their first match was found.
+    members = np.argsort(group, kind='stable')
+    boundaries = np.cumsum(np.bincount(group, minlength=len(unique_types)))
+    boundaries = [0] + boundaries.tolist()
+    abids = list(zip(map(tuple, match_verts[members].tolist()),
+                     map(tuple, match_edges[members].tolist())))
+    for i in np.argsort(first, kind='stable').tolist():
+        atombondtypes = tuple(unique_types[i].tolist())
+        atombondtypes = (atombondtypes[:nv], atombondtypes[nv:])
+        interactions_by_type[atombondtypes] = \
+            abids[boundaries[i]:boundaries[i + 1]]
+    return interactions_by_type
+
+
 def GenInteractions_int(G_system,
                         g_bond_pattern,
                         typepattern_to_coefftypes,
@@ -125,11 +209,28 @@ def GenInteractions_int(G_system,
     # atom and bond types and store all of the non-redundant ones in
     # the "interactions_by_type" variable.
 
-    gm = GraphMatcher(G_system, g_bond_pattern)
-
-    interactions_by_type = defaultdict(list)
-
-    for atombondids in gm.Matches():
+    gm = NewGraphMatcher(G_system, g_bond_pattern)
+
+    interactions_by_type = None
+    if isinstance(gm, GraphMatcherCSR):
+        match_verts, match_edges = gm.MatchArrays()
+        interactions_by_type = GroupMatchesByType(G_system,
+                                                  match_verts, match_edges)
+        if (interactions_by_type is not None) and report_progress:
+            # All of the matches were found at once.  Report progress the
+            # same way, using the (sorted) atoms that begin each match.
+            for atomid in np.unique(match_verts[:, 0]).tolist():
+                ReportSearchProgress(startatomid, atomid,
+                                     G_system.GetNumVerts())
+                startatomid = atomid
+
+    if interactions_by_type is None:
+        interactions_by_type = defaultdict(list)
+        matches = gm.Matches()
+    else:
+        matches = []
+
+    for atombondids in matches:
         # "atombondids" is a tuple.
         #  atombondids[0] has atomIDs from G_system corresponding to g_bond_pattern
         #     (These atomID numbers are indices into the G_system.verts[] list.)
@@ -158,27 +259,8 @@ def GenInteractions_int(G_system,
             # to guess much progress has been made so far.
             oldatomid = startatomid
             startatomid = atombondids[0][0]
-            percent_complete = (100 * startatomid) // G_system.GetNumVerts()
-            # report less often as more progress made
-            if percent_complete <= 4:
-                old_pc = (100 * oldatomid) // G_system.GetNumVerts()
-                if percent_complete > old_pc:
-                    sys.stderr.write('  ' + str(percent_complete) + '%')
-            elif percent_complete <= 8:
-                pc_d2 = (100 * startatomid) // (2 * G_system.GetNumVerts())
-                oldpc_d2 = (100 * oldatomid) // (2 * G_system.GetNumVerts())
-                if pc_d2 > oldpc_d2:
-                    sys.stderr.write('  ' + str(percent_complete) + '%')
-            elif percent_complete <= 20:
-                pc_d4 = (100 * startatomid) // (4 * G_system.GetNumVerts())
-                oldpc_d4 = (100 * oldatomid) // (4 * G_system.GetNumVerts())
-                if pc_d4 > oldpc_d4:
-                    sys.stderr.write('  ' + str(percent_complete) + '%')
-            else:
-                pc_d10 = (100 * startatomid) // (10 * G_system.GetNumVerts())
-                oldpc_d10 = (100 * oldatomid) // (10 * G_system.GetNumVerts())
-                if pc_d10 > oldpc_d10:
-                    sys.stderr.write('  ' + str(percent_complete) + '%')
+            ReportSearchProgress(oldatomid, startatomid,
+                                 G_system.GetNumVerts())
 
     if report_progress:
         sys.stderr.write('  100%\n')
@@ -380,16 +462,20 @@ def GenInteractions_int(G_system,
 
 
 
-def GenInteractions_str(bond_pairs,
-                        g_bond_pattern,
-                        typepattern_to_coefftypes,
-                        canonical_order,  # function to sort atoms and bonds
-                        atomids_str,
-                        atomtypes_str,
-                        bondids_str,
-                        bondtypes_str,
-                        report_progress=False,  # print messages to sys.stderr?
-                        check_undefined=False):
+def GenBondGraph(bond_pairs,
+                 atomids_str,
+                 atomtypes_str,
+                 bondids_str,
+                 bondtypes_str):
+    """
+    Convert the atoms and bonds (whose ids and types are strings) into
+    a Ugraph whose vertex and edge attributes are integer types.
+    Returns a tuple (G_system, atomtypes_int2str, bondtypes_int2str).
+    The result can be passed to GenInteractions_str() (as "bond_graph")
+    to search the same system for several kinds of interactions
+    (eg. angles, dihedrals, and impropers) without rebuilding the graph.
+
+    """
 
     assert(len(atomids_str) == len(atomtypes_str))
     assert(len(bondids_str) == len(bondtypes_str))
@@ -445,6 +531,29 @@ def GenInteractions_str(bond_pairs,
                          atomids_str2int[atomid2_str],
                          bondtypes_str2int[bondtypes_str[ie]])
 
+    return G_system, atomtypes_int2str, bondtypes_int2str
+
+
+def GenInteractions_str(bond_pairs,
+                        g_bond_pattern,
+                        typepattern_to_coefftypes,
+                        canonical_order,  # function to sort atoms and bonds
+                        atomids_str,
+                        atomtypes_str,
+                        bondids_str,
+                        bondtypes_str,
+                        report_progress=False,  # print messages to sys.stderr?
+                        check_undefined=False,
+                        bond_graph=None):  # (returned by GenBondGraph())
+
+    if bond_graph is None:
+        bond_graph = GenBondGraph(bond_pairs,
+                                  atomids_str,
+                                  atomtypes_str,
+                                  bondids_str,
+                                  bondtypes_str)
+    G_system, atomtypes_int2str, bondtypes_int2str = bond_graph
+
     coefftype_to_atomids_int = GenInteractions_int(G_system,
                                                    g_bond_pattern,
                                                    typepattern_to_coefftypes,
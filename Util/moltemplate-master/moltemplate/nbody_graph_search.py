@@ -10,6 +10,10 @@
 import sys
 import copy
 from operator import itemgetter
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 class GenError(Exception):
@@ -968,3 +972,143 @@ class GraphMatcher(object):
                     match_edges[ieu] = Ieu
 
         return (tuple(match_verts), tuple(match_edges))
+
+
+
+def CSRAdjacency(G):
+    """
+    Store the adjacency lists of a Ugraph in compressed sparse row format.
+    The neighbors of vertex Iv are  nbr_verts[indptr[Iv]:indptr[Iv+1]]
+    (in the same order they appear in G.neighbors[Iv]), and nbr_edges
+    contains the corresponding (undirected) edge id numbers.
+
+    """
+    degrees = [len(nlist) for nlist in G.neighbors]
+    indptr = np.zeros(G.nv + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(degrees)
+    ieds = [ied for nlist in G.neighbors for ied in nlist]
+    nbr_verts = np.array([G.edges[ied].stop for ied in ieds], dtype=np.int64)
+    nbr_edges = np.array([G.ied_to_ieu[ied] for ied in ieds], dtype=np.int64)
+    return indptr, nbr_verts, nbr_edges
+
+
+class GraphMatcherCSR(object):
+    """
+    A (much) faster replacement for GraphMatcher for the common case where
+    the small graph (g) is a tree, such as the bond patterns used to look
+    up angles, dihedrals, and impropers.  The big graph (G) is stored in
+    compressed sparse row (CSR) format, and instead of a recursive search,
+    all of the partial matches are extended one edge of g at a time using
+    numpy arrays.  Each partial match is replaced by its extensions (in the
+    order the neighbors appear in the adjacency list), so the matches are
+    generated in exactly the same order as GraphMatcher.Matches().
+
+    Limitations: G must be a Ugraph without duplicate edges (multiple edges
+    connecting the same pair of vertices), and g must be a Ugraph which is
+    a tree.  Use NewGraphMatcher() to fall back on GraphMatcher otherwise.
+
+    """
+
+    def __init__(self,
+                 G,  # The "big" graph
+                 g):  # The little graph (must be a tree)
+
+        self.G = G
+        self.g = copy.deepcopy(g)
+        self.G_is_too_small = ((g.nv > G.nv) or (g.ne > G.ne))
+
+        # Visit the vertices and edges of g in the same order as GraphMatcher
+        subgraph_searcher = DFS(self.g)
+        self.vorder_g, self.eorder_g = subgraph_searcher.Order()
+        self.g.ReorderVerts(self.vorder_g, invert=True)
+        self.g.ReorderEdges(self.eorder_g, invert=True)
+
+        # After re-ordering, the edges of the tree which point from a vertex
+        # to a vertex which has not been visited yet are the ones for which
+        # start < stop.  (The edges pointing back have exactly one match.)
+        self.tree_edges = []
+        for ie in range(0, self.g.ne):
+            iv = self.g.edges[ie].start
+            jv = self.g.edges[ie].stop
+            if iv < jv:
+                self.tree_edges.append((iv, jv,
+                                        self.g.LookupUndirectedEdgeIdx(ie)))
+
+        self.indptr, self.nbr_verts, self.nbr_edges = CSRAdjacency(G)
+
+    def IsSupported(self):
+        """
+        Returns True if g is a tree and G contains no duplicate edges
+        (in which case the matches are identical to GraphMatcher's).
+
+        """
+        if ((type(self.G) is not Ugraph) or (type(self.g) is not Ugraph)):
+            return False
+        if ((self.g.neu != self.g.nv - 1) or
+                (self.g.ne != 2 * self.g.neu)):
+            return False
+        degrees = self.indptr[1:] - self.indptr[:-1]
+        starts = np.repeat(np.arange(self.G.nv, dtype=np.int64), degrees)
+        keys = starts * self.G.nv + self.nbr_verts
+        return len(np.unique(keys)) == len(keys)
+
+    def MatchArrays(self):
+        """
+        Returns all of the matches between G and g as a pair of 2-D arrays
+        (vertex ids from G, undirected edge ids from G).  Row i contains the
+        i'th match returned by Matches().
+
+        """
+        if self.G_is_too_small:
+            return (np.empty((0, self.g.nv), dtype=np.int64),
+                    np.empty((0, self.g.neu), dtype=np.int64))
+
+        # Begin by matching vertex 0 from g with every vertex in G
+        verts = np.arange(self.G.nv, dtype=np.int64).reshape(-1, 1)
+        edges = np.empty((self.G.nv, 0), dtype=np.int64)
+
+        for iv, jv, ieu in self.tree_edges:
+            assert(jv == verts.shape[1])
+            Iv = verts[:, iv]
+            degrees = self.indptr[Iv + 1] - self.indptr[Iv]
+            rows = np.repeat(np.arange(len(Iv)), degrees)
+            # position of each candidate in the (concatenated) neighbor lists
+            offsets = np.repeat(self.indptr[Iv] - (np.cumsum(degrees) - degrees),
+                                degrees)
+            slots = offsets + np.arange(len(rows))
+            Jv = self.nbr_verts[slots]
+            # Discard candidates which re-use a vertex from the partial match
+            keep = np.all(verts[rows] != Jv[:, np.newaxis], axis=1)
+            rows = rows[keep]
+            slots = slots[keep]
+            verts = np.column_stack((verts[rows], Jv[keep]))
+            edges = np.column_stack((edges[rows], self.nbr_edges[slots]))
+
+        # Same ordering of the vertices and edges as GraphMatcher.ReformatMatch()
+        match_verts = verts[:, self.vorder_g]
+        match_edges = np.empty((len(edges), self.g.neu), dtype=np.int64)
+        match_edges[:, [ieu for iv, jv, ieu in self.tree_edges]] = edges
+        return match_verts, match_edges
+
+    def Matches(self):
+        """
+        Iterator over all matches between G and g, in the same format
+        (and order) as GraphMatcher.Matches().
+
+        """
+        match_verts, match_edges = self.MatchArrays()
+        for verts, edges in zip(match_verts.tolist(), match_edges.tolist()):
+            yield (tuple(verts), tuple(edges))
+
+
+def NewGraphMatcher(G, g):
+    """
+    Returns a GraphMatcherCSR for G and g if it supports them
+    (and numpy is available), otherwise a GraphMatcher.
+
+    """
+    if np is not None and type(G) is Ugraph and type(g) is Ugraph:
+        gm = GraphMatcherCSR(G, g)
+        if gm.IsSupported():
+            return gm
+    return GraphMatcher(G, g)
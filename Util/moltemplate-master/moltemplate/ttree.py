@@ -4819,18 +4819,23 @@ def EraseTemplateFiles(command_list):
 #            out_file.close()
 
 
-def WriteVarBindingsFile(node):
+def WriteVarBindingsFile(node, out_file=None):
     """ Write out a single file which contains a list of all
     of the variables defined (regardless of which class they
     were defined in).  Next to each variable name is the corresponding
     information stored in that variable (a number) that variable.
+    (If out_file is given, the list is written to that stream instead
+     of being appended to the "ttree_assignments.txt" file.)
 
     """
     if (not hasattr(node, 'categories')):
         # (sometimes leaf nodes lack a 'categories' member, to save memory)
         return
 
-    out = open('ttree_assignments.txt', 'a')
+    if out_file is None:
+        out = open('ttree_assignments.txt', 'a')
+    else:
+        out = out_file
     for cat_name in node.categories:
         var_bindings = node.categories[cat_name].bindings
         for nd, var_binding in var_bindings.items():
@@ -4860,9 +4865,10 @@ def WriteVarBindingsFile(node):
                               #SafelyEncodeString(var_binding.value)
                               var_binding.value
                               + usage_example + '\n')
-    out.close()
+    if out_file is None:
+        out.close()
     for child in node.children.values():
-        WriteVarBindingsFile(child)
+        WriteVarBindingsFile(child, out_file)
 
 
 def CustomizeBindings(bindings,
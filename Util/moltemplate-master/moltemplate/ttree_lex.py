@@ -26,10 +26,13 @@
 
 import os.path
 import sys
+import atexit
+import hashlib
+import pickle
+import tempfile
 from collections import deque
 import re
 import fnmatch
-import string
 #import gc
 
 
@@ -70,6 +73,8 @@ __all__ = ["TtreeShlex",
            #"_TableFromTemplate",
            #"_DeleteLineFromTemplate",
            "DeleteLinesWithBadVars",
+           "TemplateCache",
+           "GetTemplateCache",
            "TemplateLexer"]
 
 
@@ -1658,6 +1663,98 @@ def TableFromTemplate(ltmpl, delimiters, delete_blanks=True):
     return output
 
 
+class TemplateCache(object):
+    """ TemplateCache stores the blocks of text returned by
+    TemplateLexer.ReadTemplate() on disk, so that large files which do not
+    change between runs (for example force-field files like "gaff.lt")
+    are not lexed again every time moltemplate is invoked.
+        Entries are grouped by the sha256 of the contents of the file they
+    were read from, and keyed by the position in that file where the block
+    begins (and the lexer settings), so editing a file simply invalidates
+    its entries.  Files which changed (or were never seen before) are lexed
+    normally.
+        The cache is enabled by setting the MOLTEMPLATE_CACHE_DIR
+    environment variable to the directory where it should be stored.
+
+    """
+
+    version = 1
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.digests = {}     # file name -> sha256 of its contents
+        self.tables = {}      # sha256 -> {key: entry}
+        self.modified = set()
+        atexit.register(self.Save)
+
+    def Digest(self, path):
+        if path not in self.digests:
+            h = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    h.update(block)
+            self.digests[path] = h.hexdigest()
+        return self.digests[path]
+
+    def TablePath(self, digest):
+        return os.path.join(self.cache_dir, 'templates',
+                            digest + '.v' + str(self.version) + '.pickle')
+
+    def Table(self, path):
+        digest = self.Digest(path)
+        if digest not in self.tables:
+            table = {}
+            try:
+                with open(self.TablePath(digest), 'rb') as f:
+                    table = pickle.load(f)
+            except (IOError, OSError, EOFError, pickle.UnpicklingError):
+                pass
+            self.tables[digest] = table
+        return digest, self.tables[digest]
+
+    def Lookup(self, path, key):
+        digest, table = self.Table(path)
+        return table.get(key)
+
+    def Store(self, path, key, entry):
+        digest, table = self.Table(path)
+        table[key] = entry
+        self.modified.add(digest)
+
+    def Save(self):
+        """ Write the tables which gained new entries (atomically). """
+        for digest in self.modified:
+            table_path = self.TablePath(digest)
+            try:
+                if not os.path.isdir(os.path.dirname(table_path)):
+                    os.makedirs(os.path.dirname(table_path))
+                fd, tmp_path = tempfile.mkstemp(prefix='.tmpl-',
+                                                dir=os.path.dirname(table_path))
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(self.tables[digest], f,
+                                protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, table_path)
+            except (IOError, OSError) as err:
+                sys.stderr.write('Warning: unable to update the template cache in \"' +
+                                 self.cache_dir + '\":\n  ' + str(err) + '\n')
+        self.modified = set()
+
+
+g_template_cache = None
+
+
+def GetTemplateCache():
+    """ Return the TemplateCache selected by MOLTEMPLATE_CACHE_DIR
+    (or None if that variable is not set). """
+    global g_template_cache
+    cache_dir = os.environ.get('MOLTEMPLATE_CACHE_DIR', '')
+    if cache_dir == '':
+        return None
+    if (g_template_cache is None) or (g_template_cache.cache_dir != cache_dir):
+        g_template_cache = TemplateCache(cache_dir)
+    return g_template_cache
+
+
 class TemplateLexer(TtreeShlex):
     """ This class extends the standard python lexing module, shlex, adding a
     new member function (ReadTemplate()), which can read in a block of raw text,
@@ -1741,6 +1838,55 @@ class TemplateLexer(TtreeShlex):
                      remove_esc_preceeding='{\\',  #explained below
                      var_terminators='{}(),', #(var_delim, spaces also included)
                      keep_terminal_char=True):
+        """
+        Same as _ReadTemplate() (see below), but blocks read from
+        unchanged files are loaded from the TemplateCache, if enabled.
+
+        """
+        args = (simplify_output, terminators, remove_esc_preceeding,
+                var_terminators, keep_terminal_char)
+        cache = GetTemplateCache()
+        path = getattr(self.instream, 'name', None)
+        if ((cache is None) or (len(self.pushback) > 0) or
+            (not isinstance(path, str)) or (not os.path.isfile(path))):
+            return self._ReadTemplate(*args)
+
+        key = (self.infile, self.instream.tell(), self.lineno, args,
+               self.var_delim, self.var_open_paren, self.var_close_paren,
+               self.newline, self.whitespace, self.escape,
+               self.comment_skip_var)
+        entry = cache.Lookup(path, key)
+        if entry is not None:
+            pickled_tmpl, end_pos, end_lineno, order_begin, num_srclocs = entry
+            tmpl_list = pickle.loads(pickled_tmpl)
+            # Shift the OSrcLoc.order counters as if the block was just read.
+            # (The order in which variables are encountered matters later.)
+            offset = OSrcLoc.count - order_begin
+            srclocs = {}
+            for item in tmpl_list:
+                if isinstance(item, (TextBlock, VarRef)):
+                    srclocs[id(item.srcloc)] = item.srcloc
+            for srcloc in srclocs.values():
+                srcloc.order += offset
+            OSrcLoc.count += num_srclocs
+            self.instream.seek(end_pos)
+            self.lineno = end_lineno
+            return tmpl_list
+
+        order_begin = OSrcLoc.count
+        tmpl_list = self._ReadTemplate(*args)
+        cache.Store(path, key,
+                    (pickle.dumps(tmpl_list, protocol=pickle.HIGHEST_PROTOCOL),
+                     self.instream.tell(), self.lineno,
+                     order_begin, OSrcLoc.count - order_begin))
+        return tmpl_list
+
+    def _ReadTemplate(self,
+                      simplify_output=False,
+                      terminators='}',
+                      remove_esc_preceeding='{\\',  #explained below
+                      var_terminators='{}(),', #(var_delim, spaces also included)
+                      keep_terminal_char=True):
         """
            ReadTemplate() reads a block of text (between terminators)
         and divides it into variables (tokens following a '$' or '@' character)
@@ -78,6 +78,7 @@ setup(
         'ttree.py=moltemplate.ttree:main',
         'ttree_render.py=moltemplate.ttree_render:main',
         'bonds_by_type.py=moltemplate.bonds_by_type:main',
+        'moltemplate_build.py=moltemplate.build:main',
         'charge_by_bond.py=moltemplate.charge_by_bond:main',
         'dump2data.py=moltemplate.dump2data:main',
         'extract_espresso_atom_types.py=moltemplate.extract_espresso_atom_types:main',
@@ -33,6 +33,7 @@ LMP_PACKAGES_TO_ENABLE_IN_ORDER = [
     "dipole",
     "molecule",
     "extra-compute",
+    "extra-dump",
     "extra-fix",
     "extra-molecule",
     "extra-pair",
@@ -48,7 +49,10 @@ LMP_PACKAGES_TO_ENABLE_IN_ORDER = [
     "rigid",
 ]
 
-def enable_only_selected_packages_in_order(lammps_src_path: str):
+# Optional package for multi-threaded styles (used by Util_lammps_launcher.py via -sf omp)
+LMP_OPENMP_PACKAGE = "openmp"
+
+def enable_only_selected_packages_in_order(lammps_src_path: str, extra_packages=()):
     print("\n=== Step 2A: Configure LAMMPS packages (enable only selected, in order) ===")
 
     # 1) Disable all packages
@@ -56,7 +60,7 @@ def enable_only_selected_packages_in_order(lammps_src_path: str):
         return False
 
     # 2) Enable only the desired packages in the specified order
-    for pkg in LMP_PACKAGES_TO_ENABLE_IN_ORDER:
+    for pkg in list(LMP_PACKAGES_TO_ENABLE_IN_ORDER) + list(extra_packages):
         if not run_command(f"make yes-{pkg}", cwd=lammps_src_path, description=f"Enable package in order: {pkg}"):
             return False
 
@@ -100,13 +104,17 @@ def install_lammps():
     print(f"Found LAMMPS src directory: {lammps_src_path}")
 
     # 2A) Package configuration (fixed order)
-    if not enable_only_selected_packages_in_order(lammps_src_path):
+    enable_openmp = get_user_choice("Do you want to enable the OPENMP package (multi-threaded styles)?")
+    extra_packages = [LMP_OPENMP_PACKAGE] if enable_openmp else []
+    if not enable_only_selected_packages_in_order(lammps_src_path, extra_packages):
         print("Aborting due to package configuration failure.")
         return False
 
     # Ask user which version(s) to compile
     compile_serial = get_user_choice("Do you want to compile LAMMPS serial version?")
     compile_mpi = get_user_choice("Do you want to compile LAMMPS MPI version?")
+    compile_omp = enable_openmp and get_user_choice("Do you want to compile LAMMPS MPI+OpenMP version (lmp_omp)?")
+    compile_shared = get_user_choice("Do you want to compile the LAMMPS shared library (in-process Python driver)?")
     
     success = True
     
@@ -122,7 +130,26 @@ def install_lammps():
         if not run_command("make mpi", cwd=lammps_src_path, description="Making LAMMPS (mpi)"):
             success = False
     
-    if not compile_serial and not compile_mpi:
+    # 2D) MPI+OpenMP build
+    if compile_omp:
+        print("\nCompiling LAMMPS MPI+OpenMP version...")
+        if not run_command("make omp", cwd=lammps_src_path, description="Making LAMMPS (omp)"):
+            success = False
+
+    # 2E) Shared library for the Python module (Util_lammps_driver.py)
+    if compile_shared:
+        print("\nCompiling LAMMPS shared library...")
+        # LAMMPS_EXCEPTIONS: a failed command raises in Python instead of exiting the interpreter
+        if run_command('make mode=shared serial LMP_INC="-DLAMMPS_GZIP -DLAMMPS_MEMALIGN=64 -DLAMMPS_EXCEPTIONS"',
+                       cwd=lammps_src_path, description="Making LAMMPS (shared library)"):
+            link_path = os.path.join(base_util_path, "lammps-2Aug2023", "python", "lammps", "liblammps.so")
+            if os.path.lexists(link_path):
+                os.remove(link_path)
+            os.symlink(os.path.join("..", "..", "src", "liblammps_serial.so"), link_path)
+        else:
+            success = False
+
+    if not compile_serial and not compile_mpi and not compile_omp and not compile_shared:
         print("No LAMMPS version selected for compilation.")
     
     return success